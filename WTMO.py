@@ -11,26 +11,47 @@ A desktop application for organizing game mods with embedded web portal and expo
 
 import sys
 import os
-import json
-import re
-import zipfile
-import tempfile
-from pathlib import Path
-from urllib.parse import urlparse
+import threading
 from typing import Optional, List, Dict
 
+'''--sync runs the headless modlist sync in wtmo_sync and exits before PyQt (and its embedded Chromium) is ever imported.'''
+if __name__ == '__main__' and '--sync' in sys.argv[1:]:
+    from wtmo_sync import main as sync_main
+    sys.exit(sync_main(sys.argv[1:]))
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QGridLayout, QPushButton, QLabel, QListWidget, QListWidgetItem,
+    QGridLayout, QPushButton, QLabel, QListView, QComboBox,
     QFileDialog, QMessageBox, QFrame, QSplitter, QScrollArea,
-    QTextEdit, QProgressBar, QCheckBox, QSizePolicy
+    QTextEdit, QProgressBar, QCheckBox, QSizePolicy, QMenu, QDialog, QInputDialog
+)
+from PyQt6.QtCore import (
+    Qt, QUrl, QThread, pyqtSignal, QSize, QTimer, QFileSystemWatcher, QCoreApplication,
+    QAbstractListModel, QModelIndex, QSortFilterProxyModel
 )
-from PyQt6.QtCore import Qt, QUrl, QThread, pyqtSignal, QSize
-from PyQt6.QtGui import QPixmap, QFont, QIcon
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEnginePage
+from PyQt6.QtGui import QPixmap, QFont, QFontDatabase, QIcon, QImage
 
-import requests
+from wtmo_downloads import (
+    DownloadEngine, check_for_updates, DEFAULT_MAX_DOWNLOADS, DEFAULT_MAX_DOWNLOADS_PER_HOST, DEFAULT_MEMORY_EXTRACT_MB,
+    ORDER_LIST, DOWNLOAD_ORDERS, UPDATE_CHANGED, UPDATE_UNKNOWN, UPDATE_ERROR
+)
+from wtmo_cache import ArchiveCache, DEFAULT_CACHE_BUDGET_MB
+from wtmo_manifest import InstallManifest
+from wtmo_scanner import FolderIndex
+from wtmo_store import SettingsStore
+from wtmo_modlist import (
+    ModList, ModEntry, MODS_ADDED, MODS_CHANGED, CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+)
+from wtmo_modfile import read_modlist, write_modlist, export_records, iter_batches
+from wtmo_harvest import resolve_posts, harvested_entries, FEED_CATEGORIES
+from wtmo_thumbnails import ThumbnailLoader
+from wtmo_profiles import ModStore, switch_profile
+from wtmo_staging import recover_staging
+from wtmo_postcache import apply_cached, lookup_posts, records_from_results, resolved_categories, post_id
+from wtmo_preflight import (
+    preflight, space_check, estimated_rate, summarize_preflight, format_summary, format_size, PREFLIGHT_FAILED
+)
+from wtmo_trace import TraceWriter, read_trace, latest_trace_file, summarize, format_report
 '''This Mod Organizer is a variant of the Universal Mod Organizer Framework, this variant is for: War Thunder'''
 '''If you are a dev, please note that you may need to git pull PyQt6 when developmenting a fork of existing Mod Organizers'''
 '''If you are a dev, please refer to the example organizers for War Thunder, Star Wars Battlefront 2 and Red Alert 3, for code references and starting points to build off of. Additionally refer to the github page for tutorials on getting started or what chunks to cutout/keep when making radical changes within the framework.'''
@@ -45,181 +66,485 @@ class DownloadThread(QThread):
     finished_download = pyqtSignal(str, bool, str)  # url, success, message
     all_done = pyqtSignal()
 
-    def __init__(self, mods: List[Dict], root_folder: str):
+    '''The actual downloading happens in wtmo_downloads.DownloadEngine, a pool of workers sharing one pooled session. This thread just
+    runs it off the UI thread and forwards its callbacks to the signals above, results still arrive in the same order as the list.'''
+    def __init__(self, mods: List[Dict], root_folder: str, max_downloads: int = DEFAULT_MAX_DOWNLOADS,
+                 max_downloads_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST, cache: Optional[ArchiveCache] = None,
+                 manifest: Optional[InstallManifest] = None, memory_extract_mb: int = DEFAULT_MEMORY_EXTRACT_MB,
+                 order: str = ORDER_LIST, bandwidth_limit_kbps: int = 0, tracer: Optional[TraceWriter] = None,
+                 production_folder: Optional[str] = None):
         super().__init__()
-        self.mods = mods  # [{url, target, category}]
+        self.mods = mods  # [{url, target, category, size?, priority?}]
         self.root_folder = root_folder
-        self._is_cancelled = False
+        self.engine = DownloadEngine(root_folder, max_downloads, max_downloads_per_host, cache=cache, manifest=manifest,
+                                     memory_extract_mb=memory_extract_mb, order=order,
+                                     bandwidth_limit_kbps=bandwidth_limit_kbps, tracer=tracer,
+                                     production_folder=production_folder)
+        self.engine.progress = self.progress.emit
+        self.engine.finished_download = self.finished_download.emit
 
     def cancel(self):
-        self._is_cancelled = True
+        self.engine.cancel()
 
     def run(self):
-        for i, mod in enumerate(self.mods):
-            if self._is_cancelled:
-                break
-            url = mod['url']
-            target_folder = mod.get('target', self.root_folder)
-            category = mod.get('category')
-            
-            try:
-                self.progress.emit(f"Downloading {i+1}/{len(self.mods)}", i, len(self.mods))
-                response = requests.get(url, stream=True, timeout=60)
-                response.raise_for_status()
-                
-                # Get filename from headers or URL
-                filename = self._get_filename(response, url)
-                filepath = os.path.join(target_folder, filename)
-                
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if self._is_cancelled:
-                            break
-                        f.write(chunk)
-                
-                # Try to unpack if it's an archive
-                if filepath.endswith(('.zip', '.rar', '.7z')):
-                    self._unpack_archive(filepath, target_folder, category)
-
-                elif filepath.endswith('.blk') and category == 'mission':
-                    missions_dir = Path(self.root_folder) / "UserMissions"
-                    missions_dir.mkdir(parents=True, exist_ok=True)
-                    shutil.move(filepath, missions_dir / os.path.basename(filepath))
-                    
-                self.finished_download.emit(url, True, f"Downloaded: {filename}")
-            except Exception as e:
-                self.finished_download.emit(url, False, str(e))
-        
+        try:
+            self.engine.run(self.mods)
+        finally:
+            self.engine.session.close()
         self.all_done.emit()
 
-    def _get_filename(self, response, url: str) -> str:
-        cd = response.headers.get('content-disposition', '')
-        filename = None
-        
-        if cd and 'filename=' in cd:
-            # Extract value after 'filename='
-            raw_name = cd.split('filename=')[1]
-            
-            # Handle parameters that might follow (e.g., filename="name.zip"; size=123)
-            if ';' in raw_name:
-                raw_name = raw_name.split(';')[0]
-                
-            # Clean quotes and whitespace
-            filename = raw_name.strip().strip('"\'')
-            
-            # Decode URL encoding if present (e.g., UTF-8''filename.zip)
-            if filename:
-                filename = unquote(filename)
-
-        # 2. Validate Header Filename
-        # If header exists but is generic, then fall through to URL parsing
-        if filename and filename != 'mod_download.zip':
-            return filename
-
-        # 3. Fallback to the Actual Downloaded URL (response.url) 
-        final_url = response.url if hasattr(response, 'url') else url
-        parsed_path = urlparse(final_url).path
-        url_filename = os.path.basename(parsed_path)
-
-        # 4. Parse File Type and Name from URL
-        if url_filename:
-            if '?' in url_filename:
-                url_filename = url_filename.split('?')[0]
-                
-            if url_filename.endswith('.blk'):
-                return url_filename
-            # Return whatever extension was found (.zip, .rar, etc.)
-            return url_filename
 
-        # 5. Final Fallback
-        return 'mod_download.zip'
+class UpdateCheckThread(QThread):
+    """Thread for asking the server which installed mods changed, without blocking the UI."""
+    progress = pyqtSignal(str, int, int)  # message, current, total
+    checked = pyqtSignal(dict)  # url -> update status
+
+    def __init__(self, entries: Dict[str, Dict], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                 max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST):
+        super().__init__()
+        self.entries = entries  # url -> stored validators
+        self.max_requests = max_requests
+        self.max_requests_per_host = max_requests_per_host
+
+    def run(self):
+        results = check_for_updates(self.entries, self.max_requests, self.max_requests_per_host,
+                                    progress=self.progress.emit)
+        self.checked.emit(results)
+
+
+class HarvestThread(QThread):
+    """Thread for resolving every post found on a feed page into a download link."""
+    progress = pyqtSignal(str, int, int)  # message, current, total
+    harvested = pyqtSignal(list)  # one result dict per post, in page order
+
+    def __init__(self, post_urls: List[str], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                 max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST):
+        super().__init__()
+        self.post_urls = post_urls
+        self.max_requests = max_requests
+        self.max_requests_per_host = max_requests_per_host
+
+    def run(self):
+        results = resolve_posts(self.post_urls, self.max_requests, self.max_requests_per_host, progress=self.progress.emit)
+        self.harvested.emit(results)
+
+
+class PostLookupThread(QThread):
+    """Thread for reading the posts of uncategorized mods that the post cache doesn't know yet."""
+    progress = pyqtSignal(str, int, int)  # message, current, total
+    looked_up = pyqtSignal(list, list)  # entries looked up for, one result dict per post
+
+    def __init__(self, entries: List[ModEntry], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                 max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST):
+        super().__init__()
+        self.entries = entries
+        self.max_requests = max_requests
+        self.max_requests_per_host = max_requests_per_host
+
+    def run(self):
+        post_urls = list(dict.fromkeys(entry.extra['post'] for entry in self.entries))
+        results = lookup_posts(post_urls, self.max_requests, self.max_requests_per_host, progress=self.progress.emit)
+        self.looked_up.emit(self.entries, results)
+
+
+class ScanThread(QThread):
+    """Thread for indexing the mod folders without blocking the UI."""
+    scanned = pyqtSignal(dict, list)  # summary per folder, folders to watch
+
+    def __init__(self, index: FolderIndex, changed_paths: Optional[List[str]] = None):
+        super().__init__()
+        self.index = index
+        self.changed_paths = changed_paths  # None means a full (incremental) scan
+
+    def run(self):
+        if self.changed_paths is None:
+            self.index.scan()
+        else:
+            self.index.refresh(self.changed_paths)
+        self.index.save()
+        self.scanned.emit(self.index.summary(), self.index.watch_dirs())
 
-    '''The unpack_archive system works by filtering mods by category AND by checking for file structure in their .zip files. This means mods with 
-    loose .dds texture files get automatically placed inside of a folder rather than spilling out into the main UserSkins folder and it means that 
-    the .blk's are found inside of zipped sight mods and placed in the all tanks folder though that will change as needed to match the best general 
-    location for sights to be delivered. I will detail how to change this later on, use control+F and search for "all_tanks_change".'''
 
-    def _unpack_archive(self, filepath: str, target_folder: str, category: Optional[str] = None):
+class ImportThread(QThread):
+    """Thread for parsing a modlist file, hands the mods over in batches as they are read."""
+    batch = pyqtSignal(list)  # ModEntry list
+    imported = pyqtSignal(int, str)  # mods read, error message ('' on success)
+
+    def __init__(self, filepath: str):
+        super().__init__()
+        self.filepath = filepath
+
+    def run(self):
+        count = 0
         try:
-            if filepath.endswith('.zip'):
-                with zipfile.ZipFile(filepath, 'r') as zf:
-                    # Get all file paths in the zip (excluding directory entries)
-                    namelist = [name for name in zf.namelist() if not name.endswith('/')]
-                    
-                    if not namelist:
-                        return False  # Empty zip
-
-                    # Default extraction destination
-                    extract_to = target_folder
-
-                    # --- ONLY inspect structure for 'camo' category ---
-                    if category == 'camouflage':
-                        # Check if there's a folder structure inside
-                        # If ANY file contains a '/', it implies a folder structure exists
-                        has_folder_structure = any('/' in name for name in namelist)
-                            
-                        if not has_folder_structure:
-                        # No folder structure: Create a folder based on zip filename
-                            zip_name = os.path.splitext(os.path.basename(filepath))[0]
-                            extract_to = os.path.join(target_folder, zip_name)
-                            os.makedirs(extract_to, exist_ok=True)
-                    # -------------------------------------------------
-
-                    # Extract files based on category rules
-                    if category == 'sight':
-                        # For sights, extract only .blk files to the determined destination
-                        for file_info in namelist:
-                            if file_info.endswith('.blk'):
-                                zf.extract(file_info, extract_to)
-                    else:
-                        # For camo (and others), extract all files to the determined destination
-                        zf.extractall(extract_to)
-                
-                # Delete the zip after successful extraction
-                os.remove(filepath)
-                return True
-                
-            elif filepath.endswith('.rar'):
-                # Handle rar if needed
-                return True
-                
+            for entries in iter_batches(read_modlist(self.filepath)):
+                count += len(entries)
+                self.batch.emit(entries)
         except Exception as e:
-            # Keep the archive if unpacking fails (for debugging)
-            print(f"Extraction failed, keeping archive: {e}")
-            return False
-        
+            self.imported.emit(count, str(e))
+            return
+        self.imported.emit(count, '')
+
+
+class PreflightThread(QThread):
+    """Thread for checking every queued link (name, size, reachable) and the free disk space before a download starts."""
+    progress = pyqtSignal(str, int, int)  # message, current, total
+    checked = pyqtSignal(list, dict)  # one result per mod in order, summary
+
+    def __init__(self, mods: List[Dict], max_requests: int, max_requests_per_host: int, cache: Optional[ArchiveCache] = None,
+                 bandwidth_limit_kbps: int = 0):
+        super().__init__()
+        self.mods = mods
+        self.max_requests = max_requests
+        self.max_requests_per_host = max_requests_per_host
+        self.cache = cache
+        self.bandwidth_limit_kbps = bandwidth_limit_kbps
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        results = preflight(self.mods, self.max_requests, self.max_requests_per_host, cache=self.cache,
+                            progress=self.progress.emit, cancel_event=self.cancel_event)
+        if self.cancel_event.is_set():
+            return
+        try:
+            space = space_check(self.mods, results, str(self.cache.cache_dir) if self.cache is not None else None)
+        except OSError as e:
+            print(f"Could not check free space: {e}")
+            space = []
+        rate = estimated_rate(self.max_requests_per_host, self.bandwidth_limit_kbps)
+        self.checked.emit(results, summarize_preflight(results, space, rate))
+
+
+class ProfileSwitchThread(QThread):
+    """Thread for relinking the game folders to another profile's mods."""
+    progress = pyqtSignal(str, int, int)  # message, current, total
+    switched = pyqtSignal(dict)  # switch_profile result, plus 'error' if it failed part way
+
+    def __init__(self, profile: Dict, manifest: InstallManifest, mod_store: ModStore, targets: Dict[Optional[str], str]):
+        super().__init__()
+        self.profile = profile
+        self.manifest = manifest
+        self.mod_store = mod_store
+        self.targets = targets  # category -> folder, None for uncategorized
+
+    def run(self):
+        try:
+            result = switch_profile(self.profile, self.manifest, self.mod_store,
+                                    lambda category: self.targets.get(category) or self.targets[None],
+                                    progress=self.progress.emit)
+        except Exception as e:
+            self.manifest.save()
+            result = {'error': str(e)}
+        self.switched.emit(result)
+
+
+'''"+ Add Mod" used to pull the whole page through toHtml() and regex it in Python, which got slower the further an infinite scroll
+feed had been scrolled. This script runs inside the page instead (in its own JavaScript world, so the site's scripts can't interfere)
+and hands back only a small object: which feed the open post belongs to, its download links, title and preview image. The open post
+is the #clb lightbox when it is showing, otherwise the whole document is searched like before.'''
+EXTRACT_MOD_JS = """
+(function () {
+    var lightbox = document.getElementById('clb');
+    var scope = (lightbox && lightbox.style.display === 'block') ? lightbox : document;
+    var result = {feed: null, urls: [], title: null, image: null};
+    var feedLink = scope.querySelector('a[href*="/feed/camouflages/"], a[href*="/feed/missions/"], a[href*="/feed/sights/"]');
+    if (feedLink) {
+        result.feed = feedLink.getAttribute('href').split('/feed/')[1].replace(/\\/.*$/, '');
+    }
+    var seen = {};
+    var links = scope.querySelectorAll('a[href*="live.warthunder.com/dl/"], a[href*="/downloads/start/"]');
+    for (var i = 0; i < links.length; i++) {
+        var href = links[i].href;
+        if (!seen[href]) {
+            seen[href] = true;
+            result.urls.push(href);
+        }
+    }
+    var heading = scope.querySelector('h1, h2, .title, [class*="title"]');
+    if (heading && heading.textContent.trim()) {
+        result.title = heading.textContent.trim().slice(0, 200);
+    }
+    var image = scope.querySelector('img[src*="preview"], .image img, img');
+    if (image && image.src) {
+        result.image = image.src;
+    } else {
+        var og = document.querySelector('meta[property="og:image"]');
+        if (og) { result.image = og.content; }
+    }
+    return result;
+})();
+"""
+
+# Every post linked from the page as it stands, including posts an infinite scroll feed has loaded so far
+COLLECT_POSTS_JS = """
+(function () {
+    var seen = {}, posts = [];
+    var links = document.querySelectorAll('a[href*="/post/"]');
+    for (var i = 0; i < links.length; i++) {
+        var href = links[i].href.split('#')[0];
+        if (/\\/post\\/\\d+\\//.test(href) && !seen[href]) {
+            seen[href] = true;
+            posts.push(href);
+        }
+    }
+    return posts;
+})();
+"""
+
+PORTAL_HOME_URL = "https://live.warthunder.com/feed/all/"
+
+
+
+
+PRIORITY_LABELS = {1: "High", 0: "Normal", -1: "Low"}  # Download priority from the list's context menu
+CategorySortRole = Qt.ItemDataRole.UserRole + 1
+NameSortRole = Qt.ItemDataRole.UserRole + 2
+CATEGORY_ORDER = {CATEGORY_CAMO: 0, CATEGORY_MISSION: 1, CATEGORY_SIGHT: 2}
+PREVIEW_SIZE = QSize(64, 36)  # Preview icon in the download list
+LOGO_SIZE = QSize(180, 150)
+
+
+'''The download list is a model/view pair rather than a QListWidget. ModListModel holds no per-row objects, it reads straight from the
+ModList and builds the display text and tooltip only for rows the view actually paints, so thousands of mods cost next to nothing
+until they are scrolled into sight. A batch added to the ModList becomes a single beginInsertRows/endInsertRows.'''
+class ModListModel(QAbstractListModel):
+    """Qt model over a wtmo_modlist.ModList."""
+    def __init__(self, mod_list: ModList, thumbnails: Optional[ThumbnailLoader] = None, parent=None):
+        super().__init__(parent)
+        self.mod_list = mod_list
+        self._row_count = len(mod_list)  # What the view has been told about, only changed between begin/end calls
+        mod_list.subscribe(self._on_mod_list_changed)
+        # Preview icons: asked for only when a row is painted, rows show a blank icon until theirs is decoded
+        self.thumbnails = thumbnails
+        self._waiting: Dict[str, set] = {}  # preview source -> urls of rows waiting for it
+        self._blank_preview = QImage(PREVIEW_SIZE, QImage.Format.Format_ARGB32_Premultiplied)
+        self._blank_preview.fill(Qt.GlobalColor.transparent)
+        if thumbnails is not None:
+            thumbnails.ready.connect(self._on_thumbnail_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._row_count:
+            return None
+        entry = self.mod_list[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            display_name = self._category_prefix(entry.category) + entry.name
+            return display_name[:35] + "..." if len(display_name) > 35 else display_name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            priority = PRIORITY_LABELS.get((entry.extra or {}).get('priority', 0), "Normal")
+            return f"{entry.url}\nCategory: {entry.category or 'unknown'}\nPriority: {priority}"
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if entry.checked else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.DecorationRole and self.thumbnails is not None:
+            source = entry.extra.get('image') if entry.extra else None
+            if source:
+                image = self.thumbnails.get(source, PREVIEW_SIZE)
+                if image is not None:
+                    return image
+                self._waiting.setdefault(source, set()).add(entry.url)
+            return self._blank_preview
+        if role == Qt.ItemDataRole.UserRole:
+            return {'url': entry.url, 'category': entry.category}
+        if role == CategorySortRole:
+            return (CATEGORY_ORDER.get(entry.category, len(CATEGORY_ORDER)), entry.name.lower())
+        if role == NameSortRole:
+            return entry.name.lower()
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role == Qt.ItemDataRole.CheckStateRole and index.isValid():
+            checked = Qt.CheckState(value) == Qt.CheckState.Checked
+            self.mod_list.set_checked(self.mod_list[index.row()].url, checked)
+            return True
         return False
 
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsUserCheckable
+
+    def _category_prefix(self, category: Optional[str]) -> str:
+        # Category prefix for display
+        if category == CATEGORY_CAMO:
+            return "[CAMO] "
+        elif category == CATEGORY_MISSION:
+            return "[MISSION] "
+        elif category == CATEGORY_SIGHT:
+            return "[SIGHT] "
+        return ""
+
+    def _on_thumbnail_ready(self, source: str, image: QImage):
+        for url in self._waiting.pop(source, ()):
+            row = self.mod_list.row_of(url)
+            if row is not None and row < self._row_count:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def _on_mod_list_changed(self, kind: str, entries: List[ModEntry]):
+        if kind == MODS_ADDED:
+            first = self._row_count
+            self.beginInsertRows(QModelIndex(), first, len(self.mod_list) - 1)
+            self._row_count = len(self.mod_list)
+            self.endInsertRows()
+        elif kind == MODS_CHANGED:
+            for entry in entries:
+                row = self.mod_list.row_of(entry.url)
+                if row is not None:
+                    index = self.index(row)
+                    self.dataChanged.emit(index, index)  # Checked state, priority or a category found later
+        else:
+            # Removals and resets are rare, a model reset is simpler than tracking rows
+            self.beginResetModel()
+            self._row_count = len(self.mod_list)
+            self.endResetModel()
+
 
-'''current href reference, expandable as needed'''
-class ModWebPage(QWebEnginePage):
-    """Custom web page to handle download link detection."""
+class ModFilterProxy(QSortFilterProxyModel):
+    """Category filter and category / name sorting on top of ModListModel."""
     def __init__(self, parent=None):
         super().__init__(parent)
-        # Patterns for different mod sites
-        self.download_patterns = [
-            r'href=["\']?(https?://live\.warthunder\.com/dl/[^"\'>\s]+)',
-            r'href=["\']?(/downloads/start/\d+)',
-            r'href=["\']?(https?://[^"\'>\s]*download[^"\'>\s]*)',
-        ]
+        self.category: Optional[str] = None
+        self.setDynamicSortFilter(False)  # Re-sorting on every insert would defeat batched inserts
+
+    def set_category(self, category: Optional[str]):
+        self.category = category
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.category is None:
+            return True
+        return self.sourceModel().mod_list[source_row].category == self.category
+
+
+'''Every download run writes a timing trace (wtmo_trace, one JSONL file per run in ~/.mod_organizer_traces). The diagnostics panel
+shows the summary of the last run, or of any trace file opened, and can save it as a plain text report to attach to a bug report.'''
+class DiagnosticsDialog(QDialog):
+    """Summary of a download trace: where the time went, per host speeds and the slowest archives."""
+    def __init__(self, records: Optional[List[Dict]] = None, trace_path: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Download Diagnostics")
+        self.resize(900, 600)
+        self.trace_path = trace_path
+        layout = QVBoxLayout(self)
+        self.lbl_source = QLabel()
+        self.lbl_source.setStyleSheet("color: gray;")
+        self.report_text = QTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.report_text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        buttons = QHBoxLayout()
+        btn_open = QPushButton("Open Trace...")
+        btn_open.clicked.connect(self.open_trace)
+        btn_export = QPushButton("Export Report...")
+        btn_export.clicked.connect(self.export_report)
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(self.accept)
+        buttons.addWidget(btn_open)
+        buttons.addWidget(btn_export)
+        buttons.addStretch()
+        buttons.addWidget(btn_close)
+        layout.addWidget(self.lbl_source)
+        layout.addWidget(self.report_text, 1)
+        layout.addLayout(buttons)
+        if records is None and trace_path:
+            records = self._read(trace_path)
+        self.show_records(records or [], trace_path)
+
+    def show_records(self, records: List[Dict], trace_path: Optional[str]):
+        self.trace_path = trace_path
+        self.lbl_source.setText(trace_path or "No download trace yet")
+        self.report_text.setPlainText(format_report(summarize(records)) if records else
+                                      "Run a download to collect timings.")
 
+    def open_trace(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Open Download Trace", self.trace_path or "",
+                                                  "Download Traces (*.jsonl);;All Files (*)")
+        if filepath:
+            records = self._read(filepath)
+            if records is not None:
+                self.show_records(records, filepath)
+
+    def export_report(self):
+        filepath, _ = QFileDialog.getSaveFileName(self, "Export Diagnostics Report", "wtmo_diagnostics.txt",
+                                                  "Text Files (*.txt)")
+        if not filepath:
+            return
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(f"{self.lbl_source.text()}\n\n{self.report_text.toPlainText()}\n")
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to export: {e}")
 
-# Category constants
-CATEGORY_CAMO = "camouflage"
-CATEGORY_MISSION = "mission"
-CATEGORY_SIGHT = "sight"
-VALID_CATEGORIES = {CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT}
+    def _read(self, filepath: str) -> Optional[List[Dict]]:
+        try:
+            return list(read_trace(filepath))
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.critical(self, "Error", f"Failed to read trace: {e}")
+            return None
 
 
+'''The web portal (Qt WebEngine, i.e. a whole Chromium) used to be built and pointed at the live feed inside init_ui, so the window
+could not appear until Chromium had started. Now the center panel starts as a placeholder and wtmo_webportal is only imported after
+the window's first paint (or as soon as something needs the portal), eager_web_portal=True brings back the old behaviour for
+bench_startup.py to compare against.'''
 class ModOrganizer(QMainWindow):
-    def __init__(self):
+    first_painted = pyqtSignal()
+    web_portal_ready = pyqtSignal()
+
+    def __init__(self, eager_web_portal: bool = False):
         super().__init__()
+        self.web_view = None  # Created by _ensure_web_portal
+        self.web_page = None
+        self._painted = False
         self.root_folder = ""  # Game root folder
         self.production_folder = ""  # Production folder for sights
-        self.mod_list: List[Dict] = []  # [{url, name, checked, category}]
-        self.master_list: List[str] = []
+        self.mod_list = ModList()  # Download list: url-indexed ModEntry records with category buckets
+        self.thumbnails = ThumbnailLoader(parent=self)  # Logo and preview images, decoded off the UI thread
+        self.thumbnails.ready.connect(self._on_thumbnail_ready)
+        self._logo_source: Optional[str] = None
+        self.mod_model = ModListModel(self.mod_list, self.thumbnails)
         self.download_thread: Optional[DownloadThread] = None
+        self.mod_store = ModStore()  # Files of mods switched out of the game folders, linked back in by profiles
+        self.profile_thread: Optional[ProfileSwitchThread] = None
+        self.active_profile: Optional[str] = None
+        self._stopping_threads: List[DownloadThread] = []  # Cancelled, still winding down in the background
         self.has_sight_mods = False  # Track if sights were downloaded
+        self.max_downloads = DEFAULT_MAX_DOWNLOADS  # Total parallel downloads
+        self.max_downloads_per_host = DEFAULT_MAX_DOWNLOADS_PER_HOST  # Parallel downloads against one site
+        self.cache_enabled = True  # Keep downloaded archives for fast reinstalls
+        self.cache_budget_mb = DEFAULT_CACHE_BUDGET_MB  # Disk the archive cache may use before evicting old archives
+        self.memory_extract_mb = DEFAULT_MEMORY_EXTRACT_MB  # Zips up to this size are downloaded and unpacked in memory
+        self.download_order = ORDER_LIST  # Queue order: 'list' or 'smallest' (priorities always go first)
+        self.bandwidth_limit_kbps = 0  # Combined download speed cap in KB/s, 0 for none
+        self.trace_enabled = True  # Write per-mod timings of each download run for the diagnostics panel
+        self.preflight_enabled = True  # Check links, sizes and free space before a batch starts
+        self.preflight_thread: Optional[PreflightThread] = None
+        self.last_tracer: Optional[TraceWriter] = None
+        self.archive_cache: Optional[ArchiveCache] = None
+        self.store = SettingsStore()  # Folders, master list (url + category) and download metadata
+        self._download_categories: Dict[str, Optional[str]] = {}  # url -> category of the batch being downloaded
+        self.update_thread: Optional[UpdateCheckThread] = None
+        self.harvest_thread: Optional[HarvestThread] = None
+        self.lookup_thread: Optional[PostLookupThread] = None
+        self._lookup_pending: List[ModEntry] = []  # Uncategorized mods whose post still has to be read
+        self.manifest = InstallManifest()  # url -> files each mod installed
+        self.folder_index = FolderIndex()  # What is actually on disk in the mod folders
+        self.folder_summary: Dict[str, Dict] = {}
+        self.scan_thread: Optional[ScanThread] = None
+        self.import_thread: Optional[ImportThread] = None
+        self._imported_count = 0
+        self._pending_scan_paths = set()
+        self.fs_watcher = QFileSystemWatcher(self)
+        self.fs_watcher.directoryChanged.connect(self._on_mod_folder_changed)
+        self.scan_timer = QTimer(self)  # Batches bursts of file events (e.g. a camo pack extracting) into one refresh
+        self.scan_timer.setSingleShot(True)
+        self.scan_timer.setInterval(750)
+        self.scan_timer.timeout.connect(self._run_pending_scan)
 
         # Mod folder paths (set after root folder selection)
         self.user_skins_folder = ""
@@ -229,6 +554,32 @@ class ModOrganizer(QMainWindow):
         
         self.init_ui()
         self.load_settings()
+        self._refresh_profiles()
+        self.recover_installs()
+        self.start_folder_scan()
+        if eager_web_portal:
+            self._ensure_web_portal()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_painted.emit()
+            # Let this frame reach the screen before Chromium starts up
+            QTimer.singleShot(0, self._ensure_web_portal)
+
+    def _ensure_web_portal(self) -> bool:
+        """Create the web portal if it doesn't exist yet. Returns False if it was only just created (nothing is loaded in it)."""
+        if self.web_view is not None:
+            return True
+        from wtmo_webportal import create_web_view
+        self.web_view, self.web_page = create_web_view()
+        self.web_view.urlChanged.connect(lambda url: self.url_input.setText(url.toString()))
+        self.center_layout.replaceWidget(self.web_placeholder, self.web_view)
+        self.web_placeholder.deleteLater()
+        self.web_view.setUrl(QUrl(self.url_input.text().strip() or PORTAL_HOME_URL))
+        self.web_portal_ready.emit()
+        return False
 
     def init_ui(self):
         self.setWindowTitle("War Thunder Mod Organizer")
@@ -259,11 +610,28 @@ class ModOrganizer(QMainWindow):
         
         self.lbl_root_path = QLabel("No folder selected")
         self.lbl_root_path.setStyleSheet("color: gray; font-style: italic;")
+
+        self.combo_profile = QComboBox()
+        self.combo_profile.setMinimumWidth(160)
+        self.combo_profile.setToolTip("Switch the installed mods to a saved profile")
+        self.combo_profile.activated.connect(self._on_profile_chosen)
+
+        self.btn_save_profile = QPushButton("Save Profile")
+        self.btn_save_profile.setFixedHeight(35)
+        self.btn_save_profile.clicked.connect(self.save_profile)
+
+        self.btn_delete_profile = QPushButton("Delete Profile")
+        self.btn_delete_profile.setFixedHeight(35)
+        self.btn_delete_profile.clicked.connect(self.delete_profile)
         
         top_bar.addWidget(self.btn_find_root)
         top_bar.addWidget(self.btn_export)
         top_bar.addWidget(self.btn_import)
         top_bar.addWidget(self.lbl_root_path, 1)
+        top_bar.addWidget(QLabel("Profile:"))
+        top_bar.addWidget(self.combo_profile)
+        top_bar.addWidget(self.btn_save_profile)
+        top_bar.addWidget(self.btn_delete_profile)
         
         main_layout.addLayout(top_bar)
         ''' A small, now intentional issue, exists where the portal is smaller than it could be, this causes it to look slightly 
@@ -311,28 +679,30 @@ class ModOrganizer(QMainWindow):
         self.url_label = QLabel("URL:")
         from PyQt6.QtWidgets import QLineEdit
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("https://live.warthunder.com/feed/all/")
+        self.url_input.setPlaceholderText(PORTAL_HOME_URL)
         self.url_input.returnPressed.connect(self.navigate_to_url)
         self.btn_go = QPushButton("Go")
         self.btn_go.clicked.connect(self.navigate_to_url)
         self.btn_add_mod = QPushButton("+ Add Mod")
         self.btn_add_mod.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
         self.btn_add_mod.clicked.connect(self.add_mod_from_page)
+        self.btn_add_all = QPushButton("+ Add All on Page")
+        self.btn_add_all.setToolTip("Add every camouflage, mission and sight post linked from this feed, search or author page")
+        self.btn_add_all.clicked.connect(self.add_all_from_page)
         
         url_bar.addWidget(self.url_label)
         url_bar.addWidget(self.url_input, 1)
         url_bar.addWidget(self.btn_go)
         url_bar.addWidget(self.btn_add_mod)
+        url_bar.addWidget(self.btn_add_all)
         
         center_layout.addLayout(url_bar)
         
-        # Web View
-        self.web_view = QWebEngineView()
-        self.web_page = ModWebPage(self.web_view)
-        self.web_view.setPage(self.web_page)
-        self.web_view.setUrl(QUrl("https://live.warthunder.com/feed/all/"))
-        self.web_view.urlChanged.connect(lambda url: self.url_input.setText(url.toString()))
-        center_layout.addWidget(self.web_view, 1)
+        # Web View, swapped in for the placeholder by _ensure_web_portal
+        self.center_layout = center_layout
+        self.web_placeholder = QLabel("Loading web portal...")
+        self.web_placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        center_layout.addWidget(self.web_placeholder, 1)
         
         # -- RIGHT PANEL (Download List) --
         right_panel = QWidget()
@@ -345,14 +715,40 @@ class ModOrganizer(QMainWindow):
         right_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
         right_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
-        self.mod_listwidget = QListWidget()
-        self.mod_listwidget.setAlternatingRowColors(True)
+        # Filter / sort controls for the list
+        list_controls = QHBoxLayout()
+        self.combo_category_filter = QComboBox()
+        self.combo_category_filter.addItem("All", None)
+        self.combo_category_filter.addItem("Camouflage", CATEGORY_CAMO)
+        self.combo_category_filter.addItem("Missions", CATEGORY_MISSION)
+        self.combo_category_filter.addItem("Sights", CATEGORY_SIGHT)
+        self.combo_category_filter.currentIndexChanged.connect(
+            lambda: self.mod_proxy.set_category(self.combo_category_filter.currentData()))
+        self.combo_sort = QComboBox()
+        self.combo_sort.addItems(["List Order", "Category", "Name"])
+        self.combo_sort.currentIndexChanged.connect(self._on_sort_changed)
+        list_controls.addWidget(self.combo_category_filter, 1)
+        list_controls.addWidget(self.combo_sort, 1)
+
+        self.mod_proxy = ModFilterProxy(self)
+        self.mod_proxy.setSourceModel(self.mod_model)
+
+        self.mod_listview = QListView()
+        self.mod_listview.setModel(self.mod_proxy)
+        self.mod_listview.setAlternatingRowColors(True)
+        self.mod_listview.setUniformItemSizes(True)
+        self.mod_listview.setIconSize(PREVIEW_SIZE)
+        self.mod_listview.setLayoutMode(QListView.LayoutMode.Batched)
+        self.mod_listview.setBatchSize(200)
+        self.mod_listview.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.mod_listview.customContextMenuRequested.connect(self._show_mod_context_menu)
         
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         
         right_layout.addWidget(right_label)
-        right_layout.addWidget(self.mod_listwidget, 1)
+        right_layout.addLayout(list_controls)
+        right_layout.addWidget(self.mod_listview, 1)
         right_layout.addWidget(self.progress_bar)
         
         # Add panels to splitter
@@ -370,6 +766,15 @@ class ModOrganizer(QMainWindow):
         
         self.btn_show_modlist = QPushButton("Show Full Modlist")
         self.btn_show_modlist.clicked.connect(self.show_full_modlist)
+
+        self.btn_check_updates = QPushButton("Check for Updates")
+        self.btn_check_updates.clicked.connect(self.check_for_updates)
+
+        self.btn_on_disk = QPushButton("Installed on Disk")
+        self.btn_on_disk.clicked.connect(self.show_installed_on_disk)
+
+        self.btn_diagnostics = QPushButton("Diagnostics")
+        self.btn_diagnostics.clicked.connect(self.show_diagnostics)
         
         self.btn_cancel = QPushButton("Cancel/Clear List")
         self.btn_cancel.setStyleSheet("background-color: #f44336; color: white;")
@@ -380,6 +785,9 @@ class ModOrganizer(QMainWindow):
         self.btn_download_all.clicked.connect(self.download_all)
         
         bottom_bar.addWidget(self.btn_show_modlist)
+        bottom_bar.addWidget(self.btn_check_updates)
+        bottom_bar.addWidget(self.btn_on_disk)
+        bottom_bar.addWidget(self.btn_diagnostics)
         bottom_bar.addWidget(self.btn_cancel)
         bottom_bar.addStretch()
         bottom_bar.addWidget(self.btn_download_all)
@@ -391,7 +799,9 @@ class ModOrganizer(QMainWindow):
         url = self.url_input.text().strip()
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
-        self.web_view.setUrl(QUrl(url))
+        self.url_input.setText(url)
+        if self._ensure_web_portal():
+            self.web_view.setUrl(QUrl(url))
     ''' currently works but could be modified by other devs to just target a specific route 
     like if the game only exists on windows and has all it's mods saved in documents, stellaris 
     for example could work fine with a hard coded path, but it's case by case.
@@ -429,6 +839,7 @@ class ModOrganizer(QMainWindow):
                 os.makedirs(self.all_tanks_folder, exist_ok=True)
             
             self.save_settings()
+            self.start_folder_scan()
     ''' The download process does change based on the game, a simplified version of the setup exists for mod sites that lack mod categories or 
     only have one destination for mods to be deployed and thus categories loose relevance, please refer to github examples for different download 
     and installation setups or feel free to make your'''
@@ -447,140 +858,429 @@ class ModOrganizer(QMainWindow):
      - Delete this '''
     def add_mod_from_page(self):
         """Extract download links from current page and add to list."""
-        self.web_page.toHtml(self._process_html_for_downloads)
-
-    def _process_html_for_downloads(self, html: str):
-        """Process HTML to find download links and detect category."""
-        # Detect category from page
-        category = None
-        lightbox_match = re.search(
-            r'<div id="clb".*?style="display:\s*block;".*?>(.*?)</div>\s*</div>',
-            html,
-            re.IGNORECASE | re.DOTALL
-    )
-        search_area = lightbox_match.group(1) if lightbox_match else html
-        category_patterns = [
-#            (r'class="category">added camouflage</a>', CATEGORY_CAMO),
-#            (r'class="category">added mission</a>', CATEGORY_MISSION),
-#            (r'class="category">added sight</a>', CATEGORY_SIGHT),
-            (r'href="/feed/camouflages/"', CATEGORY_CAMO),
-            (r'href="/feed/missions/"', CATEGORY_MISSION),
-            (r'href="/feed/sights/"', CATEGORY_SIGHT),
-#            (r'<a href="/feed/camouflages/" class="category">Added camouflage</a>', CATEGORY_CAMO),
-#            (r'<a href="/feed/missions/" class="category">Added mission</a>', CATEGORY_MISSION),
-#            (r'<a href="/feed/sights/" class="category">Added sight</a>', CATEGORY_SIGHT),
-        ]
-
-        for pattern, cat in category_patterns:
-#            if re.search(pattern, html, re.IGNORECASE):
-            if re.search(pattern, search_area, re.IGNORECASE):
-                category = cat
-                break
-        
+        if not self._ensure_web_portal():
+            return
+        from wtmo_webportal import APPLICATION_WORLD
+        self.web_page.runJavaScript(EXTRACT_MOD_JS, APPLICATION_WORLD, self._process_page_extract)
+
+    def _process_page_extract(self, result):
+        """Add the open post's download link using what EXTRACT_MOD_JS found on the page."""
+        if not isinstance(result, dict):
+            QMessageBox.warning(self, "No Downloads", "Could not read this page.\nTry again once it has finished loading.")
+            return
+
+        category = FEED_CATEGORIES.get(result.get('feed') or '')
+        page_post = self.web_view.url().toString() if self.web_view is not None else ''
+        if category is None and post_id(page_post):
+            # The lightbox isn't showing the feed link, the post cache may still know this post
+            cached = self.store.post_meta([post_id(page_post)]).get(post_id(page_post))
+            if cached:
+                category = cached['category']
+                result = dict(result, urls=result.get('urls') or [cached['url']], title=result.get('title') or cached['title'])
         # Check for unsupported categories
         if category is None:
-#            other_category = re.search(r'<a href="/feed/>([^<]+)"</a>', html, re.IGNORECASE)
-#            if other_category:
-#                QMessageBox.warning(self, "Incorrect Mod Class", 
-#                    "Incorrect Mod Class, Mod Organizer only handles Camouflage, Mission and Sight mods, sorry.")
             QMessageBox.warning(self, "Incorrect Mod Category",
                 "Incorrect Mod Category, Mod Organizer only handles Camouflage, Mission, and Sight mods, sorry. Please click on a handled mod post then click add mod")
             return
-        
-        # Find download URLs
-        download_patterns = [
-            r'href=["\']?(https://live\.warthunder\.com/dl/[^"\'>\s]+)',
-            r'href=["\']?(/downloads/start/\d+)',
-        ]
-        
-        found_urls = []
-        current_url = self.web_view.url().toString()
-        base_url = f"{urlparse(current_url).scheme}://{urlparse(current_url).netloc}"
-        
-        for pattern in download_patterns:
-            matches = re.findall(pattern, html, re.IGNORECASE)
-            for match in matches:
-                url = match if match.startswith('http') else base_url + match
-                if url not in [m['url'] for m in self.mod_list]:
-                    found_urls.append(url)
-        
+
+        found_urls = [url for url in result.get('urls') or [] if url not in self.mod_list]
         if found_urls:
-            for url in found_urls[:1]:
-                self._add_mod_to_list(url, category)
-            QMessageBox.information(self, "Mods Found", f"Added {len(found_urls[:1])} {category or 'unknown'} mod(s)")
+            extra = {key: result[key] for key in ('title', 'image') if result.get(key)}
+            if post_id(page_post):
+                extra['post'] = page_post
+                self.store.update_post_meta([{'post_id': post_id(page_post), 'post_url': page_post, 'url': found_urls[0],
+                                              'category': category, 'title': result.get('title'),
+                                              'image': result.get('image')}])
+            self.mod_list.add_many([ModEntry(found_urls[0], category, result.get('title'), extra=extra or None)])
+            QMessageBox.information(self, "Mods Found", f"Added 1 {category} mod")
         else:
             QMessageBox.warning(self, "No Downloads", "No download links found on this page.\nTry navigating to a mod's download page.")
 
+    '''Bulk add: the page only supplies the post links, each post page is then fetched in the background (wtmo_harvest) to find its
+    category and download link, and everything found goes into the list as one batch.'''
+    def add_all_from_page(self):
+        if self.harvest_thread and self.harvest_thread.isRunning():
+            QMessageBox.warning(self, "Busy", "Still collecting the posts from the last page.")
+            return
+        if not self._ensure_web_portal():
+            return
+        from wtmo_webportal import APPLICATION_WORLD
+        self.web_page.runJavaScript(COLLECT_POSTS_JS, APPLICATION_WORLD, self._start_harvest)
+
+    def _start_harvest(self, post_urls):
+        post_urls = [url for url in post_urls or [] if isinstance(url, str)]
+        if not post_urls:
+            QMessageBox.warning(self, "No Posts", "No mod posts found on this page.\nTry a feed, search or author page.")
+            return
+        self.btn_add_all.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setMaximum(len(post_urls))
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage(f"Resolving {len(post_urls)} posts...")
+        self.harvest_thread = HarvestThread(post_urls, self.max_downloads, self.max_downloads_per_host)
+        self.harvest_thread.progress.connect(self._on_download_progress)
+        self.harvest_thread.harvested.connect(self._on_harvested)
+        self.harvest_thread.start()
+
+    def _on_harvested(self, results: list):
+        self.btn_add_all.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.store.update_post_meta(records_from_results(results))
+        added = self.mod_list.add_many(harvested_entries(results))
+        skipped = sum(1 for result in results if not result['url'])
+        message = f"Added {len(added)} mod(s) from {len(results)} post(s)."
+        if len(added) < len(results) - skipped:
+            message += f"\n{len(results) - skipped - len(added)} were already in the list."
+        if skipped:
+            message += f"\n{skipped} post(s) were skipped (unsupported category, no download link or unreachable)."
+        self.statusBar().showMessage(f"Added {len(added)} mod(s) from this page")
+        QMessageBox.information(self, "Mods Found", message)
+
     def _add_mod_to_list(self, url: str, category: Optional[str] = None):
-        """Add a mod URL to the download list with category."""
-        mod_name = urlparse(url).path.split('/')[-1] or f"Mod {len(self.mod_list)+1}"
-        mod_entry = {'url': url, 'name': mod_name, 'checked': True, 'category': category}
-        self.mod_list.append(mod_entry)
-        
-        # Category prefix for display
-        cat_prefix = ""
-        if category == CATEGORY_CAMO:
-            cat_prefix = "[CAMO] "
-        elif category == CATEGORY_MISSION:
-            cat_prefix = "[MISSION] "
-        elif category == CATEGORY_SIGHT:
-            cat_prefix = "[SIGHT] "
-        
-        item = QListWidgetItem()
-        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
-        item.setCheckState(Qt.CheckState.Checked)
-        display_name = cat_prefix + mod_name
-        item.setText(display_name[:35] + "..." if len(display_name) > 35 else display_name)
-        item.setToolTip(f"{url}\nCategory: {category or 'unknown'}")
-        item.setData(Qt.ItemDataRole.UserRole, {'url': url, 'category': category})
-        self.mod_listwidget.addItem(item)
+        """Add a mod URL to the download list with category, looked up in the post cache if none is given."""
+        entry = ModEntry(url, category)
+        apply_cached([entry], self.store)
+        self.mod_list.add_many([entry])
 
+    def _on_sort_changed(self, choice: int):
+        if choice == 0:
+            self.mod_proxy.sort(-1)  # Back to the order mods were added in
+        else:
+            self.mod_proxy.setSortRole(CategorySortRole if choice == 1 else NameSortRole)
+            self.mod_proxy.sort(0, Qt.SortOrder.AscendingOrder)
+
+    def _show_mod_context_menu(self, pos):
+        index = self.mod_listview.indexAt(pos)
+        if not index.isValid():
+            return
+        url = index.data(Qt.ItemDataRole.UserRole)['url']
+        entry = self.mod_list.get(url)
+        current_priority = (entry.extra or {}).get('priority', 0) if entry else 0
+        menu = QMenu(self)
+        priority_menu = menu.addMenu("Download Priority")
+        priority_actions = {}
+        for priority, label in PRIORITY_LABELS.items():
+            action = priority_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(priority == current_priority)
+            priority_actions[action] = priority
+        action_uninstall = menu.addAction("Uninstall Mod Files")
+        action_uninstall.setEnabled(self.manifest.is_installed(url))
+        chosen = menu.exec(self.mod_listview.viewport().mapToGlobal(pos))
+        if chosen == action_uninstall:
+            self.uninstall_mod(url)
+        elif chosen in priority_actions:
+            self.mod_list.set_priority(url, priority_actions[chosen])
+
+    ''' Uninstalling only touches files recorded in the install manifest, mods installed before the manifest existed have to be removed
+    by hand (or reinstalled once so they get recorded). Files another installed mod also wrote are left alone.'''
+    def uninstall_mod(self, url: str):
+        if self._downloads_busy():
+            QMessageBox.warning(self, "Busy", "Please wait for the current downloads to finish.")
+            return
+        file_count = len(self.manifest.files(url))
+        reply = QMessageBox.question(self, "Uninstall Mod", f"Delete the {file_count} file(s) installed by:\n{url}")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        removed, kept = self.manifest.uninstall(url)
+        self.store.remove_mod(url)
+        message = f"Removed {removed} file(s)."
+        if kept:
+            message += f"\n{kept} file(s) were kept because another installed mod also uses them."
+        QMessageBox.information(self, "Uninstalled", message)
+
+    '''Cancelling never blocks the window: the engine aborts its sockets and the thread winds down on its own (normally within
+    milliseconds, at worst REQUEST_TIMEOUT for a request still waiting on its headers). The list is cleared and a new batch can be
+    started straight away, the old thread is kept alive in _stopping_threads and only records the mods it did finish.
+    A link check still running is told to stop and its result is dropped, nothing from the cleared list gets downloaded.'''
     def cancel_clear_list(self):
-        if self.download_thread and self.download_thread.isRunning():
-            self.download_thread.cancel()
-            self.download_thread.wait()
+        checking = self.preflight_thread
+        if checking and checking.isRunning():
+            checking.progress.disconnect()
+            checking.checked.disconnect()
+            checking.cancel()
+            # Qt keeps it alive until the in-flight probes return, then it deletes itself
+            checking.setParent(self)
+            checking.finished.connect(checking.deleteLater)
+        if checking is not None:
+            self.btn_download_all.setEnabled(True)
+            self.preflight_thread = None
+        thread = self.download_thread
+        if thread and thread.isRunning():
+            categories = dict(self._download_categories)
+            thread.progress.disconnect(self._on_download_progress)
+            thread.finished_download.disconnect(self._on_download_finished)
+            thread.all_done.disconnect(self._on_all_downloads_done)
+            thread.finished_download.connect(
+                lambda url, success, message: success and self.store.add_mod(url, categories.get(url)))
+            thread.all_done.connect(lambda: self._on_download_cancelled(thread))
+            self._stopping_threads.append(thread)
+            thread.cancel()
+            self.download_thread = None
+            self.statusBar().showMessage("Cancelling downloads...")
+            if thread.isFinished():
+                # It finished on its own just now, its all_done may already have been delivered to the old handler
+                QTimer.singleShot(0, lambda: self._on_download_cancelled(thread))
         self.mod_list.clear()
-        self.mod_listwidget.clear()
         self.progress_bar.setVisible(False)
+
+    def _on_download_cancelled(self, thread: DownloadThread):
+        if thread not in self._stopping_threads:
+            return
+        self._stopping_threads.remove(thread)
+        self.store.update_download_meta(thread.engine.validators)
+        latency = thread.engine.cancel_latency
+        self.statusBar().showMessage(f"Downloads cancelled, stopped after {latency:.2f} s" if latency is not None
+                                     else "Downloads cancelled")
+
+    def _downloads_busy(self) -> bool:
+        return (bool(self.download_thread and self.download_thread.isRunning()) or bool(self._stopping_threads)
+                or bool(self.profile_thread and self.profile_thread.isRunning()))
+
+    ''' Profiles: saving one records the mods installed right now and the folders each category goes to. Switching unlinks every
+    installed mod the profile doesn't have (its files are kept in the shared mod store first) and links the profile's mods back in from
+    the store, see wtmo_profiles. Mods the store has never seen are put in the download list instead.'''
+    def _refresh_profiles(self):
+        self.combo_profile.clear()
+        self.combo_profile.addItem("(no profile)")
+        names = self.store.profiles()
+        self.combo_profile.addItems(names)
+        if self.active_profile in names:
+            self.combo_profile.setCurrentIndex(names.index(self.active_profile) + 1)
+        self.btn_delete_profile.setEnabled(bool(names))
+
+    def _profile_targets(self) -> Dict[str, str]:
+        targets = {CATEGORY_CAMO: self.user_skins_folder, CATEGORY_MISSION: self.user_missions_folder,
+                   CATEGORY_SIGHT: self.all_tanks_folder}
+        return {category: folder for category, folder in targets.items() if folder}
+
+    def save_profile(self):
+        installed = self.manifest.installed()
+        if not installed:
+            QMessageBox.information(self, "Save Profile", "No mods are installed yet, install the mods for this profile first.")
+            return
+        name, ok = QInputDialog.getText(self, "Save Profile", f"Profile name for the {len(installed)} installed mods:",
+                                        text=self.active_profile or "")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if name in self.store.profiles() and name != self.active_profile:
+            reply = QMessageBox.question(self, "Save Profile", f"Replace the existing profile \"{name}\"?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self.store.save_profile(name, ((url, entry['category']) for url, entry in installed.items()), self._profile_targets())
+        self.active_profile = name
+        self.store.set('active_profile', name)
+        self._refresh_profiles()
+        self.statusBar().showMessage(f"Saved profile \"{name}\" with {len(installed)} mods")
+
+    def delete_profile(self):
+        name = self.combo_profile.currentText() if self.combo_profile.currentIndex() > 0 else None
+        if not name:
+            return
+        reply = QMessageBox.question(self, "Delete Profile",
+            f"Delete the profile \"{name}\"? Installed mods stay installed.")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self.store.delete_profile(name)
+        if self.active_profile == name:
+            self.active_profile = None
+            self.store.set('active_profile', None)
+        # Stored mods no profile and no install needs any more
+        pruned = self.mod_store.prune(self.store.profile_urls() | set(self.manifest.installed()))
+        self._refresh_profiles()
+        self.statusBar().showMessage(f"Deleted profile \"{name}\", {pruned} stored mod(s) cleaned up")
+
+    def _on_profile_chosen(self, index: int):
+        name = self.combo_profile.itemText(index) if index > 0 else None
+        if name is None or name == self.active_profile:
+            return
+        if not self.root_folder:
+            QMessageBox.warning(self, "No Folder", "Please select a root mod folder first.")
+            self._refresh_profiles()
+            return
+        if self._downloads_busy():
+            QMessageBox.warning(self, "Busy", "Please wait for the current downloads to finish.")
+            self._refresh_profiles()
+            return
+        profile = self.store.profile(name)
+        if profile is None:
+            self._refresh_profiles()
+            return
+        targets: Dict[Optional[str], str] = {None: self.root_folder}
+        targets.update({category: folder for category, folder in self._profile_targets().items()})
+        targets.update({category: folder for category, folder in profile['targets'].items() if os.path.isdir(folder)})
+        self.combo_profile.setEnabled(False)
+        self.statusBar().showMessage(f"Switching to profile \"{name}\"...")
+        self.profile_thread = ProfileSwitchThread(profile, self.manifest, self.mod_store, targets)
+        self.profile_thread.progress.connect(lambda message, current, total: self.statusBar().showMessage(
+            f"{message} ({current}/{total})"))
+        self.profile_thread.switched.connect(lambda result: self._on_profile_switched(name, result, targets))
+        self.profile_thread.start()
+
+    def _on_profile_switched(self, name: str, result: Dict, targets: Dict[Optional[str], str]):
+        self.combo_profile.setEnabled(True)
+        self.start_folder_scan()
+        if 'error' in result:
+            self._refresh_profiles()
+            QMessageBox.critical(self, "Error", f"Switching to \"{name}\" stopped part way: {result['error']}")
+            return
+        self.active_profile = name
+        self.store.set('active_profile', name)
+        self._refresh_profiles()
+        links = ", ".join(f"{count} {mode}" for mode, count in result['links'].items()) or "no files"
+        self.statusBar().showMessage(f"Profile \"{name}\": {result['linked']} linked ({links}), "
+                                     f"{result['unlinked']} removed, {result['unchanged']} already installed")
+        if result['failed']:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Warning)
+            msg.setWindowTitle("Profile Switched")
+            msg.setText(f"{len(result['failed'])} mod(s) outside this profile couldn't be kept in the mod store and were left "
+                        "installed.")
+            msg.setDetailedText("\n".join(f"{mod['url']}\n  {mod['error']}" for mod in result['failed']))
+            msg.exec()
+        missing = result['missing']
+        if missing:
+            self.mod_list.add_many([(mod['url'], mod['category']) for mod in missing])
+            reply = QMessageBox.question(self, "Profile Switched",
+                f"{len(missing)} mod(s) of this profile have never been installed on this PC and were added to the download list. "
+                "Download them now?")
+            if reply == QMessageBox.StandardButton.Yes:
+                self._start_downloads([{'url': mod['url'], 'category': mod['category'],
+                                        'target': targets.get(mod['category']) or targets[None]} for mod in missing])
     ''' Probably needd to make a popup later when first launching that forces the user to go through the folder process... maybe... '''
     def download_all(self):
         if not self.root_folder:
             QMessageBox.warning(self, "No Folder", "Please select a root mod folder first.")
             return
         
-        # Collect mods with their target folders
-        mods_to_download = []  # [{url, target_folder, category}]
-        self.has_sight_mods = False
-        
-        for i in range(self.mod_listwidget.count()):
-            item = self.mod_listwidget.item(i)
-            if item.checkState() == Qt.CheckState.Checked:
-                data = item.data(Qt.ItemDataRole.UserRole)
-                url = data['url'] if isinstance(data, dict) else data
-                category = data.get('category') if isinstance(data, dict) else None
-                
-                # Determine target folder based on category
-                if category == CATEGORY_CAMO:
-                    target = self.user_skins_folder
-                elif category == CATEGORY_MISSION:
-                    target = self.user_missions_folder
-                elif category == CATEGORY_SIGHT:
-                    target = self.all_tanks_folder
-                    self.has_sight_mods = True
-                else:
-                    target = self.root_folder  # Fallback
-                
-                mods_to_download.append({'url': url, 'target': target, 'category': category})
+        # Collect mods with their target folders, plus what the scheduler orders them by
+        known_sizes = self.store.master_list_meta()
+        mods_to_download = []  # [{url, target_folder, category, size, priority}]
+        for entry in self.mod_list.checked():
+            extra = entry.extra or {}
+            mods_to_download.append({'url': entry.url, 'target': self._target_for_category(entry.category),
+                                     'category': entry.category, 'priority': extra.get('priority', 0),
+                                     'size': extra.get('size') or known_sizes.get(entry.url, {}).get('content_length')})
         
         if not mods_to_download:
             QMessageBox.warning(self, "No Mods", "No mods selected for download.")
             return
+
+        # Skip anything the install manifest already knows about unless the user wants it reinstalled
+        installed = [mod for mod in mods_to_download if self.manifest.is_installed(mod['url'])]
+        if installed:
+            reply = QMessageBox.question(self, "Already Installed",
+                f"{len(installed)} of the selected mods are already installed. Reinstall them too?\n"
+                "Choose No to only download the new ones.")
+            if reply != QMessageBox.StandardButton.Yes:
+                mods_to_download = [mod for mod in mods_to_download if not self.manifest.is_installed(mod['url'])]
+                if not mods_to_download:
+                    return
         
+        if self.preflight_enabled:
+            self._start_preflight(mods_to_download)
+        else:
+            self._start_downloads(mods_to_download)
+
+    ''' The preflight HEADs every link before anything is downloaded (wtmo_preflight), so dead links are dropped and a batch that can't
+    fit on the drive is stopped right away, and the real sizes feed the smallest-first download order. It costs one small request per
+    mod, mods in the archive cache cost nothing.'''
+    def _start_preflight(self, mods_to_download: List[Dict]):
+        if self.preflight_thread and self.preflight_thread.isRunning():
+            return
+        if self.cache_enabled and self.archive_cache is None:
+            self.archive_cache = ArchiveCache(self.cache_budget_mb)
+        self.btn_download_all.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setMaximum(len(mods_to_download))
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage(f"Checking {len(mods_to_download)} links...")
+        self.preflight_thread = PreflightThread(mods_to_download, self.max_downloads, self.max_downloads_per_host,
+                                                self.archive_cache if self.cache_enabled else None,
+                                                self.bandwidth_limit_kbps)
+        thread = self.preflight_thread
+        thread.progress.connect(self._on_download_progress)
+        thread.checked.connect(lambda results, summary: self._on_preflight_done(thread, mods_to_download, results, summary))
+        thread.start()
+
+    def _on_preflight_done(self, thread: PreflightThread, mods_to_download: List[Dict], results: List[Dict], summary: Dict):
+        if thread is not self.preflight_thread or thread.cancel_event.is_set():
+            return  # Cancelled, or the list was cleared while the links were being checked
+        self.btn_download_all.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        report = format_summary(summary)
+        details = "\n".join(f"{result['url']}\n  {result['error']}" for result in summary['failed'] + summary['unchecked'])
+        self.statusBar().showMessage(f"{summary['to_download']} to download, {format_size(summary['download_bytes'])}")
+
+        if not summary['space_ok']:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Critical)
+            msg.setWindowTitle("Not Enough Space")
+            msg.setText(f"The selected mods won't fit on the drive, nothing was downloaded.\n\n{report}")
+            if details:
+                msg.setDetailedText(details)
+            msg.exec()
+            return
+
+        remaining = []
+        for mod, result in zip(mods_to_download, results):
+            if result['status'] == PREFLIGHT_FAILED:
+                continue
+            if result['size']:
+                mod['size'] = result['size']
+            remaining.append(mod)
+        if not remaining:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Warning)
+            msg.setWindowTitle("Nothing to Download")
+            msg.setText("None of the selected links can be downloaded.")
+            msg.setDetailedText(details)
+            msg.exec()
+            return
+
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Question)
+        msg.setWindowTitle("Ready to Download")
+        msg.setText(f"{report}\n\nStart the download?")
+        if details:
+            msg.setDetailedText(details)
+        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if msg.exec() == QMessageBox.StandardButton.Yes:
+            self._start_downloads(remaining)
+
+    def _target_for_category(self, category: Optional[str]) -> str:
+        """Determine target folder based on category."""
+        if category == CATEGORY_CAMO:
+            return self.user_skins_folder
+        elif category == CATEGORY_MISSION:
+            return self.user_missions_folder
+        elif category == CATEGORY_SIGHT:
+            return self.all_tanks_folder
+        return self.root_folder  # Fallback
+
+    def _start_downloads(self, mods_to_download: List[Dict]):
+        self._download_categories = {mod['url']: mod['category'] for mod in mods_to_download}
+        self.has_sight_mods = any(mod['category'] == CATEGORY_SIGHT for mod in mods_to_download)
         self.progress_bar.setVisible(True)
         self.progress_bar.setMaximum(len(mods_to_download))
         self.progress_bar.setValue(0)
         
-        self.download_thread = DownloadThread(mods_to_download, self.root_folder)
+        if self.cache_enabled and self.archive_cache is None:
+            self.archive_cache = ArchiveCache(self.cache_budget_mb)
+
+        self.last_tracer = None
+        if self.trace_enabled:
+            try:
+                self.last_tracer = TraceWriter()
+            except OSError as e:
+                print(f"Could not start download trace: {e}")
+
+        self.download_thread = DownloadThread(mods_to_download, self.root_folder,
+                                              self.max_downloads, self.max_downloads_per_host,
+                                              self.archive_cache if self.cache_enabled else None, self.manifest,
+                                              self.memory_extract_mb, self.download_order, self.bandwidth_limit_kbps,
+                                              self.last_tracer, self.production_folder or None)
         self.download_thread.progress.connect(self._on_download_progress)
         self.download_thread.finished_download.connect(self._on_download_finished)
         self.download_thread.all_done.connect(self._on_all_downloads_done)
@@ -592,13 +1292,26 @@ class ModOrganizer(QMainWindow):
 
     def _on_download_finished(self, url: str, success: bool, message: str):
         if success:
-            self.master_list.append(url)
+            self.store.add_mod(url, self._download_categories.get(url))
         self.progress_bar.setValue(self.progress_bar.value() + 1)
     '''Could be useful to swap this out with a click away popup rather than an okay-close popup'''
     def _on_all_downloads_done(self):
+        if self.download_thread is None:
+            return  # Cancelled, _on_download_cancelled takes care of it
         self.progress_bar.setVisible(False)
-        self.save_settings()
+        self.store.update_download_meta(self.download_thread.engine.validators)
         QMessageBox.information(self, "Complete", "All downloads finished!")
+
+        conflicts = self.download_thread.engine.conflicts
+        if conflicts:
+            details = "\n\n".join(f"{url}\n  overwrote files from:\n  " + "\n  ".join(others)
+                                   for url, others in conflicts.items())
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Warning)
+            msg.setWindowTitle("Mod Conflicts")
+            msg.setText(f"{len(conflicts)} mod(s) wrote files that another installed mod had already written.")
+            msg.setDetailedText(details)
+            msg.exec()
         
         # Show sight warning if any sight mods were downloaded
         if self.has_sight_mods:
@@ -609,14 +1322,153 @@ class ModOrganizer(QMainWindow):
     methods attempted failed, keep current setup till solution is found. Using seperate lists could work but would be clunky.'''
 
     
+    ''' Update checks only send conditional requests for mods we have an ETag / Last-Modified / size for, anything installed before
+    those were recorded shows up as "unknown" until it is downloaded once more. Changed mods skip the archive cache on the way back in.'''
+    def check_for_updates(self):
+        if not self.root_folder:
+            QMessageBox.warning(self, "No Folder", "Please select a root mod folder first.")
+            return
+        if self._downloads_busy() or (self.update_thread and self.update_thread.isRunning()):
+            QMessageBox.warning(self, "Busy", "Please wait for the current downloads or update check to finish.")
+            return
+
+        entries = self.store.master_list_meta()
+        if not entries:
+            QMessageBox.information(self, "Check for Updates", "No mods in master list yet.")
+            return
+
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setMaximum(len(entries))
+        self.progress_bar.setValue(0)
+        self.statusBar().showMessage(f"Checking {len(entries)} mods for updates...")
+
+        self.update_thread = UpdateCheckThread(entries, self.max_downloads, self.max_downloads_per_host)
+        self.update_thread.progress.connect(self._on_download_progress)
+        self.update_thread.checked.connect(self._on_updates_checked)
+        self.update_thread.start()
+
+    def _on_updates_checked(self, results: dict):
+        self.progress_bar.setVisible(False)
+        changed = [url for url, status in results.items() if status == UPDATE_CHANGED]
+        unknown = sum(1 for status in results.values() if status == UPDATE_UNKNOWN)
+        errors = sum(1 for status in results.values() if status == UPDATE_ERROR)
+
+        notes = ""
+        if unknown:
+            notes += f"\n{unknown} mod(s) have no update information yet."
+        if errors:
+            notes += f"\n{errors} mod(s) could not be checked."
+        self.statusBar().showMessage(f"{len(changed)} of {len(results)} mods changed upstream")
+
+        if not changed:
+            QMessageBox.information(self, "Check for Updates", f"All checked mods are up to date.{notes}")
+            return
+
+        reply = QMessageBox.question(self, "Updates Available",
+            f"{len(changed)} mod(s) changed upstream. Download and reinstall them now?{notes}")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        results_meta = self.store.master_list_meta()
+        mods_to_download = []
+        for url in changed:
+            category = results_meta.get(url, {}).get('category')
+            mods_to_download.append({'url': url, 'target': self._target_for_category(category),
+                                     'category': category, 'refresh': True})
+        self._start_downloads(mods_to_download)
+
+    ''' The folder index lives in wtmo_scanner, it is saved between runs so a restart only re-lists folders that changed. While the app
+    is open the file watcher sits on each mod folder and its first level of subfolders (one per skin), deeper changes are picked up on
+    the next start.'''
+    def recover_installs(self):
+        """Finish or throw away installs a crash interrupted, before the folders are scanned."""
+        finished, discarded = recover_staging([self.root_folder, self.production_folder])
+        if finished or discarded:
+            self.statusBar().showMessage(f"Recovered interrupted installs: {finished} finished, {discarded} discarded")
+
+    def start_folder_scan(self):
+        self.folder_index.set_roots([self.user_skins_folder, self.user_missions_folder, self.all_tanks_folder])
+        self._pending_scan_paths.clear()
+        self._start_scan_thread(None)
+
+    def _on_mod_folder_changed(self, path: str):
+        self._pending_scan_paths.add(path)
+        self.scan_timer.start()
+
+    def _run_pending_scan(self):
+        if self.scan_thread and self.scan_thread.isRunning():
+            self.scan_timer.start()  # Try again once the current scan is done
+            return
+        if self._pending_scan_paths:
+            paths = list(self._pending_scan_paths)
+            self._pending_scan_paths.clear()
+            self._start_scan_thread(paths)
+
+    def _start_scan_thread(self, changed_paths: Optional[List[str]]):
+        if self.scan_thread and self.scan_thread.isRunning():
+            if changed_paths is None:
+                self._pending_scan_paths.update(self.folder_index.roots)
+                self.scan_timer.start()
+            return
+        self.scan_thread = ScanThread(self.folder_index, changed_paths)
+        self.scan_thread.scanned.connect(self._on_folders_scanned)
+        self.scan_thread.start()
+
+    def _on_folders_scanned(self, summary: dict, watch_dirs: list):
+        self.folder_summary = summary
+        watched = set(self.fs_watcher.directories())
+        wanted = set(watch_dirs)
+        if watched - wanted:
+            self.fs_watcher.removePaths(list(watched - wanted))
+        if wanted - watched:
+            self.fs_watcher.addPaths(list(wanted - watched))
+        counts = []
+        for label, folder in (("skins", self.user_skins_folder), ("missions", self.user_missions_folder),
+                              ("sights", self.all_tanks_folder)):
+            info = summary.get(os.path.normpath(folder)) if folder else None
+            if info:
+                counts.append(f"{len(info['entries'])} {label}")
+        if counts:
+            self.statusBar().showMessage("On disk: " + ", ".join(counts))
+
+    def show_installed_on_disk(self):
+        if not self.folder_summary:
+            QMessageBox.information(self, "Installed on Disk", "The mod folders have not been scanned yet.")
+            return
+        display = ""
+        total_files = 0
+        for label, folder in (("UserSkins", self.user_skins_folder), ("UserMissions", self.user_missions_folder),
+                              ("all_tanks", self.all_tanks_folder)):
+            info = self.folder_summary.get(os.path.normpath(folder)) if folder else None
+            if not info:
+                continue
+            total_files += info['files']
+            display += f"[{label}] {len(info['entries'])} entries, {info['files']} files, {info['bytes'] / 1048576:.1f} MB\n"
+            for entry in info['entries']:
+                display += f"  {entry['name']}{'/' if entry['is_dir'] else ''}  ({entry['files']} files)\n"
+
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Installed on Disk")
+        msg.setText(f"Files in mod folders: {total_files}")
+        msg.setDetailedText(display.strip())
+        msg.exec()
+
+    def show_diagnostics(self):
+        if self.last_tracer is not None:
+            dialog = DiagnosticsDialog(self.last_tracer.records, self.last_tracer.path, self)
+        else:
+            dialog = DiagnosticsDialog(trace_path=latest_trace_file(), parent=self)
+        dialog.exec()
+
     def show_full_modlist(self):
-        if not self.master_list:
+        master_list = self.store.mods()
+        if not master_list:
             QMessageBox.information(self, "Modlist", "No mods in master list yet.")
             return
         
         # Group for display
         camos, missions, sights = [], [], []
-        for mod in self.master_list:
+        for mod in master_list:
             url = mod['url'] if isinstance(mod, dict) else mod
             category = mod.get('category') if isinstance(mod, dict) else None
             if category == CATEGORY_CAMO:
@@ -636,118 +1488,110 @@ class ModOrganizer(QMainWindow):
         
         msg = QMessageBox(self)
         msg.setWindowTitle("Full Modlist")
-        msg.setText(f"Total mods downloaded: {len(self.master_list)}")
+        msg.setText(f"Total mods downloaded: {len(master_list)}")
         msg.setDetailedText(display.strip())
         msg.exec()
 
     def export_modlist(self):
-        filepath, _ = QFileDialog.getSaveFileName(self, "Export Modlist", "modlist.txt", "Text (*.txt)")
+        filepath, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Modlist", "modlist.ndjson.gz", "Compressed Modlist (*.ndjson.gz);;Text (*.txt)")
         if filepath:
-            # Group mods by category
-            camos = []
-            missions = []
-            sights = []
-            
-            for mod in self.master_list:
-                url = mod['url'] if isinstance(mod, dict) else mod
-                category = mod.get('category') if isinstance(mod, dict) else None
-                
-                if category == CATEGORY_CAMO:
-                    camos.append(url)
-                elif category == CATEGORY_MISSION:
-                    missions.append(url)
-                elif category == CATEGORY_SIGHT:
-                    sights.append(url)
-            
-            # Write grouped format
-            with open(filepath, 'w') as f:
-                if camos:
-                    f.write("[CAMO]\n")
-                    for url in camos:
-                        f.write(f"{url}\n")
-                if missions:
-                    f.write("[MISSION]\n")
-                    for url in missions:
-                        f.write(f"{url}\n")
-                if sights:
-                    f.write("[SIGHT]\n")
-                    for url in sights:
-                        f.write(f"{url}\n")
-            
-            QMessageBox.information(self, "Exported", f"Modlist exported to {filepath}")
+            if selected_filter.startswith("Text") and not filepath.endswith('.txt'):
+                filepath += '.txt'
+            try:
+                # Rows stream off the database cursor straight into the file, grouped by category for the text format
+                rows = self.store.iter_mods_with_meta(group_by_category=filepath.endswith('.txt'))
+                count = write_modlist(filepath, export_records(rows))
+            except OSError as e:
+                QMessageBox.critical(self, "Error", f"Failed to export: {e}")
+                return
+            QMessageBox.information(self, "Exported", f"Modlist of {count} mods exported to {filepath}")
 
     def import_modlist(self):
-        filepath, _ = QFileDialog.getOpenFileName(self, "Import Modlist", "", "Text (*.txt);;JSON (*.json)")
+        if self.import_thread and self.import_thread.isRunning():
+            QMessageBox.warning(self, "Busy", "A modlist is already being imported.")
+            return
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Import Modlist", "", "Modlists (*.ndjson.gz *.ndjson *.txt *.json);;All Files (*)")
         if filepath:
-            try:
-                imported_count = 0
-                
-                if filepath.endswith('.txt'):
-                    # Parse grouped text format
-                    with open(filepath, 'r') as f:
-                        content = f.read()
-                    
-                    current_category = None
-                    for line in content.strip().split('\n'):
-                        line = line.strip()
-                        if not line:
-                            continue
-                        if line == "[CAMO]":
-                            current_category = CATEGORY_CAMO
-                        elif line == "[MISSION]":
-                            current_category = CATEGORY_MISSION
-                        elif line == "[SIGHT]":
-                            current_category = CATEGORY_SIGHT
-                        elif line.startswith('http'):
-                            if line not in [m['url'] for m in self.mod_list]:
-                                self._add_mod_to_list(line, current_category)
-                                imported_count += 1
-                else:
-                    # Legacy JSON format
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                    for mod in data.get('mods', []):
-                        url = mod['url'] if isinstance(mod, dict) else mod
-                        category = mod.get('category') if isinstance(mod, dict) else None
-                        if url not in [m['url'] for m in self.mod_list]:
-                            self._add_mod_to_list(url, category)
-                            imported_count += 1
-                
-                QMessageBox.information(self, "Imported", f"Imported {imported_count} mods")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to import: {e}")
-    '''If you have additional folders that need to be saved I would recommend adding to the list below so they are added to the .json settings file'''
-    def save_settings(self):
-        settings = {
-            'root_folder': self.root_folder,
-            'production_folder': self.production_folder,
-            'master_list': self.master_list
-        }
-        settings_path = Path.home() / '.mod_organizer_settings.json'
-        with open(settings_path, 'w') as f:
-            json.dump(settings, f)
-        '''note the path is likely going to be your C: / Users / USERNAME location, it'll be a .json file sitting in the main folder, 
-        you will also see folders for your desktop, onedrive, thunmbnails, save games, etc in here. If you Delete, Relocate or Modify 
-        the file name, you will need to do the setup process over again.'''
+            self._imported_count = 0
+            self.import_thread = ImportThread(filepath)
+            self.import_thread.batch.connect(self._on_import_batch)
+            self.import_thread.imported.connect(self._on_import_finished)
+            self.btn_import.setEnabled(False)
+            self.import_thread.start()
+
+    def _on_import_batch(self, entries: List[ModEntry]):
+        # Uncategorized mods take their category from the post cache before they are listed, so they sort and install right
+        unresolved = {id(entry) for entry in apply_cached(entries, self.store)}
+        # ModList drops urls that are already listed, duplicates inside the file included
+        added = self.mod_list.add_many(entries)
+        self._imported_count += len(added)
+        self._lookup_pending.extend(entry for entry in added if id(entry) in unresolved)
+
+    def _on_import_finished(self, read_count: int, error: str):
+        self.btn_import.setEnabled(True)
+        self._start_post_lookup()
+        if error:
+            QMessageBox.critical(self, "Error", f"Failed to import after {read_count} mods: {error}\n"
+                                 f"{self._imported_count} mods were added to the list.")
+        else:
+            QMessageBox.information(self, "Imported", f"Imported {self._imported_count} mods")
+
+    def _start_post_lookup(self):
+        """Read the posts of imported mods that are still uncategorized, in the background."""
+        if not self._lookup_pending or (self.lookup_thread and self.lookup_thread.isRunning()):
+            return  # A running lookup picks the rest up when it finishes
+        entries, self._lookup_pending = self._lookup_pending, []
+        self.statusBar().showMessage(f"Looking up {len(entries)} uncategorized mod(s)...")
+        self.lookup_thread = PostLookupThread(entries, self.max_downloads, self.max_downloads_per_host)
+        self.lookup_thread.progress.connect(lambda message, current, total: self.statusBar().showMessage(message))
+        self.lookup_thread.looked_up.connect(self._on_posts_looked_up)
+        self.lookup_thread.start()
+
+    def _on_posts_looked_up(self, entries: list, results: list):
+        self.store.update_post_meta(records_from_results(results))
+        changed = self.mod_list.set_categories(resolved_categories(entries, results))
+        self.statusBar().showMessage(f"Found the category of {len(changed)} of {len(entries)} uncategorized mod(s)")
+        self._start_post_lookup()
+
+    '''If you have additional folders that need to be saved I would recommend adding to the list below so they are added to the settings table'''
     def save_settings(self):
-        settings = {
+        self.store.set_many({
             'root_folder': self.root_folder,
             'production_folder': self.production_folder,
-            'master_list': self.master_list
-        }
-        settings_path = Path.home() / '.mod_organizer_settings.json'
-        with open(settings_path, 'w') as f:
-            json.dump(settings, f)
+            'max_downloads': self.max_downloads,
+            'max_downloads_per_host': self.max_downloads_per_host,
+            'cache_enabled': self.cache_enabled,
+            'cache_budget_mb': self.cache_budget_mb,
+            'memory_extract_mb': self.memory_extract_mb,
+            'download_order': self.download_order,
+            'bandwidth_limit_kbps': self.bandwidth_limit_kbps,
+            'trace_enabled': self.trace_enabled,
+            'preflight_enabled': self.preflight_enabled
+        })
+        '''note the path is likely going to be your C: / Users / USERNAME location, it'll be a .mod_organizer.db file sitting in the main folder,
+        you will also see folders for your desktop, onedrive, thunmbnails, save games, etc in here. If you Delete, Relocate or Modify
+        the file name, you will need to do the setup process over again. An old .mod_organizer_settings.json is imported into it on first start.
+        The master list and download info are not part of this save, they are written to the database as each mod finishes.'''
 
     def load_settings(self):
-        settings_path = Path.home() / '.mod_organizer_settings.json'
-        if settings_path.exists():
+        store = self.store
+        if store.get('root_folder') is not None or store.get('production_folder') is not None:
             try:
-                with open(settings_path, 'r') as f:
-                    settings = json.load(f)
-                self.root_folder = settings.get('root_folder', '')
-                self.production_folder = settings.get('production_folder', '')
-                self.master_list = settings.get('master_list', [])
+                self.root_folder = store.get('root_folder', '') or ''
+                self.production_folder = store.get('production_folder', '') or ''
+                self.max_downloads = int(store.get('max_downloads', DEFAULT_MAX_DOWNLOADS))
+                self.max_downloads_per_host = int(store.get('max_downloads_per_host', DEFAULT_MAX_DOWNLOADS_PER_HOST))
+                self.cache_enabled = bool(store.get('cache_enabled', True))
+                self.cache_budget_mb = int(store.get('cache_budget_mb', DEFAULT_CACHE_BUDGET_MB))
+                self.memory_extract_mb = int(store.get('memory_extract_mb', DEFAULT_MEMORY_EXTRACT_MB))
+                download_order = store.get('download_order', ORDER_LIST)
+                self.download_order = download_order if download_order in DOWNLOAD_ORDERS else ORDER_LIST
+                self.bandwidth_limit_kbps = max(0, int(store.get('bandwidth_limit_kbps', 0)))
+                self.trace_enabled = bool(store.get('trace_enabled', True))
+                self.preflight_enabled = bool(store.get('preflight_enabled', True))
+                self.active_profile = store.get('active_profile')
                 '''folder location is displayed on the GUI, it'll be in green if paths are set.'''
                 if self.root_folder:
                     self.lbl_root_path.setText(self.root_folder)
@@ -764,13 +1608,16 @@ class ModOrganizer(QMainWindow):
     ''' with the benefit of hindsight, finishing the artwork before making the MO was not the best idea... a 2560 by 1600 logo is a bit excessive. Edit logo size later'''
     
     def load_logo(self, image_path: str):
-        """Load a custom logo image (4:3 or 1:1 aspect ratio)."""
+        """Load a custom logo image (4:3 or 1:1 aspect ratio), decoded in the background at the panel's size."""
         if os.path.exists(image_path):
-            pixmap = QPixmap(image_path)
-            self.logo_label.setPixmap(pixmap.scaled(
-                180, 150, Qt.AspectRatioMode.KeepAspectRatio, 
-                Qt.TransformationMode.SmoothTransformation
-            ))
+            self._logo_source = image_path
+            image = self.thumbnails.get(image_path, LOGO_SIZE)
+            if image is not None:
+                self.logo_label.setPixmap(QPixmap.fromImage(image))
+
+    def _on_thumbnail_ready(self, source: str, image: QImage):
+        if source == self._logo_source and not image.isNull():
+            self.logo_label.setPixmap(QPixmap.fromImage(image))
 
     def set_tools_content(self, content: str):
         """Set the donation/tools area content."""
@@ -778,6 +1625,8 @@ class ModOrganizer(QMainWindow):
 
 
 def main():
+    # Qt WebEngine is imported after the QApplication exists, which it only allows with shared OpenGL contexts
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     
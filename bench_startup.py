@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Mod Organizer
+Starts WTMO in a fresh interpreter several times per mode and reports time to the main window's first paint, time until the web
+portal exists, and resident memory at both points. "eager" is the old startup (WebEngine imported at load and built inside
+init_ui), "lazy" is the current one. Each run is a new process so every number is a cold interpreter start.
+
+    python bench_startup.py --runs 5 --output bench_output.txt
+
+Needs PyQt6 with QtWebEngine like the app itself. Memory comes from psutil when installed, otherwise from the resource module (peak
+RSS, not available on Windows).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Optional, List, Dict
+
+MODES = ('eager', 'lazy')
+RESULT_PREFIX = 'WTMO_BENCH '
+CHILD_TIMEOUT = 120
+
+
+def rss_kb() -> Optional[int]:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss // 1024
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS reports bytes, Linux kilobytes
+
+
+def run_child(mode: str, started: float):
+    """One measured startup, run in its own process. started is the parent's time.time() just before it spawned us."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if mode == 'eager':
+        import wtmo_webportal  # noqa: F401  The old WTMO.py imported WebEngine before anything else
+    import WTMO
+    from PyQt6.QtCore import Qt, QCoreApplication, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    result: Dict = {'mode': mode}
+
+    def elapsed_ms() -> float:
+        return round((time.time() - started) * 1000, 1)
+
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication([sys.argv[0]])
+    window = WTMO.ModOrganizer(eager_web_portal=(mode == 'eager'))
+
+    def on_first_paint():
+        result['first_paint_ms'] = elapsed_ms()
+        result['first_paint_rss_kb'] = rss_kb()
+
+    def on_portal_ready():
+        result['portal_ready_ms'] = elapsed_ms()
+        # Give the portal a moment to settle, then report and quit
+        QTimer.singleShot(500, finish)
+
+    def finish():
+        result['settled_rss_kb'] = rss_kb()
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        app.quit()
+
+    window.first_painted.connect(on_first_paint)
+    window.web_portal_ready.connect(on_portal_ready)
+    if window.web_view is not None:
+        result['portal_ready_ms'] = elapsed_ms()  # Eager mode built it inside the constructor
+        window.first_painted.connect(lambda: QTimer.singleShot(500, finish))
+    window.show()
+    app.exec()
+
+
+def measure(mode: str) -> Optional[Dict]:
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--started', repr(time.time())]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=CHILD_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        print(f"{mode}: timed out after {CHILD_TIMEOUT}s", file=sys.stderr)
+        return None
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    print(f"{mode}: no result (exit {completed.returncode})\n{completed.stderr.strip()[-2000:]}", file=sys.stderr)
+    return None
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    summary = {}
+    for key in ('first_paint_ms', 'portal_ready_ms', 'first_paint_rss_kb', 'settled_rss_kb'):
+        values = [run[key] for run in runs if run.get(key) is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def format_report(results: Dict[str, Dict], runs: int) -> str:
+    def cell(value, unit):
+        if value is None:
+            return 'n/a'
+        return f"{value / 1024:.0f} MiB" if unit == 'kb' else f"{value:.0f} ms"
+
+    lines = [f"WTMO startup, median of {runs} run(s)",
+             f"{'mode':<8}{'first paint':>14}{'portal ready':>15}{'RSS @ paint':>14}{'RSS settled':>14}"]
+    for mode, summary in results.items():
+        lines.append(f"{mode:<8}{cell(summary['first_paint_ms'], 'ms'):>14}{cell(summary['portal_ready_ms'], 'ms'):>15}"
+                     f"{cell(summary['first_paint_rss_kb'], 'kb'):>14}{cell(summary['settled_rss_kb'], 'kb'):>14}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure WTMO startup time and memory.")
+    parser.add_argument('--runs', type=int, default=5, help="startups per mode")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--output', help="also append the report to this file")
+    parser.add_argument('--json', action='store_true', help="print raw per-run results as JSON lines as well")
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--started', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.started or time.time())
+        return 0
+
+    results = {}
+    failed = False
+    for mode in args.modes:
+        runs = []
+        for _ in range(max(1, args.runs)):
+            run = measure(mode)
+            if run is None:
+                failed = True
+                continue
+            runs.append(run)
+            if args.json:
+                print(json.dumps(run))
+        results[mode] = summarize(runs)
+
+    report = format_report(results, args.runs)
+    print(report)
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(time.strftime('%Y-%m-%d %H:%M:%S') + "\n" + report + "\n\n")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
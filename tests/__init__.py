@@ -0,0 +1,11 @@
+"""Every module keeps its files (settings database, caches, journals) under the home folder, resolved when it is imported. The tests
+point home at a throwaway folder first so they never touch a real install's files."""
+
+import os
+import atexit
+import shutil
+import tempfile
+
+HOME = tempfile.mkdtemp(prefix='wtmo-tests-')
+os.environ['HOME'] = os.environ['USERPROFILE'] = HOME
+atexit.register(shutil.rmtree, HOME, True)
@@ -0,0 +1,186 @@
+"""
+Local HTTP stand-ins for the download tests
+A threaded http.server on 127.0.0.1 serving an in-memory set of files, with switches for the ways real mod hosts misbehave: dropping
+the connection part way through a body, stalling, trickling bytes out slowly, ignoring Range. Every request is logged so a test can
+check what the client actually asked for.
+"""
+
+import re
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict
+
+ETAG = '"v1"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'StandIn'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve()
+
+    def _serve(self, head: bool = False):
+        stand_in = self.server
+        name = self.path.split('?', 1)[0]
+        with stand_in.lock:
+            stand_in.requests.append({'method': self.command, 'path': name, 'range': self.headers.get('Range'),
+                                      'if_range': self.headers.get('If-Range'),
+                                      'if_none_match': self.headers.get('If-None-Match')})
+        if name in stand_in.slow:
+            stand_in.release.wait(stand_in.slow[name])
+        if name in stand_in.pages:
+            self._send(200, stand_in.pages[name].encode('utf-8'), {'Content-Type': 'text/html; charset=utf-8'}, head)
+            return
+        data = stand_in.files.get(name.lstrip('/'))
+        if data is None:
+            self._send(404, b'', {}, head)
+            return
+
+        start = 0
+        headers = {'Content-Disposition': f'attachment; filename="{name.rsplit("/", 1)[-1]}"'}
+        if stand_in.etag:
+            headers['ETag'] = stand_in.etag
+            if stand_in.conditional and self.headers.get('If-None-Match') == stand_in.etag:
+                self._send(304, b'', headers, head)
+                return
+        if stand_in.ranges:
+            headers['Accept-Ranges'] = 'bytes'
+        requested = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if requested and stand_in.ranges and if_range in (None, stand_in.etag):
+            start = int(re.match(r'bytes=(\d+)-', requested).group(1))
+            if start >= len(data):
+                self._send(416, b'', dict(headers, **{'Content-Range': f'bytes */{len(data)}'}), head)
+                return
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{len(data) - 1}/{len(data)}'
+        else:
+            status = 200
+        body = data[start:]
+        self.send_response(status)
+        if stand_in.lengths:
+            headers['Content-Length'] = str(len(body))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if head:
+            return
+
+        with stand_in.lock:
+            drop = stand_in.drops > 0 and stand_in.drop_after is not None and len(body) > stand_in.drop_after
+            if drop:
+                stand_in.drops -= 1
+        if drop:
+            self.wfile.write(body[:stand_in.drop_after])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        if stand_in.stall:
+            self.wfile.write(body[:1024])
+            self.wfile.flush()
+            stand_in.stalled.set()
+            stand_in.release.wait(stand_in.stall)
+            body = body[1024:]
+        self._write(body, stand_in.rate)
+
+    def _write(self, body: bytes, rate: Optional[int]):
+        try:
+            if not rate:
+                self.wfile.write(body)
+                return
+            step = 8192
+            for offset in range(0, len(body), step):
+                self.wfile.write(body[offset:offset + step])
+                time.sleep(step / rate)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client hung up, as a cancelled download should
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str], head: bool):
+        self.send_response(status)
+        if status != 304:
+            headers = dict(headers, **{'Content-Length': str(len(body))})
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head and body:
+            self.wfile.write(body)
+
+
+class StandIn(ThreadingHTTPServer):
+    """The server. files: name -> bytes, pages: path -> html. See serve() for the behaviour switches."""
+    daemon_threads = True
+
+    def __init__(self, ipv6: bool = False):
+        self.address_family = socket.AF_INET6 if ipv6 else socket.AF_INET
+        self.host = '[::1]' if ipv6 else '127.0.0.1'
+        super().__init__(('::1' if ipv6 else '127.0.0.1', 0), _Handler)
+        self.files: Dict[str, bytes] = {}
+        self.pages: Dict[str, str] = {}
+        self.etag: Optional[str] = ETAG
+        self.conditional = True
+        self.lengths = True
+        self.ranges = True
+        self.drop_after: Optional[int] = None
+        self.drops = 0
+        self.stall: Optional[float] = None
+        self.rate: Optional[int] = None
+        self.slow: Dict[str, float] = {}
+        self.requests: List[Dict] = []
+        self.lock = threading.Lock()
+        self.stalled = threading.Event()  # Set once a stalling response has sent its first bytes
+        self.release = threading.Event()  # Set to let stalled responses carry on
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.server_port}/'
+
+    def url(self, name: str) -> str:
+        return self.base_url + name.lstrip('/')
+
+    def gets(self, name: str) -> List[Dict]:
+        path = '/' + name.lstrip('/')
+        with self.lock:
+            return [request for request in self.requests if request['method'] == 'GET' and request['path'] == path]
+
+    def close(self):
+        self.release.set()
+        self.shutdown()
+        self.server_close()
+
+
+def serve(files: Optional[Dict[str, bytes]] = None, pages: Optional[Dict[str, str]] = None, ranges: bool = True,
+          drop_after: Optional[int] = None, drops: int = 1, stall: Optional[float] = None,
+          rate: Optional[int] = None, slow: Optional[Dict[str, float]] = None, ipv6: bool = False,
+          etag: Optional[str] = ETAG, conditional: bool = True, lengths: bool = True) -> StandIn:
+    """Start a stand-in server.
+
+    drop_after: cut the connection after that many body bytes, for the first `drops` responses.
+    stall: send 1 KiB, then hang for that many seconds (or until release is set).
+    rate: trickle bodies out at about that many bytes per second.
+    slow: path -> seconds to wait before answering at all (or until release is set).
+    ranges=False answers every Range request with a plain 200.
+    ipv6 listens on ::1 instead of 127.0.0.1.
+    etag=None sends no ETag, conditional=False ignores If-None-Match, lengths=False leaves Content-Length out of file responses."""
+    stand_in = StandIn(ipv6)
+    stand_in.files = dict(files or {})
+    stand_in.pages = dict(pages or {})
+    stand_in.ranges = ranges
+    stand_in.etag = etag
+    stand_in.conditional = conditional
+    stand_in.lengths = lengths
+    stand_in.drop_after = drop_after
+    stand_in.drops = drops
+    stand_in.stall = stall
+    stand_in.rate = rate
+    stand_in.slow = dict(slow or {})
+    stand_in._thread.start()
+    return stand_in
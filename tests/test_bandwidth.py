@@ -0,0 +1,131 @@
+"""Bandwidth cap: the token bucket on its own and a capped engine against a fast local server."""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from wtmo_downloads import (
+    DownloadEngine, BandwidthLimiter, AdaptiveChunker, PartialJournal, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE
+)
+
+from tests.httpfixtures import serve
+
+KIB = 1024
+
+
+class BandwidthLimiterTest(unittest.TestCase):
+    def test_throughput_stays_under_the_rate(self):
+        limiter = BandwidthLimiter(256 * KIB)
+        total = 768 * KIB
+        started = time.monotonic()
+        for _ in range(total // (8 * KIB)):
+            limiter.consume(8 * KIB)
+        elapsed = time.monotonic() - started
+        # The bucket starts full (a one second burst), everything past that is paced at the rate
+        self.assertGreaterEqual(elapsed, (total - 256 * KIB) / (256 * KIB) * 0.95)
+        self.assertLess(elapsed, (total - 256 * KIB) / (256 * KIB) + 1.0)
+
+    def test_no_rate_means_no_waiting(self):
+        limiter = BandwidthLimiter(0)
+        started = time.monotonic()
+        for _ in range(1000):
+            limiter.consume(1024 * KIB)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_cancel_cuts_a_wait_short(self):
+        limiter = BandwidthLimiter(64 * KIB)
+        limiter.consume(64 * KIB)  # Bucket empty
+        started = time.monotonic()
+        limiter.consume(640 * KIB, cancelled=lambda: time.monotonic() - started > 0.2)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+class CappedDownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.target = os.path.join(self.folder, 'UserSkins')
+        os.makedirs(self.target)
+        self.server = serve({'a.dds': os.urandom(192 * KIB), 'b.dds': os.urandom(192 * KIB)})
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_parallel_downloads_share_the_cap(self):
+        cap_kbps = 128
+        engine = DownloadEngine(self.folder, max_downloads=2, journal=PartialJournal(os.path.join(self.folder, 'j.json')),
+                                memory_extract_mb=0, bandwidth_limit_kbps=cap_kbps)
+        results = []
+        engine.finished_download = lambda *result: results.append(result)
+        started = time.monotonic()
+        try:
+            engine.run([{'url': self.server.url(name), 'target': self.target, 'category': None} for name in ('a.dds', 'b.dds')])
+        finally:
+            engine.session.close()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([True, True], [result[1] for result in results])
+        total, cap = 384 * KIB, cap_kbps * KIB
+        self.assertGreaterEqual(elapsed, (total - cap) / cap * 0.9)  # Combined, not per transfer
+        self.assertLess(elapsed, (total - cap) / cap + 2.0)
+
+
+
+class AdaptiveChunkTest(unittest.TestCase):
+    """Read sizes follow the link: small on a slow server, growing towards MAX_CHUNK_SIZE on a fast one."""
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.target = os.path.join(self.folder, 'UserSkins')
+        os.makedirs(self.target)
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def read_sizes(self, name: str, **engine_options):
+        sizes = []
+        real_update = AdaptiveChunker.update
+
+        def update(chunker, received):
+            sizes.append(real_update(chunker, received))
+            return sizes[-1]
+
+        engine = DownloadEngine(self.folder, max_downloads=1, journal=PartialJournal(os.path.join(self.folder, 'j.json')),
+                                memory_extract_mb=0, **engine_options)
+        results = []
+        engine.finished_download = lambda *result: results.append(result)
+        with mock.patch.object(AdaptiveChunker, 'update', autospec=True, side_effect=update):
+            try:
+                engine.run([{'url': self.server.url(name), 'target': self.target, 'category': None}])
+            finally:
+                engine.session.close()
+        self.assertTrue(results[0][1], results)
+        return sizes
+
+    def test_slow_server_keeps_reads_small(self):
+        self.server = serve({'slow.dds': os.urandom(96 * KIB)}, rate=48 * KIB)  # About 2 s
+        sizes = self.read_sizes('slow.dds')
+        self.assertTrue(sizes)
+        self.assertLessEqual(max(sizes), 2 * MIN_CHUNK_SIZE)
+
+    def test_fast_server_grows_reads(self):
+        self.server = serve({'fast.dds': os.urandom(8 * 1024 * KIB)})
+        sizes = self.read_sizes('fast.dds')
+        self.assertEqual(MIN_CHUNK_SIZE, AdaptiveChunker().size)  # Every transfer starts small
+        self.assertGreaterEqual(max(sizes), 32 * MIN_CHUNK_SIZE)
+        self.assertLessEqual(max(sizes), MAX_CHUNK_SIZE)
+
+    def test_cap_bounds_the_read_size(self):
+        self.server = serve({'capped.dds': os.urandom(512 * KIB)})
+        sizes = self.read_sizes('capped.dds', bandwidth_limit_kbps=256)
+        # 256 KiB/s for CHUNK_TARGET_SECONDS (0.1 s) is 25.6 KiB, rounded down to a power of two times MIN_CHUNK_SIZE
+        self.assertLessEqual(max(sizes), 16 * KIB)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Archive cache: content addressing, LRU eviction under the budget, pinning, invalidating a bad archive and sweeping blobs a crash
+left out of the index."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from wtmo_cache import ArchiveCache, file_sha256
+
+KIB = 1024
+
+
+class ArchiveCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.folder, 'archives')
+        self.cache = ArchiveCache(1, self.cache_dir)  # 1 MiB budget
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def download(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.folder, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def put(self, url: str, content: bytes, name: str = 'mod.zip') -> str:
+        """Store and release, the way an install that finished leaves it. Returns the sha256."""
+        record = self.cache.store(url, self.download(name, content))
+        self.cache.release(record['sha256'])
+        return record['sha256']
+
+    def blob_count(self) -> int:
+        return sum(1 for entry in os.listdir(self.cache_dir) if len(entry) == 64)
+
+    def test_lookup_hands_back_the_stored_file(self):
+        content = os.urandom(10 * KIB)
+        path = self.download('tiger.zip', content)
+        sha = file_sha256(path)
+        self.put('https://example.com/tiger', content, 'tiger.zip')
+        self.assertFalse(os.path.exists(path))  # Moved in, not copied
+
+        record = self.cache.lookup('https://example.com/tiger')
+        self.assertEqual((sha, 'tiger.zip'), (record['sha256'], record['filename']))
+        with open(record['path'], 'rb') as f:
+            self.assertEqual(content, f.read())
+        self.cache.release(sha)
+        self.assertIsNone(self.cache.lookup('https://example.com/other'))
+
+    def test_same_content_from_two_urls_is_stored_once(self):
+        content = os.urandom(10 * KIB)
+        self.assertEqual(self.put('https://a.example/tiger', content), self.put('https://b.example/tiger', content))
+        self.assertEqual(1, self.blob_count())
+        self.assertEqual(10 * KIB, self.cache.total_bytes)
+
+    def test_least_recently_used_goes_first(self):
+        first = self.put('https://example.com/1', os.urandom(400 * KIB))
+        second = self.put('https://example.com/2', os.urandom(400 * KIB))
+        self.cache.release(self.cache.lookup('https://example.com/1')['sha256'])  # 1 is now the most recent
+        self.put('https://example.com/3', os.urandom(400 * KIB))
+
+        self.assertIsNotNone(self.cache.peek('https://example.com/1'))
+        self.assertIsNone(self.cache.peek('https://example.com/2'))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, second)))
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, first)))
+        self.assertLessEqual(self.cache.total_bytes, 1024 * KIB)
+
+    def test_pinned_blob_is_never_evicted(self):
+        pinned = self.cache.store('https://example.com/1', self.download('1.zip', os.urandom(600 * KIB)))
+        self.put('https://example.com/2', os.urandom(600 * KIB))  # Over budget, the unpinned newcomer has to go instead
+        self.assertIsNotNone(self.cache.peek('https://example.com/1'))
+        self.assertIsNone(self.cache.peek('https://example.com/2'))
+
+        third = self.cache.store('https://example.com/3', self.download('3.zip', os.urandom(500 * KIB)))
+        self.assertEqual(1100 * KIB, self.cache.total_bytes)  # Both pinned, over budget for now
+        self.cache.release(pinned['sha256'])  # Unpinned and least recently used, now it goes
+        self.assertIsNone(self.cache.peek('https://example.com/1'))
+        self.assertIsNotNone(self.cache.peek('https://example.com/3'))
+        self.cache.release(third['sha256'])
+
+    def test_invalidated_blob_goes_after_the_last_reader(self):
+        sha = self.put('https://example.com/bad', os.urandom(10 * KIB))
+        first = self.cache.lookup('https://example.com/bad')
+        self.cache.lookup('https://example.com/bad')  # Two installs reading it
+
+        self.cache.invalidate('https://example.com/bad', sha)
+        self.assertIsNone(self.cache.peek('https://example.com/bad'))  # Never handed out again
+        self.assertTrue(os.path.exists(first['path']))  # The other install is still reading it
+        self.cache.release(sha)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, sha)))
+        self.assertEqual(0, self.cache.total_bytes)
+
+    def test_flush_persists_and_unflushed_blobs_are_swept(self):
+        kept = self.put('https://example.com/kept', os.urandom(10 * KIB))
+        self.cache.flush()
+        lost = self.put('https://example.com/lost', os.urandom(10 * KIB))  # Stored, then the program crashed before a flush
+
+        reopened = ArchiveCache(1, self.cache_dir)
+        self.assertIsNotNone(reopened.peek('https://example.com/kept'))
+        self.assertIsNone(reopened.peek('https://example.com/lost'))
+        self.assertTrue(os.path.isdir(os.path.join(self.cache_dir, kept)))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, lost)))
+
+    def test_flush_only_writes_when_something_changed(self):
+        self.put('https://example.com/1', os.urandom(10 * KIB))
+        self.cache.flush()
+        index = os.path.join(self.cache_dir, 'index.json')
+        os.utime(index, (0, 0))
+        self.cache.peek('https://example.com/1')
+        self.cache.flush()
+        self.assertEqual(0, os.stat(index).st_mtime)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Cancelling: cancel() must not block and a run stuck on stalled servers must wind down well inside the read timeout."""
+
+import os
+import time
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+
+from wtmo_downloads import DownloadEngine, PartialJournal, PART_SUFFIX, READ_TIMEOUT
+
+from tests.httpfixtures import serve
+
+CANCEL_RETURNS_WITHIN = 0.1  # seconds
+RUN_STOPS_WITHIN = 2.0
+
+
+class CancelTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.target = os.path.join(self.folder, 'UserSkins')
+        os.makedirs(self.target)
+        self.files = {f'mod{n}.dds': os.urandom(256 * 1024) for n in range(3)}
+        self.server = serve(self.files, stall=READ_TIMEOUT * 2)
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_cancel_returns_at_once_while_downloads_are_stalled(self):
+        self.cancel_stalled_run()
+
+    @unittest.skipUnless(socket.has_ipv6, "no IPv6 support")
+    def test_cancel_works_on_ipv6_connections(self):
+        self.server.close()
+        try:
+            self.server = serve(self.files, stall=READ_TIMEOUT * 2, ipv6=True)
+        except OSError:
+            self.skipTest("::1 not available")
+        self.cancel_stalled_run()
+
+    def cancel_stalled_run(self):
+        journal_path = os.path.join(self.folder, 'partials.json')
+        engine = DownloadEngine(self.folder, max_downloads=3, journal=PartialJournal(journal_path), memory_extract_mb=0)
+        results = []
+        engine.finished_download = lambda *result: results.append(result)
+        mods = [{'url': self.server.url(name), 'target': self.target, 'category': None} for name in self.files]
+        runner = threading.Thread(target=engine.run, args=(mods,), daemon=True)
+        runner.start()
+        self.assertTrue(self.server.stalled.wait(5), "the stand-in never started sending")
+        time.sleep(0.2)  # Let every worker get into its blocking read
+
+        started = time.monotonic()
+        engine.cancel()
+        self.assertLess(time.monotonic() - started, CANCEL_RETURNS_WITHIN)
+
+        self.assertTrue(engine.idle.wait(RUN_STOPS_WITHIN), "run() still going after the cancel")
+        runner.join(1)
+        self.assertFalse(runner.is_alive())
+        self.assertLess(engine.cancel_latency, RUN_STOPS_WITHIN)
+        engine.session.close()
+
+        self.assertFalse(any(success for _, success, _ in results))
+        self.assertFalse(any(os.path.exists(os.path.join(self.target, name)) for name in self.files))
+        # The server takes Range requests, so what was fetched stays for the next run to resume
+        journal = PartialJournal(journal_path)
+        for name in self.files:
+            entry = journal.get(self.server.url(name))
+            if entry is not None:
+                self.assertTrue(os.path.exists(entry['path'] + PART_SUFFIX))
+
+    def test_cancel_before_run_downloads_nothing(self):
+        engine = DownloadEngine(self.folder, journal=PartialJournal(os.path.join(self.folder, 'partials.json')))
+        engine.cancel()
+        engine.run([{'url': self.server.url(name), 'target': self.target, 'category': None} for name in self.files])
+        engine.session.close()
+        self.assertEqual([], self.server.gets('mod0.dds'))
+
+
+if __name__ == '__main__':
+    unittest.main()
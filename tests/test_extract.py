@@ -0,0 +1,99 @@
+"""Zip member extraction: unchanged files are skipped, changed ones rewritten without writing through links into the mod store,
+and a name listed twice in an archive comes out as its last entry."""
+
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+
+from wtmo_extract import extract_members
+from wtmo_manifest import file_crc32
+
+
+def make_zip(entries) -> zipfile.ZipFile:
+    """entries: [(name, bytes)], in order, names may repeat."""
+    data = io.BytesIO()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # zipfile warns about duplicate names, that's the point here
+        with zipfile.ZipFile(data, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, content in entries:
+                zf.writestr(name, content)
+    return zipfile.ZipFile(io.BytesIO(data.getvalue()))
+
+
+class ExtractMembersTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.target = os.path.join(self.folder, 'tiger')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def extract(self, zf: zipfile.ZipFile, workers: int = 4, known=None):
+        return extract_members(zf, [info for info in zf.infolist() if not info.filename.endswith('/')], self.target,
+                               known, workers)
+
+    def read(self, name: str) -> bytes:
+        with open(os.path.join(self.target, name), 'rb') as f:
+            return f.read()
+
+    def test_duplicate_names_come_out_as_the_last_entry(self):
+        for workers in (1, 4):
+            shutil.rmtree(self.target, ignore_errors=True)
+            zf = make_zip([('tiger.dds', b'first' * 1000), ('tiger.blk', b'blk'), ('big.dds', b'x' * 50000),
+                           ('tiger.dds', b'second')])
+            written, skipped = self.extract(zf, workers)
+            self.assertEqual(0, skipped)
+            self.assertEqual(b'second', self.read('tiger.dds'))
+            records = {os.path.basename(path): (size, crc) for path, size, crc in written}
+            self.assertEqual(3, len(written))  # One record per file, not per entry
+            self.assertEqual((6, file_crc32(os.path.join(self.target, 'tiger.dds'))), records['tiger.dds'])
+            self.assertEqual(['tiger.blk', 'big.dds', 'tiger.dds'], [os.path.basename(path) for path, _, _ in written])
+
+    def test_reinstalling_an_unchanged_archive_writes_nothing(self):
+        entries = [('tiger.dds', os.urandom(20000)), ('skin/tiger.blk', b'blk')]
+        self.extract(make_zip(entries))
+        before = {name: os.stat(os.path.join(self.target, name)).st_mtime_ns for name in ('tiger.dds', 'skin/tiger.blk')}
+
+        with mock.patch('wtmo_extract.break_link') as break_link, mock.patch('wtmo_extract.shutil.copyfileobj') as copy:
+            written, skipped = self.extract(make_zip(entries))
+        self.assertEqual((2, 2), (len(written), skipped))
+        break_link.assert_not_called()
+        copy.assert_not_called()
+        self.assertEqual(before, {name: os.stat(os.path.join(self.target, name)).st_mtime_ns for name in before})
+
+    def test_changed_member_is_rewritten_without_touching_the_linked_copy(self):
+        # A profile install: the file in the game folder is a hardlink into the shared mod store
+        stored = os.path.join(self.folder, 'store', 'tiger.dds')
+        os.makedirs(os.path.dirname(stored))
+        with open(stored, 'wb') as f:
+            f.write(b'version one')
+        os.makedirs(self.target)
+        os.link(stored, os.path.join(self.target, 'tiger.dds'))
+        os.link(stored, os.path.join(self.target, 'same.dds'))
+
+        written, skipped = self.extract(make_zip([('tiger.dds', b'version two!'), ('same.dds', b'version one')]))
+        self.assertEqual(1, skipped)  # same.dds already matches
+        self.assertEqual(b'version two!', self.read('tiger.dds'))
+        with open(stored, 'rb') as f:
+            self.assertEqual(b'version one', f.read())  # The store and every other profile keep their copy
+        self.assertNotEqual(os.stat(stored).st_ino, os.stat(os.path.join(self.target, 'tiger.dds')).st_ino)
+        self.assertEqual(os.stat(stored).st_ino, os.stat(os.path.join(self.target, 'same.dds')).st_ino)
+
+    def test_known_crc_is_trusted_without_reading_the_file(self):
+        entries = [('tiger.dds', os.urandom(20000))]
+        written, _ = self.extract(make_zip(entries))
+        path, size, crc = written[0]
+        known = {os.path.normcase(os.path.abspath(path)): (size, crc, os.stat(path).st_mtime + 1)}
+        with mock.patch('wtmo_extract.file_crc32') as crc32:
+            _, skipped = self.extract(make_zip(entries), known=known)
+        self.assertEqual(1, skipped)
+        crc32.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
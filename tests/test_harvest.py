@@ -0,0 +1,79 @@
+"""Feed harvesting: a feed page is turned into modlist entries by reading every post it links to."""
+
+import unittest
+
+from wtmo_harvest import harvest_feed, harvested_entries, collect_post_urls
+from wtmo_modlist import CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+
+from tests.httpfixtures import serve
+
+MENU = ('<nav><a href="/feed/camouflages/">Camouflages</a><a href="/feed/missions/">Missions</a>'
+        '<a href="/feed/sights/">Sights</a></nav>')
+
+
+def post_page(feed: str, title: str, download: str = '') -> str:
+    link = f'<a href="{download}">Download</a>' if download else ''
+    return (f'<html><head><meta property="og:title" content="{title}">'
+            f'<meta property="og:image" content="/i/{title}.jpg"></head><body>{MENU}'
+            f'<a class="category" href="/feed/{feed}/">{feed}</a>{link}</body></html>')
+
+
+FEED = ('<html><body>' + MENU +
+        '<a href="/post/101/en/">Tiger</a><a href="/post/102/en/"><img></a><a href="/post/101/en/">Tiger again</a>'
+        '<a href="/post/103/en/">Night raid</a><a href="/post/104/en/">Screenshot</a><a href="/post/105/en/">Empty</a>'
+        '<a href="/post/106/en/">Gone</a></body></html>')
+
+PAGES = {
+    '/feed/all/': FEED,
+    '/post/101/en/': post_page('camouflages', 'Tiger', '/downloads/start/9001'),
+    '/post/102/en/': post_page('sights', 'Reticle', 'https://live.warthunder.com/dl/abc123/reticle.zip'),
+    '/post/103/en/': post_page('missions', 'Night raid', '/downloads/start/9003'),
+    '/post/104/en/': post_page('images', 'Screenshot', '/downloads/start/9004'),
+    '/post/105/en/': post_page('camouflages', 'Empty'),
+}
+
+
+class HarvestTest(unittest.TestCase):
+    def setUp(self):
+        self.server = serve(pages=PAGES)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_feed_posts_are_collected_in_order_without_repeats(self):
+        self.assertEqual([self.server.url(f'post/{n}/en/') for n in (101, 102, 103, 104, 105, 106)],
+                         collect_post_urls(FEED, self.server.url('feed/all/')))
+
+    def test_harvest_feed_resolves_every_post(self):
+        progress = []
+        results = harvest_feed(self.server.url('feed/all/'), max_requests=4,
+                               progress=lambda message, current, total: progress.append((current, total)))
+
+        self.assertEqual([self.server.url(f'post/{n}/en/') for n in (101, 102, 103, 104, 105, 106)],
+                         [result['post'] for result in results])
+        tiger, reticle, raid, screenshot, empty, gone = results
+        self.assertEqual((CATEGORY_CAMO, self.server.url('downloads/start/9001'), 'Tiger', None),
+                         (tiger['category'], tiger['url'], tiger['title'], tiger['error']))
+        self.assertEqual(self.server.url('i/Tiger.jpg'), tiger['image'])
+        self.assertEqual((CATEGORY_SIGHT, 'https://live.warthunder.com/dl/abc123/reticle.zip'),
+                         (reticle['category'], reticle['url']))
+        self.assertEqual((CATEGORY_MISSION, 'Night raid'), (raid['category'], raid['title']))
+        # The site menu links every feed, only the post's own category link counts
+        self.assertEqual((None, None), (screenshot['category'], screenshot['url']))
+        self.assertIsNotNone(screenshot['error'])
+        self.assertEqual((CATEGORY_CAMO, None, "no download link"), (empty['category'], empty['url'], empty['error']))
+        self.assertIsNone(gone['url'])
+        self.assertIn('404', gone['error'])
+        self.assertEqual((6, 6), max(progress))
+
+    def test_harvested_entries_keep_only_downloads(self):
+        entries = harvested_entries(harvest_feed(self.server.url('feed/all/')))
+        self.assertEqual([(self.server.url('downloads/start/9001'), CATEGORY_CAMO, 'Tiger'),
+                          ('https://live.warthunder.com/dl/abc123/reticle.zip', CATEGORY_SIGHT, 'Reticle'),
+                          (self.server.url('downloads/start/9003'), CATEGORY_MISSION, 'Night raid')],
+                         [(entry.url, entry.category, entry.name) for entry in entries])
+        self.assertEqual(self.server.url('post/101/en/'), entries[0].extra['post'])
+
+
+if __name__ == '__main__':
+    unittest.main()
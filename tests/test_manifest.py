@@ -0,0 +1,93 @@
+"""Install manifest: uninstalling removes exactly a mod's files, files another mod also wrote stay, and emptied folders are pruned
+no further up than the mod's target folder."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from wtmo_manifest import InstallManifest, file_crc32
+
+TIGER = 'https://example.com/tiger.zip'
+PANTHER = 'https://example.com/panther.zip'
+
+
+class InstallManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.skins = os.path.join(self.folder, 'UserSkins')
+        self.path = os.path.join(self.folder, 'manifest.json')
+        self.manifest = InstallManifest(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def install(self, url: str, rels, root=None):
+        root = root or self.skins
+        files = []
+        for rel in rels:
+            path = os.path.join(root, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(url.encode())
+            files.append((path, os.path.getsize(path), file_crc32(path)))
+        return self.manifest.record(url, 'camouflage', root, files)
+
+    def exists(self, rel: str) -> bool:
+        return os.path.exists(os.path.join(self.skins, rel))
+
+    def test_uninstall_removes_the_files_and_prunes_emptied_folders(self):
+        self.install(TIGER, ['tiger/textures/tiger.dds', 'tiger/tiger.blk'])
+        self.assertTrue(self.manifest.is_installed(TIGER, verify=True))
+        self.assertEqual((2, 0), self.manifest.uninstall(TIGER))
+        self.assertFalse(self.exists('tiger'))
+        self.assertTrue(os.path.isdir(self.skins))  # The target folder itself stays
+        self.assertFalse(self.manifest.is_installed(TIGER))
+        self.assertFalse(InstallManifest(self.path).is_installed(TIGER))  # Saved
+
+    def test_shared_files_stay_with_their_other_owner(self):
+        self.install(TIGER, ['tiger/tiger.dds', 'common/shared.dds'])
+        self.assertEqual({TIGER}, self.install(PANTHER, ['panther/panther.dds', 'common/shared.dds']))  # The overlap
+        self.assertEqual({TIGER, PANTHER}, self.manifest.owners(os.path.join(self.skins, 'common', 'shared.dds')))
+
+        self.assertEqual((1, 1), self.manifest.uninstall(TIGER))
+        self.assertTrue(self.exists('common/shared.dds'))
+        self.assertEqual({PANTHER}, self.manifest.owners(os.path.join(self.skins, 'common', 'shared.dds')))
+        self.assertEqual((2, 0), self.manifest.uninstall(PANTHER))
+        self.assertFalse(self.exists('common'))
+
+    def test_reverse_index_is_rebuilt_on_load(self):
+        self.install(TIGER, ['tiger/tiger.dds'])
+        self.manifest.save()
+        reloaded = InstallManifest(self.path)
+        self.assertEqual({TIGER}, reloaded.owners(os.path.join(self.skins, 'tiger', 'tiger.dds')))
+        self.assertEqual({TIGER}, reloaded.conflicts(PANTHER, [os.path.join(self.skins, 'tiger', 'tiger.dds')]))
+
+    def test_pruning_stops_at_the_target_folder(self):
+        # A sibling whose name starts with the target's: its emptied folders are outside the target and stay
+        self.install(TIGER, ['tiger/tiger.dds', os.path.join(os.pardir, 'UserSkins2', 'empty', 'stray.dds')])
+        os.makedirs(os.path.join(self.folder, 'empty user folder'))
+        self.manifest.uninstall(TIGER)
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'UserSkins2', 'empty', 'stray.dds')))
+        self.assertTrue(os.path.isdir(self.skins))
+        self.assertTrue(os.path.isdir(os.path.join(self.folder, 'UserSkins2', 'empty')))
+        self.assertTrue(os.path.isdir(os.path.join(self.folder, 'empty user folder')))
+
+    def test_files_outside_the_target_are_removed_but_their_folders_kept(self):
+        # A mission .blk recorded under the skins target but written to UserMissions
+        missions = os.path.join(self.folder, 'UserMissions')
+        self.install(TIGER, ['tiger/tiger.dds', os.path.join(os.pardir, 'UserMissions', 'raid.blk')])
+        self.manifest.uninstall(TIGER)
+        self.assertFalse(os.path.exists(os.path.join(missions, 'raid.blk')))
+        self.assertTrue(os.path.isdir(missions))
+        self.assertTrue(os.path.isdir(self.skins))
+
+    def test_verify_notices_deleted_files(self):
+        self.install(TIGER, ['tiger/tiger.dds'])
+        os.remove(os.path.join(self.skins, 'tiger', 'tiger.dds'))
+        self.assertTrue(self.manifest.is_installed(TIGER))
+        self.assertFalse(self.manifest.is_installed(TIGER, verify=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Small zips downloaded into memory: a broken archive is a failed install and leaves nothing behind in the game folder."""
+
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+from unittest import mock
+
+from wtmo_downloads import DownloadEngine, PartialJournal
+from wtmo_staging import STAGING_DIR_NAME
+
+from tests.httpfixtures import serve
+
+
+def make_zip(files) -> bytes:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', zipfile.ZIP_STORED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return data.getvalue()
+
+
+GOOD = make_zip({'tiger/tiger.dds': b'a' * 4000, 'tiger/tiger.blk': b'b' * 4000})
+# The second member's bytes are damaged, its CRC check fails after the first member has already been unpacked
+BAD_CRC = GOOD.replace(b'b' * 4000, b'b' * 3999 + b'X', 1)
+TRUNCATED = GOOD[:len(GOOD) // 2]  # Central directory missing
+
+
+class MemoryInstallTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.target = os.path.join(self.folder, 'UserSkins')
+        os.makedirs(self.target)
+        self.server = serve({'good.zip': GOOD, 'crc.zip': BAD_CRC, 'cut.zip': TRUNCATED})
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def install(self, name: str):
+        engine = DownloadEngine(self.folder, max_downloads=1, journal=PartialJournal(os.path.join(self.folder, 'j.json')),
+                                memory_extract_mb=1)
+        results = []
+        engine.finished_download = lambda *result: results.append(result)
+        with mock.patch.object(DownloadEngine, '_fetch_to_memory', autospec=True,
+                               side_effect=DownloadEngine._fetch_to_memory) as fetch_to_memory:
+            try:
+                engine.run([{'url': self.server.url(name), 'target': self.target, 'category': 'camouflage'}])
+            finally:
+                engine.session.close()
+        self.assertEqual(1, fetch_to_memory.call_count)  # Went through the SpooledTemporaryFile path
+        return results[0]
+
+    def assert_target_untouched(self):
+        self.assertEqual([], os.listdir(self.target))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, STAGING_DIR_NAME)))
+
+    def test_good_zip_installs(self):
+        url, success, _ = self.install('good.zip')
+        self.assertTrue(success)
+        self.assertEqual(['tiger.blk', 'tiger.dds'], sorted(os.listdir(os.path.join(self.target, 'tiger'))))
+
+    def test_damaged_member_fails_and_leaves_no_half_install(self):
+        url, success, message = self.install('crc.zip')
+        self.assertFalse(success)
+        self.assertTrue(message.startswith("Extraction failed:"), message)
+        self.assertNotIn("archive kept", message)  # Nothing was ever written to disk to keep
+        self.assert_target_untouched()
+
+    def test_truncated_zip_fails(self):
+        url, success, message = self.install('cut.zip')
+        self.assertFalse(success)
+        self.assertIn("zip", message.lower())
+        self.assert_target_untouched()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""Modlist files: the gzip NDJSON export round trips with its metadata and uncategorized mods, and the grouped text and old JSON
+exports are still read."""
+
+import os
+import json
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from wtmo_modfile import read_modlist, write_modlist, export_records, iter_batches, MODLIST_FORMAT
+from wtmo_modlist import CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+from wtmo_store import SettingsStore
+
+MODS = [
+    {'url': 'https://example.com/loose.blk', 'category': None},
+    {'url': 'https://example.com/tiger.zip', 'category': CATEGORY_CAMO, 'name': 'tiger.zip', 'size': 5000,
+     'sha256': 'ab' * 32, 'post': 'https://live.warthunder.com/post/101/en/'},
+    {'url': 'https://example.com/raid.blk', 'category': CATEGORY_MISSION},
+    {'url': 'https://example.com/reticle.zip', 'category': CATEGORY_SIGHT, 'size': 800},
+]
+
+
+def entries(path: str):
+    return [(entry.url, entry.category, entry.extra) for entry in read_modlist(path)]
+
+
+class ModlistFileTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.folder, name)
+
+    def write_text(self, name: str, text: str) -> str:
+        with open(self.path(name), 'w', encoding='utf-8') as f:
+            f.write(text)
+        return self.path(name)
+
+    def test_gzip_ndjson_round_trip(self):
+        path = self.path('list.ndjson.gz')
+        self.assertEqual(4, write_modlist(path, MODS))
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(MODLIST_FORMAT, json.loads(f.readline())['format'])
+        read = list(read_modlist(path))
+        self.assertEqual([(mod['url'], mod['category']) for mod in MODS], [(entry.url, entry.category) for entry in read])
+        self.assertEqual('tiger.zip', read[1].name)
+        self.assertEqual({'size': 5000, 'sha256': 'ab' * 32, 'post': 'https://live.warthunder.com/post/101/en/'}, read[1].extra)
+        self.assertIsNone(read[0].extra)
+        self.assertEqual({'size': 800}, read[3].extra)
+
+    def test_plain_ndjson_round_trip(self):
+        path, zipped = self.path('list.ndjson'), self.path('list.ndjson.gz')
+        write_modlist(path, MODS)
+        write_modlist(zipped, MODS)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(MODLIST_FORMAT, json.loads(f.readline())['format'])
+        self.assertEqual(entries(zipped), entries(path))
+
+    def test_bad_lines_cost_one_mod(self):
+        path = self.write_text('hand edited.ndjson', '{"format": "wtmo-modlist", "version": 1}\n'
+                                                     '{"url": "https://example.com/a.zip", "category": "camouflage"}\n'
+                                                     '{"url": "https://example.com/b.zip", oops\n'
+                                                     '["not", "a", "mod"]\n\n'
+                                                     '{"url": "https://example.com/c.zip", "priority": 5}\n')
+        self.assertEqual([('https://example.com/a.zip', CATEGORY_CAMO, None), ('https://example.com/c.zip', None, {'priority': 5})],
+                         entries(path))
+
+    def test_grouped_text_round_trip(self):
+        path = self.path('list.txt')
+        write_modlist(path, MODS)  # Uncategorized first, the way iter_mods_with_meta(group_by_category=True) orders them
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(['https://example.com/loose.blk', '[CAMO]', 'https://example.com/tiger.zip', '[MISSION]',
+                              'https://example.com/raid.blk', '[SIGHT]', 'https://example.com/reticle.zip'], f.read().split())
+        self.assertEqual([(mod['url'], mod['category']) for mod in MODS], [(url, category) for url, category, _ in entries(path)])
+
+    def test_hand_written_text_list(self):
+        path = self.write_text('old.txt', "https://example.com/first.zip\n\n[SIGHT]\nhttps://example.com/r.zip\n"
+                                          "just a note\n[CAMO]\n  https://example.com/t.zip  \n")
+        self.assertEqual([('https://example.com/first.zip', None), ('https://example.com/r.zip', CATEGORY_SIGHT),
+                          ('https://example.com/t.zip', CATEGORY_CAMO)], [(url, category) for url, category, _ in entries(path)])
+
+    def test_old_json_export(self):
+        legacy = {'version': 1, 'mods': ['https://example.com/bare.zip',
+                                         {'url': 'https://example.com/tiger.zip', 'category': CATEGORY_CAMO},
+                                         {'url': 'https://example.com/plain.zip', 'category': None}]}
+        expected = [('https://example.com/bare.zip', None), ('https://example.com/tiger.zip', CATEGORY_CAMO),
+                    ('https://example.com/plain.zip', None)]
+        pretty = self.write_text('pretty.json', json.dumps(legacy, indent=2))
+        one_line = self.write_text('one line.json', json.dumps(legacy))
+        self.assertEqual(expected, [(url, category) for url, category, _ in entries(pretty)])
+        self.assertEqual(expected, [(url, category) for url, category, _ in entries(one_line)])
+
+    def test_export_from_the_store_round_trips(self):
+        store = SettingsStore(self.path('settings.db'), None)
+        self.addCleanup(store.close)
+        store.add_mods([('https://example.com/tiger.zip', CATEGORY_CAMO), ('https://example.com/loose.blk', None)])
+        store.update_download_meta({'https://example.com/tiger.zip': {'content_length': 5000, 'filename': 'tiger.zip',
+                                                                     'sha256': 'cd' * 32, 'category': CATEGORY_CAMO}})
+        path = self.path('export.ndjson.gz')
+        self.assertEqual(2, write_modlist(path, export_records(store.iter_mods_with_meta(group_by_category=True))))
+        self.assertEqual([('https://example.com/loose.blk', None, None),
+                          ('https://example.com/tiger.zip', CATEGORY_CAMO, {'size': 5000, 'sha256': 'cd' * 32})], entries(path))
+
+    def test_batches(self):
+        batches = list(iter_batches((n for n in range(1201)), 500))
+        self.assertEqual([500, 500, 201], [len(batch) for batch in batches])
+        self.assertEqual([], list(iter_batches([], 500)))
+
+
+if __name__ == '__main__':
+    unittest.main()
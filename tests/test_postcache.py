@@ -0,0 +1,104 @@
+"""Post cache: uncategorized mods take their category from the cache without touching the network, and only posts the cache doesn't
+know (or knows without a category) are looked up."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from wtmo_modlist import ModEntry, CATEGORY_CAMO, CATEGORY_MISSION
+from wtmo_postcache import apply_cached, lookup_posts, records_from_results, resolved_categories, post_id
+from wtmo_store import SettingsStore
+
+from tests.httpfixtures import serve
+from tests.test_harvest import post_page
+
+BODY = b'texture' * 100
+
+
+class PostCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = SettingsStore(os.path.join(self.folder, 'settings.db'), None)
+        self.server = serve({'downloads/start/9001': BODY, 'downloads/start/9003': BODY},
+                            pages={'/post/101/en/': post_page('camouflages', 'Tiger', '/downloads/start/9001'),
+                                   '/post/103/en/': post_page('missions', 'Night raid', '/downloads/start/9003')})
+
+    def tearDown(self):
+        self.server.close()
+        self.store.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def entry(self, number: int) -> ModEntry:
+        return ModEntry(self.server.url(f'downloads/start/{9000 + number}'), None,
+                        extra={'post': self.server.url(f'post/{number}/en/')})
+
+    def resolve(self, entries):
+        """What a sync does with uncategorized entries: the cache first, then a lookup of the rest, which is cached in turn."""
+        unresolved = apply_cached(entries, self.store)
+        if unresolved:
+            results = lookup_posts([entry.extra['post'] for entry in unresolved], max_requests=2)
+            self.store.update_post_meta(records_from_results(results))
+            resolved = resolved_categories(unresolved, results)
+            for entry in unresolved:
+                entry.category, details = resolved.get(entry.url, (None, {}))
+                entry.extra = dict(entry.extra, **details)
+        return unresolved
+
+    def post_gets(self):
+        return [request['path'] for request in self.server.requests if request['path'].startswith('/post/')]
+
+    def test_cached_post_needs_no_lookup(self):
+        tiger = self.entry(101)
+        self.store.update_post_meta([{'post_id': '101', 'post_url': tiger.extra['post'], 'url': tiger.url,
+                                      'category': CATEGORY_CAMO, 'title': 'Tiger', 'size': 700}])
+        self.assertEqual([], self.resolve([tiger]))
+        self.assertEqual(CATEGORY_CAMO, tiger.category)
+        self.assertEqual({'post': tiger.extra['post'], 'title': 'Tiger', 'size': 700}, tiger.extra)
+        self.assertEqual([], self.server.requests)
+
+    def test_cached_post_matches_by_post_id_when_the_link_moved(self):
+        tiger = self.entry(101)
+        self.store.update_post_meta([{'post_id': '101', 'url': 'https://live.warthunder.com/dl/old/tiger.zip',
+                                      'category': CATEGORY_CAMO}])
+        self.assertEqual([], self.resolve([tiger]))
+        self.assertEqual(CATEGORY_CAMO, tiger.category)
+        self.assertEqual([], self.server.requests)
+
+    def test_missing_post_is_looked_up_once_and_cached(self):
+        raid = self.entry(103)
+        self.assertEqual([raid], self.resolve([raid]))
+        self.assertEqual(CATEGORY_MISSION, raid.category)
+        self.assertEqual('Night raid', raid.extra['title'])
+        self.assertEqual(len(BODY), raid.extra['size'])
+        self.assertEqual(['/post/103/en/'], self.post_gets())
+
+        again = self.entry(103)
+        self.assertEqual([], self.resolve([again]))
+        self.assertEqual((CATEGORY_MISSION, len(BODY)), (again.category, again.extra['size']))
+        self.assertEqual(['/post/103/en/'], self.post_gets())
+
+    def test_record_without_category_falls_through_to_a_lookup(self):
+        tiger = self.entry(101)
+        self.store.update_post_meta([{'post_id': '101', 'url': tiger.url, 'category': None, 'title': 'Tiger'}])
+        self.assertEqual([tiger], self.resolve([tiger]))
+        self.assertEqual(CATEGORY_CAMO, tiger.category)
+        self.assertEqual(['/post/101/en/'], self.post_gets())
+        self.assertEqual(CATEGORY_CAMO, self.store.post_meta(['101'])['101']['category'])
+
+    def test_only_entries_with_a_post_are_looked_up(self):
+        categorized = ModEntry('https://example.com/known.zip', CATEGORY_CAMO, extra={'post': self.server.url('post/101/en/')})
+        orphan = ModEntry('https://example.com/orphan.zip', None)
+        self.assertEqual([], apply_cached([categorized, orphan], self.store))
+        self.assertIsNone(orphan.category)
+        self.assertEqual([], self.server.requests)
+
+    def test_post_id(self):
+        self.assertEqual('101', post_id('https://live.warthunder.com/post/101/en/'))
+        self.assertEqual('101', post_id('https://live.warthunder.com/post/101'))
+        self.assertIsNone(post_id('https://live.warthunder.com/feed/camouflages/'))
+        self.assertIsNone(post_id(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
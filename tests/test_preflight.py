@@ -0,0 +1,89 @@
+"""Preflight: every queued link gets a result, timeouts stay in the batch and mods without a target don't skew the space check."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from wtmo_preflight import (
+    preflight, space_check, summarize_preflight, format_summary, PREFLIGHT_OK, PREFLIGHT_CACHED, PREFLIGHT_FAILED
+)
+
+from tests.httpfixtures import serve
+
+
+class BrokenCache:
+    """An archive cache whose index can't be read."""
+    def peek(self, url):
+        raise OSError("cache index unreadable")
+
+
+class PreflightTest(unittest.TestCase):
+    def setUp(self):
+        self.server = serve({'skin.zip': b'z' * 5000, 'mission.blk': b'b' * 300}, slow={'/slow.zip': 5})
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_results_come_back_in_order(self):
+        mods = [{'url': self.server.url(name)} for name in ('skin.zip', 'missing.zip', 'mission.blk')]
+        skin, missing, mission = preflight(mods)
+        self.assertEqual((PREFLIGHT_OK, 'skin.zip', 5000), (skin['status'], skin['filename'], skin['size']))
+        self.assertEqual(PREFLIGHT_FAILED, missing['status'])
+        self.assertIn('404', missing['error'])
+        self.assertEqual((PREFLIGHT_OK, 300), (mission['status'], mission['size']))
+
+    def test_unexpected_error_fails_only_that_mod(self):
+        mods = [{'url': self.server.url('skin.zip')}, {'url': self.server.url('mission.blk'), 'refresh': True}]
+        broken, refreshed = preflight(mods, cache=BrokenCache())
+        self.assertEqual((PREFLIGHT_FAILED, "cache index unreadable"), (broken['status'], broken['error']))
+        self.assertEqual(PREFLIGHT_OK, refreshed['status'])  # Flagged refresh, the cache isn't asked
+
+        summary = summarize_preflight([broken, refreshed], [])
+        self.assertEqual([broken], summary['failed'])
+        self.assertEqual(1, summary['to_download'])
+
+    def test_timeout_keeps_the_mod_with_an_unknown_size(self):
+        with mock.patch('wtmo_preflight.REQUEST_TIMEOUT', (2, 0.3)):
+            slow, skin = preflight([{'url': self.server.url('slow.zip')}, {'url': self.server.url('skin.zip')}])
+        self.assertEqual((PREFLIGHT_OK, None), (slow['status'], slow['size']))
+        self.assertIsNotNone(slow['error'])
+        self.assertEqual((PREFLIGHT_OK, None), (skin['status'], skin['error']))
+
+        summary = summarize_preflight([slow, skin], [])
+        self.assertEqual((2, 1, [slow], []), (summary['to_download'], summary['unknown_size'], summary['unchecked'],
+                                              summary['failed']))
+        self.assertIn("1 link(s) didn't answer in time", format_summary(summary))
+
+
+class SpaceCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_mod_without_a_target_is_left_out(self):
+        mods = [{'target': ''}, {'target': None}, {'target': self.folder}]
+        results = [{'status': PREFLIGHT_OK, 'size': 10 ** 15, 'filename': 'huge.zip'}] * 2 + \
+                  [{'status': PREFLIGHT_OK, 'size': 1000, 'filename': 'skin.blk'}]
+        space = space_check(mods, results)
+        self.assertEqual(1, len(space))
+        self.assertEqual(([self.folder], 1000, True), (space[0]['folders'], space[0]['needed'], space[0]['ok']))
+
+    def test_archive_counts_on_the_download_drive_and_unpacked(self):
+        cache_dir = os.path.join(self.folder, 'cache')
+        target = os.path.join(self.folder, 'UserSkins', 'not yet created')
+        mods = [{'target': target}, {'target': target}, {'target': target}]
+        results = [{'status': PREFLIGHT_OK, 'size': 1000, 'filename': 'a.zip'},
+                   {'status': PREFLIGHT_CACHED, 'size': 1000, 'filename': 'b.zip'},
+                   {'status': PREFLIGHT_FAILED, 'size': 1000, 'filename': 'c.zip'}]
+        space = space_check(mods, results, cache_dir)
+        self.assertEqual(1, len(space))  # Same device, one figure
+        self.assertEqual(1000 + 2000 + 2000, space[0]['needed'])
+        self.assertEqual([self.folder], space[0]['folders'])  # Folders that don't exist yet are measured on their parent
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""Profiles: switching back and forth relinks mods from the shared store without copying them, and a mod that can't be stored is
+left installed and reported."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from wtmo_profiles import ModStore, switch_profile, link_file, LINK_HARD, LINK_SYMLINK, LINK_COPY
+from wtmo_manifest import InstallManifest, file_crc32
+from wtmo_modlist import CATEGORY_CAMO, CATEGORY_MISSION
+
+SKIN_A = 'https://example.com/a.zip'
+SKIN_B = 'https://example.com/b.zip'
+MISSION = 'https://example.com/raid.blk'
+
+
+class ProfileSwitchTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.root = os.path.join(self.folder, 'War Thunder')
+        self.targets = {CATEGORY_CAMO: os.path.join(self.root, 'UserSkins'),
+                        CATEGORY_MISSION: os.path.join(self.root, 'UserMissions'), None: self.root}
+        self.manifest = InstallManifest(os.path.join(self.folder, 'manifest.json'))
+        self.store = ModStore(os.path.join(self.folder, 'store'))
+        self.install(SKIN_A, CATEGORY_CAMO, {'a/a.dds': b'skin a' * 100, 'a/a.blk': b'a'})
+        self.install(SKIN_B, CATEGORY_CAMO, {'b/b.dds': b'skin b' * 100})
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def install(self, url, category, files, root=None):
+        target = self.targets[category]
+        installed = []
+        for rel, content in files.items():
+            path = os.path.join(target, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            installed.append((path, len(content), file_crc32(path)))
+        self.manifest.record(url, category, target if root is None else root, installed)
+
+    def switch(self, *urls):
+        categories = {SKIN_A: CATEGORY_CAMO, SKIN_B: CATEGORY_CAMO, MISSION: CATEGORY_MISSION}
+        profile = {'mods': [{'url': url, 'category': categories[url]} for url in urls]}
+        return switch_profile(profile, self.manifest, self.store, lambda category: self.targets[category])
+
+    def inode(self, category, rel):
+        return os.stat(os.path.join(self.targets[category], rel)).st_ino
+
+    def test_switching_back_and_forth_reuses_the_same_files(self):
+        a_inode, b_inode = self.inode(CATEGORY_CAMO, 'a/a.dds'), self.inode(CATEGORY_CAMO, 'b/b.dds')
+
+        result = self.switch(SKIN_A)
+        self.assertEqual((0, 1, 1, [], []), (result['linked'], result['unlinked'], result['unchanged'], result['missing'],
+                                             result['failed']))
+        self.assertEqual({SKIN_A}, set(self.manifest.installed()))
+        self.assertFalse(os.path.exists(os.path.join(self.targets[CATEGORY_CAMO], 'b')))
+
+        result = self.switch(SKIN_B)
+        self.assertEqual((1, 1, {LINK_HARD: 1}), (result['linked'], result['unlinked'], result['links']))
+        self.assertEqual({SKIN_B}, set(self.manifest.installed()))
+        self.assertEqual(b_inode, self.inode(CATEGORY_CAMO, 'b/b.dds'))  # No extra disk: the store's file is the game's file
+
+        result = self.switch(SKIN_A)
+        self.assertEqual({LINK_HARD: 2}, result['links'])
+        self.assertEqual(a_inode, self.inode(CATEGORY_CAMO, 'a/a.dds'))
+        self.assertEqual({SKIN_A}, set(self.manifest.installed()))
+        self.assertEqual([os.path.join(self.targets[CATEGORY_CAMO], 'a', name) for name in ('a.dds', 'a.blk')],
+                         sorted((path for path, _, _ in self.manifest.files(SKIN_A)), reverse=True))
+        self.assertTrue(self.manifest.is_installed(SKIN_A, verify=True))
+
+        # Saved, a fresh manifest sees the same
+        self.assertEqual({SKIN_A}, set(InstallManifest(os.path.join(self.folder, 'manifest.json')).installed()))
+
+    def test_mod_never_installed_here_is_missing(self):
+        result = self.switch(SKIN_A, MISSION)
+        self.assertEqual([{'url': MISSION, 'category': CATEGORY_MISSION}], result['missing'])
+
+    def test_file_recorded_without_a_root_is_stored_by_name(self):
+        self.install(MISSION, CATEGORY_MISSION, {'raid.blk': b'mission'}, root='')
+        self.switch(SKIN_A)
+        self.assertEqual(['raid.blk'], [rel for rel, _, _ in self.store.record(MISSION)['files']])
+        result = self.switch(SKIN_A, MISSION)
+        self.assertEqual(1, result['linked'])
+        with open(os.path.join(self.targets[CATEGORY_MISSION], 'raid.blk'), 'rb') as f:
+            self.assertEqual(b'mission', f.read())
+
+    def test_mod_that_cant_be_stored_stays_installed(self):
+        os.remove(os.path.join(self.targets[CATEGORY_CAMO], 'a', 'a.blk'))
+        result = self.switch(SKIN_B)
+        self.assertEqual([SKIN_A], [mod['url'] for mod in result['failed']])
+        self.assertEqual(0, result['unlinked'])
+        self.assertIn(SKIN_A, self.manifest.installed())
+        self.assertTrue(os.path.isfile(os.path.join(self.targets[CATEGORY_CAMO], 'a', 'a.dds')))
+        self.assertFalse(self.store.has(SKIN_A))
+
+    def test_store_error_is_reported_per_mod(self):
+        with mock.patch.object(ModStore, 'ingest', side_effect=OSError("store drive full")):
+            result = self.switch(SKIN_A)
+        self.assertEqual([{'url': SKIN_B, 'error': "store drive full"}], result['failed'])
+        self.assertIn(SKIN_B, self.manifest.installed())
+
+    def test_prune_keeps_what_is_asked_for(self):
+        self.switch(SKIN_A)
+        self.switch(SKIN_B)
+        self.assertEqual(1, self.store.prune({SKIN_B}))
+        self.assertFalse(self.store.has(SKIN_A))
+        self.assertTrue(self.store.has(SKIN_B))
+
+
+class LinkFileTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'store', 'tiger.dds')
+        os.makedirs(os.path.dirname(self.source))
+        with open(self.source, 'wb') as f:
+            f.write(b'texture')
+        self.destination = os.path.join(self.folder, 'UserSkins', 'tiger', 'tiger.dds')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_hardlink_first(self):
+        self.assertEqual(LINK_HARD, link_file(self.source, self.destination))
+        self.assertTrue(os.path.samefile(self.source, self.destination))
+
+    def test_symlink_when_hardlinks_fail(self):
+        with mock.patch('wtmo_profiles.os.link', side_effect=OSError("cross-device link")):
+            self.assertEqual(LINK_SYMLINK, link_file(self.source, self.destination))
+        self.assertTrue(os.path.islink(self.destination))
+
+    def test_copy_when_no_link_works(self):
+        with mock.patch('wtmo_profiles.os.link', side_effect=OSError("cross-device link")), \
+                mock.patch('wtmo_profiles.os.symlink', side_effect=OSError("symlinks need admin rights")):
+            self.assertEqual(LINK_COPY, link_file(self.source, self.destination))
+        self.assertFalse(os.path.islink(self.destination))
+        self.assertFalse(os.path.samefile(self.source, self.destination))
+        with open(self.destination, 'rb') as f:
+            self.assertEqual(b'texture', f.read())
+
+    def test_existing_link_is_replaced_not_written_through(self):
+        other = os.path.join(self.folder, 'other.dds')
+        with open(other, 'wb') as f:
+            f.write(b'other')
+        link_file(other, self.destination)
+        link_file(self.source, self.destination)
+        with open(other, 'rb') as f:
+            self.assertEqual(b'other', f.read())
+        self.assertTrue(os.path.samefile(self.source, self.destination))
+
+
+if __name__ == '__main__':
+    unittest.main()
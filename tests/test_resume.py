@@ -0,0 +1,102 @@
+"""Resuming interrupted downloads: .part files, the partial journal, Range / If-Range, 206 and 416."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from wtmo_downloads import DownloadEngine, PartialJournal, PART_SUFFIX
+
+from tests.httpfixtures import serve, ETAG
+
+PAYLOAD = bytes(range(256)) * 800  # 200 KiB, big enough to be cut part way through
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.target = os.path.join(self.folder, 'UserSkins')
+        os.makedirs(self.target)
+        self.journal_path = os.path.join(self.folder, 'partials.json')
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def run_engine(self, name: str):
+        engine = DownloadEngine(self.folder, max_downloads=1, journal=PartialJournal(self.journal_path), memory_extract_mb=0)
+        results = []
+        engine.finished_download = lambda *result: results.append(result)
+        try:
+            engine.run([{'url': self.server.url(name), 'target': self.target, 'category': None}])
+        finally:
+            engine.session.close()
+        return results
+
+    def leave_part(self, name: str, data: bytes, **fields):
+        """What a previous run that stopped part way leaves behind: the .part file and its journal entry."""
+        path = os.path.join(self.target, name)
+        with open(path + PART_SUFFIX, 'wb') as f:
+            f.write(data)
+        PartialJournal(self.journal_path).update(self.server.url(name), path=path, bytes=len(data), **fields)
+        return path
+
+    def assert_installed(self, results, name: str):
+        self.assertEqual([(self.server.url(name), True)], [result[:2] for result in results])
+        with open(os.path.join(self.target, name), 'rb') as f:
+            self.assertEqual(PAYLOAD, f.read())
+        self.assertFalse(os.path.exists(os.path.join(self.target, name) + PART_SUFFIX))
+        self.assertIsNone(PartialJournal(self.journal_path).get(self.server.url(name)))
+
+    def test_dropped_body_is_resumed_with_a_range_request(self):
+        self.server = serve({'skin.dds': PAYLOAD}, drop_after=70000)
+        results = self.run_engine('skin.dds')
+        self.assert_installed(results, 'skin.dds')
+        requests = self.server.gets('skin.dds')
+        self.assertEqual(2, len(requests))
+        self.assertIsNone(requests[0]['range'])
+        # Picks up from whatever reached the .part before the connection went, never from byte zero
+        resumed_at = int(requests[1]['range'][len('bytes='):-1])
+        self.assertTrue(0 < resumed_at <= 70000, resumed_at)
+        self.assertEqual(ETAG, requests[1]['if_range'])
+
+    def test_part_from_an_earlier_run_is_continued(self):
+        self.server = serve({'skin.dds': PAYLOAD})
+        self.leave_part('skin.dds', PAYLOAD[:50000], etag=ETAG, total=len(PAYLOAD), resumable=True)
+        results = self.run_engine('skin.dds')
+        self.assert_installed(results, 'skin.dds')
+        self.assertEqual(['bytes=50000-'], [request['range'] for request in self.server.gets('skin.dds')])
+
+    def test_416_on_a_complete_part_finishes_without_downloading(self):
+        self.server = serve({'skin.dds': PAYLOAD})
+        self.leave_part('skin.dds', PAYLOAD, etag=ETAG, total=len(PAYLOAD), resumable=True)
+        results = self.run_engine('skin.dds')
+        self.assert_installed(results, 'skin.dds')
+        self.assertEqual([f'bytes={len(PAYLOAD)}-'], [request['range'] for request in self.server.gets('skin.dds')])
+
+    def test_416_on_a_part_that_no_longer_matches_starts_over(self):
+        self.server = serve({'skin.dds': PAYLOAD})
+        self.leave_part('skin.dds', PAYLOAD + b'stale tail', etag=ETAG, resumable=True)
+        results = self.run_engine('skin.dds')
+        self.assert_installed(results, 'skin.dds')
+        self.assertEqual([f'bytes={len(PAYLOAD) + 10}-', None],
+                         [request['range'] for request in self.server.gets('skin.dds')])
+
+    def test_changed_file_is_downloaded_whole(self):
+        self.server = serve({'skin.dds': PAYLOAD})
+        self.leave_part('skin.dds', b'x' * 50000, etag='"old"', total=len(PAYLOAD), resumable=True)
+        results = self.run_engine('skin.dds')
+        self.assert_installed(results, 'skin.dds')  # If-Range didn't match, the server sent a 200 with everything
+
+    def test_dropped_body_without_range_support_fails_cleanly(self):
+        self.server = serve({'skin.dds': PAYLOAD}, ranges=False, drop_after=70000)
+        results = self.run_engine('skin.dds')
+        self.assertFalse(results[0][1])  # Not resumable, a dropped transfer is a failed mod
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'skin.dds') + PART_SUFFIX))
+        self.assertEqual(1, len(self.server.gets('skin.dds')))
+
+
+if __name__ == '__main__':
+    unittest.main()
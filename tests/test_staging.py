@@ -0,0 +1,152 @@
+"""Staged installs: what a publish moves or swaps, the shared game folders it only descends into, and rolling an interrupted
+publish forward with recover_staging."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import wtmo_staging
+from wtmo_staging import StagedInstall, recover_staging, staging_root, ACTION_MOVE, ACTION_SWAP, MARKER_NAME
+
+
+def write(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def tree(folder: str) -> dict:
+    """relative path -> content of every file under folder."""
+    found = {}
+    for base, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(base, name)
+            found[os.path.relpath(path, folder).replace(os.sep, '/')] = read(path)
+    return found
+
+
+class Crash(Exception):
+    """Stands in for the power going out."""
+
+
+def crash_on_move(number: int):
+    """Patch for wtmo_staging._move that lets number - 1 renames through and then crashes."""
+    real_move = wtmo_staging._move
+    calls = [0]
+
+    def move(source, destination):
+        calls[0] += 1
+        if calls[0] == number:
+            raise Crash()
+        real_move(source, destination)
+    return mock.patch('wtmo_staging._move', side_effect=move)
+
+
+class StagingTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.skins = os.path.join(self.root, 'UserSkins')
+        os.makedirs(self.skins)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def stage(self, target: str, files: dict) -> StagedInstall:
+        staged = StagedInstall(target, 'https://example.com/mod.zip', self.root)
+        for rel, content in files.items():
+            write(staged.stage_path(os.path.join(target, rel)), content)
+        return staged
+
+    def plan(self, staged: StagedInstall):
+        return wtmo_staging._plan(staged.target, staged.files_dir, staged.staged)
+
+    def assert_no_staging_left(self):
+        self.assertFalse(os.path.exists(staging_root(self.root)))
+
+    def test_new_folder_is_one_rename(self):
+        staged = self.stage(self.skins, {'tiger/tiger.dds': 'new', 'tiger/tiger.blk': 'new'})
+        self.assertEqual([[ACTION_MOVE, 'tiger']], self.plan(staged))
+        self.assertEqual((1, 2), staged.publish())
+        self.assertEqual({'tiger/tiger.dds': 'new', 'tiger/tiger.blk': 'new'}, tree(self.skins))
+        self.assert_no_staging_left()
+
+    def test_existing_folder_is_swapped_whole(self):
+        write(os.path.join(self.skins, 'tiger', 'tiger.dds'), 'old')
+        write(os.path.join(self.skins, 'tiger', 'kept.dds'), 'unchanged')
+        write(os.path.join(self.skins, 'tiger', 'mine.txt'), 'added by the user')
+        kept_inode = os.stat(os.path.join(self.skins, 'tiger', 'kept.dds')).st_ino
+        staged = self.stage(self.skins, {'tiger/tiger.dds': 'new'})
+        self.assertEqual([[ACTION_SWAP, 'tiger']], self.plan(staged))
+
+        self.assertEqual((2, 1), staged.publish())  # Old folder aside, new one in
+        self.assertEqual({'tiger/tiger.dds': 'new', 'tiger/kept.dds': 'unchanged', 'tiger/mine.txt': 'added by the user'},
+                         tree(self.skins))
+        # Files the update didn't touch were hardlinked into the new folder, not copied
+        self.assertEqual(kept_inode, os.stat(os.path.join(self.skins, 'tiger', 'kept.dds')).st_ino)
+        self.assert_no_staging_left()
+
+    def test_loose_file_replaces_the_old_one(self):
+        write(os.path.join(self.skins, 'tiger.blk'), 'old')
+        staged = self.stage(self.skins, {'tiger.blk': 'new'})
+        self.assertEqual([[ACTION_MOVE, 'tiger.blk']], self.plan(staged))
+        staged.publish()
+        self.assertEqual({'tiger.blk': 'new'}, tree(self.skins))
+
+    def test_shared_game_folders_are_descended_into_not_swapped(self):
+        # An uncategorized archive unpacked into the game folder that brings its own UserSkins/ and UserMissions/
+        write(os.path.join(self.skins, 'panther', 'panther.dds'), 'someone else')
+        write(os.path.join(self.root, 'UserMissions', 'raid.blk'), 'old raid')
+        staged = self.stage(self.root, {os.path.join('UserSkins', 'tiger', 'tiger.dds'): 'new',
+                                        os.path.join('UserMissions', 'raid.blk'): 'new raid'})
+        self.assertEqual([[ACTION_MOVE, os.path.join('UserMissions', 'raid.blk')],
+                          [ACTION_MOVE, os.path.join('UserSkins', 'tiger')]], self.plan(staged))
+        staged.publish()
+        self.assertEqual({'panther/panther.dds': 'someone else', 'tiger/tiger.dds': 'new'}, tree(self.skins))
+        self.assertEqual('new raid', read(os.path.join(self.root, 'UserMissions', 'raid.blk')))
+
+    def test_crash_after_moving_the_old_folder_aside_is_rolled_forward(self):
+        write(os.path.join(self.skins, 'tiger', 'tiger.dds'), 'old')
+        write(os.path.join(self.skins, 'tiger', 'mine.txt'), 'added by the user')
+        staged = self.stage(self.skins, {'tiger/tiger.dds': 'new', 'tiger/tiger.blk': 'new'})
+        with crash_on_move(2), self.assertRaises(Crash):
+            staged.publish()
+        self.assertFalse(os.path.exists(os.path.join(self.skins, 'tiger')))  # The moment the game must never see for long
+        self.assertTrue(os.path.isfile(os.path.join(staged.root, MARKER_NAME)))
+
+        self.assertEqual((1, 0), recover_staging([self.root]))
+        self.assertEqual({'tiger/tiger.dds': 'new', 'tiger/tiger.blk': 'new', 'tiger/mine.txt': 'added by the user'},
+                         tree(self.skins))
+        self.assert_no_staging_left()
+
+    def test_crash_part_way_through_a_plan_finishes_the_rest(self):
+        staged = self.stage(self.root, {os.path.join('UserSkins', 'tiger', 'tiger.dds'): 'new',
+                                        os.path.join('UserMissions', 'raid.blk'): 'new raid'})
+        with crash_on_move(2), self.assertRaises(Crash):
+            staged.publish()
+        self.assertEqual((1, 0), recover_staging([self.root, None]))
+        self.assertEqual((0, 0), recover_staging([self.root]))  # Nothing left the second time
+        self.assertEqual({'tiger/tiger.dds': 'new'}, tree(self.skins))
+        self.assertEqual('new raid', read(os.path.join(self.root, 'UserMissions', 'raid.blk')))
+
+    def test_crash_before_publishing_is_discarded(self):
+        write(os.path.join(self.skins, 'tiger', 'tiger.dds'), 'old')
+        self.stage(self.skins, {'tiger/tiger.dds': 'half written'})  # Unpacking never finished, no marker
+        self.assertEqual((0, 1), recover_staging([self.root]))
+        self.assertEqual({'tiger/tiger.dds': 'old'}, tree(self.skins))
+        self.assert_no_staging_left()
+
+    def test_paths_outside_the_target_are_refused(self):
+        staged = StagedInstall(self.skins, 'https://example.com/evil.zip', self.root)
+        with self.assertRaises(ValueError):
+            staged.stage_path(os.path.join(self.skins, os.pardir, 'WarThunder.exe'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Settings store: the old JSON settings file is migrated into SQLite once, and later opens never import it again."""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from wtmo_store import SettingsStore
+
+LEGACY = {
+    'root_folder': 'C:/Games/War Thunder',
+    'production_folder': 'C:/Users/me/Documents/My Games/WarThunder',
+    'max_downloads': 6,
+    'cache_enabled': False,
+    'master_list': [
+        {'url': 'https://example.com/tiger.zip', 'category': 'camouflage'},
+        'https://example.com/raid.blk',  # Very old lists held bare urls
+        {'url': 'https://example.com/reticle.zip', 'category': None},
+    ],
+    'download_meta': {
+        'https://example.com/raid.blk': {'etag': '"r1"', 'content_length': 300, 'category': 'mission'},
+        'https://example.com/tiger.zip': {'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT', 'content_length': 5000},
+    },
+}
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.folder, 'settings.db')
+        self.json_path = os.path.join(self.folder, 'settings.json')
+        with open(self.json_path, 'w') as f:
+            json.dump(LEGACY, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def open(self) -> SettingsStore:
+        store = SettingsStore(self.db_path, self.json_path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_legacy_settings_are_migrated(self):
+        store = self.open()
+        self.assertEqual('C:/Games/War Thunder', store.get('root_folder'))
+        self.assertEqual(6, store.get('max_downloads'))
+        self.assertIs(False, store.get('cache_enabled'))
+        self.assertIsNone(store.get('master_list'))  # Went into its own table, not the settings
+        self.assertEqual([{'url': 'https://example.com/tiger.zip', 'category': 'camouflage'},
+                          {'url': 'https://example.com/raid.blk', 'category': 'mission'},  # Filled in from download_meta
+                          {'url': 'https://example.com/reticle.zip', 'category': None}], store.mods())
+        self.assertEqual('"r1"', store.download_meta('https://example.com/raid.blk')['etag'])
+        self.assertEqual(5000, store.master_list_meta()['https://example.com/tiger.zip']['content_length'])
+        self.assertTrue(os.path.exists(self.json_path))  # Left in place
+
+    def test_migration_runs_once(self):
+        store = self.open()
+        store.remove_mod('https://example.com/tiger.zip')
+        store.set('max_downloads', 2)
+        store.close()
+
+        reopened = self.open()
+        self.assertEqual(2, reopened.get('max_downloads'))  # Not overwritten by the JSON again
+        self.assertFalse(reopened.has_mod('https://example.com/tiger.zip'))  # Not re-imported
+        self.assertEqual(2, reopened.mod_count())
+
+    def test_unreadable_legacy_file_still_counts_as_migrated(self):
+        with open(self.json_path, 'w') as f:
+            f.write("{half a file")
+        self.assertEqual(0, self.open().mod_count())
+        with open(self.json_path, 'w') as f:
+            json.dump(LEGACY, f)
+        self.assertEqual(0, self.open().mod_count())
+
+    def test_fresh_install_without_a_legacy_file(self):
+        os.remove(self.json_path)
+        store = self.open()
+        self.assertEqual(0, store.mod_count())
+        self.assertIs(True, store.get('legacy_json_migrated'))
+        self.assertTrue(store.add_mod('https://example.com/new.zip', 'camouflage'))
+        self.assertFalse(store.add_mod('https://example.com/new.zip'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Headless sync: the exit status for bad arguments, an unreadable modlist, a clean run, a partly failed run, a runtime error and
+Ctrl+C."""
+
+import io
+import os
+import json
+import shutil
+import _thread
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stderr
+from unittest import mock
+
+from wtmo_sync import main, sync, SyncReporter, EXIT_OK, EXIT_FAILED, EXIT_USAGE, EXIT_CANCELLED
+from wtmo_modfile import write_modlist
+from wtmo_modlist import CATEGORY_CAMO, CATEGORY_MISSION
+from wtmo_manifest import InstallManifest
+from wtmo_store import SettingsStore
+
+from tests.httpfixtures import serve
+
+
+class SyncExitStatusTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.root = os.path.join(self.folder, 'War Thunder')
+        os.makedirs(self.root)
+        self.server = serve({'tiger.blk': b'skin' * 100, 'raid.blk': b'mission' * 100})
+        self.modlist = os.path.join(self.folder, 'list.ndjson.gz')
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def write(self, *names):
+        categories = {'tiger.blk': CATEGORY_CAMO, 'raid.blk': CATEGORY_MISSION}
+        write_modlist(self.modlist, [{'url': self.server.url(name), 'category': categories.get(name)} for name in names])
+
+    def run_main(self, *extra):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            status = main(['--sync', self.modlist, '--root', self.root, '--no-cache', *extra])
+        return status, stderr.getvalue()
+
+    def test_missing_game_folder_is_a_usage_error(self):
+        self.write('tiger.blk')
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(EXIT_USAGE, main(['--sync', self.modlist, '--root', os.path.join(self.folder, 'nope')]))
+
+    def test_missing_modlist_is_a_usage_error(self):
+        status, stderr = self.run_main()
+        self.assertEqual(EXIT_USAGE, status)
+        self.assertIn("Modlist not found", stderr)
+
+    def test_unreadable_modlist_is_a_usage_error_and_touches_nothing(self):
+        self.write('tiger.blk', 'raid.blk')
+        with open(self.modlist, 'rb') as f:
+            data = f.read()
+        with open(self.modlist, 'wb') as f:
+            f.write(data[:len(data) // 2])  # Cut short, as a partial download of a shared list would be
+        status, stderr = self.run_main()
+        self.assertEqual(EXIT_USAGE, status)
+        self.assertIn("Could not read modlist", stderr)
+        self.assertEqual([], os.listdir(self.root))
+
+    def test_everything_installed_is_ok(self):
+        self.write('tiger.blk', 'raid.blk')
+        status, _ = self.run_main()
+        self.assertEqual(EXIT_OK, status)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, 'UserSkins', 'tiger.blk')))
+        self.assertTrue(os.path.isfile(os.path.join(self.root, 'UserMissions', 'raid.blk')))
+
+    def test_one_failed_mod_fails_the_run(self):
+        self.write('tiger.blk', 'gone.blk')
+        status, _ = self.run_main()
+        self.assertEqual(EXIT_FAILED, status)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, 'UserSkins', 'tiger.blk')))
+
+    def test_runtime_error_is_a_failure_with_its_own_message(self):
+        self.write('tiger.blk')
+        with mock.patch('wtmo_sync.DownloadEngine', side_effect=OSError(28, "No space left on device")):
+            status, stderr = self.run_main()
+        self.assertEqual(EXIT_FAILED, status)
+        self.assertIn("No space left on device", stderr)
+        self.assertNotIn("Could not read modlist", stderr)
+
+
+class SyncCancelTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.root = os.path.join(self.folder, 'War Thunder')
+        os.makedirs(self.root)
+        self.server = serve({'big.dds': os.urandom(256 * 1024)}, stall=30)
+        self.modlist = os.path.join(self.folder, 'list.ndjson.gz')
+        write_modlist(self.modlist, [{'url': self.server.url('big.dds'), 'category': CATEGORY_CAMO}])
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_ctrl_c_cancels_at_once(self):
+        def interrupt():
+            if self.server.stalled.wait(10):
+                _thread.interrupt_main()  # What Ctrl+C does to the main thread
+
+        out = io.StringIO()
+        threading.Thread(target=interrupt, daemon=True).start()
+        store = SettingsStore(os.path.join(self.folder, 'settings.db'), os.path.join(self.folder, 'legacy.json'))
+        try:
+            status = sync(self.modlist, self.root, use_cache=False, store=store, reporter=SyncReporter(out),
+                          manifest=InstallManifest(os.path.join(self.folder, 'manifest.json')), memory_extract_mb=0)
+        finally:
+            store.close()
+        self.assertEqual(EXIT_CANCELLED, status)
+        done = json.loads(out.getvalue().splitlines()[-1])
+        self.assertEqual(('done', EXIT_CANCELLED, 0), (done['event'], done['status'], done['installed']))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'UserSkins', 'big.dds')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Update checks: conditional requests against the stand-in server, and what counts as changed, unchanged or unknown."""
+
+import unittest
+
+from wtmo_downloads import check_for_updates, UPDATE_UNCHANGED, UPDATE_CHANGED, UPDATE_UNKNOWN, UPDATE_ERROR
+
+from tests.httpfixtures import serve, ETAG
+
+BODY = b'texture' * 100
+
+
+class UpdateCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+
+    def serve(self, **options):
+        server = serve({'tiger.zip': BODY}, **options)
+        self.servers.append(server)
+        return server
+
+    def check(self, server, validators):
+        url = server.url('tiger.zip')
+        return check_for_updates({url: validators})[url]
+
+    def test_same_etag_is_unchanged(self):
+        server = self.serve()
+        self.assertEqual(UPDATE_UNCHANGED, self.check(server, {'etag': ETAG}))
+        self.assertEqual(ETAG, server.requests[0]['if_none_match'])  # Asked with If-None-Match and got a 304
+
+    def test_new_etag_is_changed(self):
+        self.assertEqual(UPDATE_CHANGED, self.check(self.serve(), {'etag': '"v0"'}))
+
+    def test_server_ignoring_conditional_requests_is_compared_by_hand(self):
+        server = self.serve(conditional=False)
+        self.assertEqual(UPDATE_UNCHANGED, self.check(server, {'etag': ETAG}))
+        self.assertEqual(UPDATE_CHANGED, self.check(server, {'etag': '"v0"'}))
+
+    def test_size_only_compares_content_length(self):
+        server = self.serve(etag=None)
+        self.assertEqual(UPDATE_UNCHANGED, self.check(server, {'content_length': len(BODY)}))
+        self.assertEqual(UPDATE_CHANGED, self.check(server, {'content_length': len(BODY) + 1}))
+
+    def test_nothing_to_compare_is_unknown(self):
+        server = self.serve(etag=None, lengths=False)
+        self.assertEqual(UPDATE_UNKNOWN, self.check(server, {'content_length': len(BODY)}))
+        self.assertEqual(UPDATE_UNKNOWN, self.check(server, {'etag': ETAG}))  # Sent, but the answer carries no ETag
+
+    def test_no_stored_validators_is_unknown_without_a_request(self):
+        server = self.serve()
+        self.assertEqual(UPDATE_UNKNOWN, self.check(server, {}))
+        self.assertEqual([], server.requests)
+
+    def test_dead_link_is_an_error_and_every_url_gets_an_answer(self):
+        server = self.serve()
+        entries = {server.url('tiger.zip'): {'etag': ETAG}, server.url('gone.zip'): {'etag': ETAG}}
+        results = check_for_updates(entries)
+        self.assertEqual({server.url('tiger.zip'): UPDATE_UNCHANGED, server.url('gone.zip'): UPDATE_ERROR}, results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+"""
+Local archive cache for the Mod Organizer
+Keeps downloaded mod archives on disk, addressed by their SHA-256, so reinstalling or re-importing a modlist runs at disk speed
+instead of pulling everything from live.warthunder.com again. Old archives are evicted least-recently-used first once the
+cache grows past its disk budget.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict
+
+CACHE_DIR = Path.home() / '.mod_organizer_cache' / 'archives'
+DEFAULT_CACHE_BUDGET_MB = 2048
+HASH_CHUNK_SIZE = 1024 * 1024
+
+'''Layout on disk: every archive lives in "<sha256>/<original filename>" so the file keeps its real name (the camo unpacker names
+loose-texture folders after the zip) while identical archives served from different urls are only stored once. index.json maps
+each url to the hash it last resolved to, and lists the blobs in least-recently-used order. The index is kept in memory and written
+(to a temp file, then swapped in) by flush() once per download run rather than on every lookup. Blob folders a crash left out of the
+index are swept on the next start.'''
+
+
+def file_sha256(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArchiveCache:
+    """Content-addressed, size-bounded cache of downloaded mod files."""
+    def __init__(self, budget_mb: int = DEFAULT_CACHE_BUDGET_MB, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / 'index.json'
+        self.budget_bytes = max(0, int(budget_mb)) * 1024 * 1024
+        self._lock = threading.RLock()
+        self._urls: Dict[str, Dict] = {}  # url -> {sha256, filename, etag, last_modified}
+        self._blobs: 'OrderedDict[str, Dict]' = OrderedDict()  # sha256 -> {filename, size}, oldest use first
+        self._pinned: Dict[str, int] = {}  # sha256 -> number of installs currently reading it
+        self._doomed: set = set()  # sha256 of bad blobs still pinned, deleted on their last release
+        self._dirty = False  # index changed since the last flush()
+        self._load()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(blob['size'] for blob in self._blobs.values())
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Return {path, filename, sha256, etag, last_modified} for a cached url and pin it, or None on a miss.
+
+        Call release() with the sha256 once the file has been installed."""
+        with self._lock:
+            entry = self._urls.get(url)
+            if not entry:
+                return None
+            sha = entry['sha256']
+            blob = self._blobs.get(sha)
+            path = self._blob_path(sha, blob['filename']) if blob else None
+            if not blob or not path.exists() or path.stat().st_size != blob['size']:
+                # Blob went missing or was tampered with, treat as a miss
+                self._drop_blob(sha)
+                self._dirty = True
+                return None
+            self._blobs.move_to_end(sha)
+            self._pin(sha)
+            self._dirty = True
+            return dict(entry, path=str(path), filename=entry.get('filename') or blob['filename'])
+
+    def peek(self, url: str) -> Optional[Dict]:
+        """{filename, size} of a cached url without pinning it or touching its LRU position, None on a miss."""
+        with self._lock:
+            entry = self._urls.get(url)
+            blob = self._blobs.get(entry['sha256']) if entry else None
+            if not blob:
+                return None
+            return {'filename': entry.get('filename') or blob['filename'], 'size': blob['size']}
+
+    def store(self, url: str, filepath: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> Dict:
+        """Move a freshly downloaded file into the cache and return its lookup() record, pinned.
+
+        If the same content is already cached the new copy is simply deleted."""
+        filename = os.path.basename(filepath)
+        sha = file_sha256(filepath)
+        size = os.path.getsize(filepath)
+        with self._lock:
+            blob = self._blobs.get(sha)
+            if blob and self._blob_path(sha, blob['filename']).exists():
+                os.remove(filepath)
+            else:
+                blob = {'filename': filename, 'size': size}
+                destination = self._blob_path(sha, filename)
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(filepath, destination)
+                self._blobs[sha] = blob
+            self._blobs.move_to_end(sha)
+            self._urls[url] = {'sha256': sha, 'filename': filename, 'etag': etag, 'last_modified': last_modified}
+            self._pin(sha)
+            self._evict()
+            self._dirty = True
+            return dict(self._urls[url], path=str(self._blob_path(sha, blob['filename'])))
+
+    def store_buffer(self, url: str, buffer, filename: str, sha: str, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> Dict:
+        """store() for an archive downloaded into memory, sha is its already computed SHA-256. The buffer is left open and rewound."""
+        with self._lock:
+            blob = self._blobs.get(sha)
+            if not (blob and self._blob_path(sha, blob['filename']).exists()):
+                destination = self._blob_path(sha, filename)
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = destination.with_name(destination.name + '.tmp')
+                buffer.seek(0)
+                with open(tmp_path, 'wb') as f:
+                    shutil.copyfileobj(buffer, f, HASH_CHUNK_SIZE)
+                os.replace(tmp_path, destination)
+                buffer.seek(0)
+                blob = {'filename': filename, 'size': os.path.getsize(destination)}
+                self._blobs[sha] = blob
+            self._blobs.move_to_end(sha)
+            self._urls[url] = {'sha256': sha, 'filename': filename, 'etag': etag, 'last_modified': last_modified}
+            self._pin(sha)
+            self._evict()
+            self._dirty = True
+            return dict(self._urls[url], path=str(self._blob_path(sha, blob['filename'])))
+
+    def release(self, sha: str):
+        """Unpin a blob handed out by lookup() or store() so it can be evicted again."""
+        with self._lock:
+            count = self._pinned.get(sha, 0) - 1
+            if count > 0:
+                self._pinned[sha] = count
+            else:
+                self._pinned.pop(sha, None)
+                if sha in self._doomed:
+                    self._doomed.discard(sha)
+                    self._drop_blob(sha)
+            self._evict()
+            self._dirty = True
+
+    def invalidate(self, url: str, sha: str):
+        """release() for an archive that turned out to be broken: the url is forgotten and the blob deleted (once nothing else
+        is reading it), so the next install downloads it again."""
+        with self._lock:
+            self._urls.pop(url, None)
+            self._doomed.add(sha)
+            self.release(sha)
+
+    def forget(self, url: str):
+        """Drop a url's mapping, the blob itself stays until evicted."""
+        with self._lock:
+            if self._urls.pop(url, None) is not None:
+                self._dirty = True
+
+    def flush(self):
+        """Write the index if anything changed since the last flush. The download engine calls this when a run ends."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def close(self):
+        self.flush()
+
+    def _pin(self, sha: str):
+        self._pinned[sha] = self._pinned.get(sha, 0) + 1
+
+    def _evict(self):
+        """Delete least-recently-used blobs until the cache fits its budget. Pinned blobs are never evicted."""
+        total = sum(blob['size'] for blob in self._blobs.values())
+        for sha in list(self._blobs):
+            if total <= self.budget_bytes:
+                break
+            if sha in self._pinned:
+                continue
+            total -= self._blobs[sha]['size']
+            self._drop_blob(sha)
+
+    def _drop_blob(self, sha: str):
+        self._blobs.pop(sha, None)
+        shutil.rmtree(self.cache_dir / sha, ignore_errors=True)
+        for url in [u for u, e in self._urls.items() if e['sha256'] == sha]:
+            del self._urls[url]
+
+    def _blob_path(self, sha: str, filename: str) -> Path:
+        return self.cache_dir / sha / filename
+
+    def _load(self):
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    data = json.load(f)
+                self._urls = data.get('urls', {})
+                self._blobs = OrderedDict(data.get('blobs', []))
+            except Exception as e:
+                print(f"Archive cache index unreadable, starting empty: {e}")
+                self._urls, self._blobs = {}, OrderedDict()
+        # Blobs stored after the last flush before a crash are unknown to the index, nothing can find them any more
+        for entry in self.cache_dir.iterdir():
+            if entry.is_dir() and len(entry.name) == 64 and entry.name not in self._blobs:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def _save(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'urls': self._urls, 'blobs': list(self._blobs.items())}, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Could not save archive cache index: {e}")
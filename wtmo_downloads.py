@@ -0,0 +1,1074 @@
+"""
+Download engine for the Mod Organizer
+Runs the modlist through a bounded worker pool on one shared, connection-pooled HTTP session.
+Kept free of Qt so the GUI's DownloadThread is only a thin wrapper around it.
+"""
+
+import os
+import json
+import shutil
+import socket
+import zipfile
+import time
+import hashlib
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+from typing import Optional, List, Dict, Callable, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import exceptions as urllib3_errors
+
+from wtmo_cache import ArchiveCache
+from wtmo_manifest import InstallManifest, file_crc32
+from wtmo_extract import extract_members, DEFAULT_MEMBER_WORKERS
+from wtmo_staging import StagedInstall, is_within
+from wtmo_modlist import CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+from wtmo_trace import (
+    ModTrace, TraceWriter, instrument_session, take_connect_time, SPAN_QUEUED, SPAN_SLOT_WAIT, SPAN_CONNECT, SPAN_TTFB,
+    SPAN_TRANSFER, SPAN_CACHE_STORE, SPAN_EXTRACT_WAIT, SPAN_EXTRACT
+)
+
+'''Defaults for the worker pool. Nearly every mod is served from live.warthunder.com so the per-host cap is the one that
+usually matters, the total cap only kicks in when a modlist mixes hosts. Both can be changed in the settings file.'''
+DEFAULT_MAX_DOWNLOADS = 6
+DEFAULT_MAX_DOWNLOADS_PER_HOST = 4
+CONNECT_TIMEOUT = 10  # Seconds to set up a connection
+READ_TIMEOUT = 30  # Seconds a server may go silent (before the headers or mid-body) before the attempt counts as dropped
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+CHUNK_SIZE = 8192
+
+# Resumable transfers
+JOURNAL_PATH = Path.home() / '.mod_organizer_partials.json'
+PART_SUFFIX = '.part'
+JOURNAL_FLUSH_BYTES = 1024 * 1024  # How often the bytes-written count is saved mid-transfer
+MAX_RESUME_ATTEMPTS = 3  # Tries per mod in one run before a dropped connection counts as a failure
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout)
+
+# Download -> extract pipeline
+DEFAULT_EXTRACT_WORKERS = 1
+MAX_PENDING_EXTRACTS = 4  # Archives allowed to wait for the extractor before downloads pause
+MAX_PENDING_EXTRACT_BYTES = 512 * 1024 * 1024  # Disk the waiting archives may take up before downloads pause
+
+'''Small zips skip the disk on the way in: the body is streamed into a SpooledTemporaryFile, hashed as it arrives, and unpacked
+straight from memory. A download that turns out bigger than the threshold (no or wrong Content-Length) spills over into a temp file by
+itself. With the archive cache on, the buffer is written to the cache once, where it used to be written as .part, renamed, moved, read
+back to hash it and read again to unpack it. Memory transfers aren't journaled, a dropped one just fails like any non-resumable one.'''
+DEFAULT_MEMORY_EXTRACT_MB = 16
+
+# Scheduling
+ORDER_LIST = 'list'  # the order the mods are listed in
+ORDER_SMALLEST = 'smallest'  # smallest first: known sizes, otherwise sights and missions before camouflage
+DOWNLOAD_ORDERS = (ORDER_LIST, ORDER_SMALLEST)
+CATEGORY_SIZE_RANK = {CATEGORY_SIGHT: 0, CATEGORY_MISSION: 1, CATEGORY_CAMO: 2}  # typical archive size, smallest first
+MIN_CHUNK_SIZE = CHUNK_SIZE
+MAX_CHUNK_SIZE = 1024 * 1024
+CHUNK_TARGET_SECONDS = 0.1  # Aim for each read to take about this long at the measured throughput
+
+ProgressCallback = Callable[[str, int, int], None]  # message, current, total
+FinishedCallback = Callable[[str, bool, str], None]  # url, success, message
+
+
+def make_session(pool_size: int = DEFAULT_MAX_DOWNLOADS) -> requests.Session:
+    """Create a requests session whose connection pool is large enough for every worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return instrument_session(session)  # Lets download traces tell connect time apart from time to first byte
+
+
+class HostLimiter:
+    """Caps how many transfers may talk to the same host at once."""
+    def __init__(self, per_host: int):
+        self.per_host = max(1, per_host)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._slots[host]
+
+    @contextmanager
+    def slot(self, url: str):
+        semaphore = self._semaphore(url)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+'''Mods are put in a queue order before the pool sees them: a mod's user priority ('priority', higher first) always comes first, then
+the chosen order. For ORDER_SMALLEST a mod's 'size' (from the last download's Content-Length or the modlist) is used when known,
+unknown sizes are ranked by category since sights and missions are nearly always a fraction of a camo pack. Ties keep list order.'''
+def schedule_mods(mods: List[Dict], order: str = ORDER_LIST) -> List[Dict]:
+    """Return mods in the order they should be downloaded."""
+    def key(item):
+        index, mod = item
+        priority = -(mod.get('priority') or 0)
+        if order == ORDER_SMALLEST:
+            size = mod.get('size')
+            rank = CATEGORY_SIZE_RANK.get(mod.get('category'), len(CATEGORY_SIZE_RANK))
+            return priority, 0 if size else 1, size or 0, rank, index
+        return priority, index
+    return [mod for _, mod in sorted(enumerate(mods), key=key)]
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every transfer, caps the combined download rate. A rate of 0 means unlimited."""
+    def __init__(self, bytes_per_second: int = 0):
+        self.rate = max(0, int(bytes_per_second))
+        self._lock = threading.Lock()
+        self._tokens = float(self.rate)
+        self._last = time.monotonic()
+
+    def consume(self, amount: int, cancelled: Optional[Callable[[], bool]] = None):
+        """Block until amount bytes may be read. Waits in short steps so a cancel isn't held up."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # A one second burst at most, so a paused transfer can't bank unlimited credit
+            self._tokens = min(float(self.rate), self._tokens + (now - self._last) * self.rate) - amount
+            self._last = now
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancelled and cancelled()):
+                return
+            time.sleep(min(remaining, 0.1))
+
+
+class AdaptiveChunker:
+    """Picks the next read size for one transfer from the throughput measured so far."""
+    def __init__(self, rate_cap: int = 0):
+        self.size = MIN_CHUNK_SIZE
+        self.rate_cap = rate_cap  # With a bandwidth cap keep reads small enough for the limiter to pace them smoothly
+        self._started = time.monotonic()
+        self._received = 0
+
+    def update(self, received: int) -> int:
+        self._received += received
+        elapsed = time.monotonic() - self._started
+        if elapsed > 0:
+            throughput = self._received / elapsed
+            if self.rate_cap:
+                throughput = min(throughput, self.rate_cap)
+            target = int(throughput * CHUNK_TARGET_SECONDS)
+            size = MIN_CHUNK_SIZE
+            while size * 2 <= target and size < MAX_CHUNK_SIZE:
+                size *= 2
+            # Shrinks at once but grows one step per read: the first reads come out of buffers the server filled in a burst and
+            # say nothing about the link, a jump straight to MAX_CHUNK_SIZE would block a slow transfer on one huge read
+            self.size = min(size, self.size * 2)
+        return self.size
+
+
+class OrderedReporter:
+    """Passes per-mod results on in queue order, no matter which worker finishes first.
+
+    A result of None marks a mod that was skipped (cancelled before it started) and is stepped over silently."""
+    def __init__(self, total: int, progress: Optional[ProgressCallback], finished: Optional[FinishedCallback]):
+        self.total = total
+        self.progress = progress
+        self.finished = finished
+        self.reported = 0
+        self._next = 0
+        self._pending: Dict[int, Optional[Tuple[str, bool, str]]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, index: int):
+        with self._lock:
+            if self.progress:
+                self.progress(f"Downloading {index + 1}/{self.total}", self.reported, self.total)
+
+    def done(self, index: int, result: Optional[Tuple[str, bool, str]]):
+        with self._lock:
+            self._pending[index] = result
+            while self._next in self._pending:
+                ready = self._pending.pop(self._next)
+                self._next += 1
+                if ready is not None:
+                    self.reported += 1
+                    if self.finished:
+                        self.finished(*ready)
+
+
+def _content_range_start(response) -> Optional[int]:
+    """First byte offset of a 206 response, from its Content-Range header."""
+    content_range = response.headers.get('content-range', '')
+    if content_range.startswith('bytes ') and '-' in content_range:
+        start = content_range[6:].split('-', 1)[0].strip()
+        if start.isdigit():
+            return int(start)
+    return None
+
+
+class PartialJournal:
+    """Small JSON file that remembers unfinished downloads between runs.
+
+    Each entry is keyed by url and holds the final path (the data itself sits in path + '.part'), the ETag / Last-Modified the
+    transfer started with, the expected total size and the bytes written so far."""
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except Exception:
+                self._entries = {}
+        # Forget entries whose .part file has been deleted by hand
+        self._entries = {url: e for url, e in self._entries.items()
+                         if isinstance(e, dict) and os.path.exists(e.get('path', '') + PART_SUFFIX)}
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(url)
+            return dict(entry) if entry else None
+
+    def owns(self, filepath: str) -> bool:
+        with self._lock:
+            return any(e.get('path') == filepath for e in self._entries.values())
+
+    def update(self, url: str, **fields):
+        with self._lock:
+            self._entries.setdefault(url, {}).update(fields)
+            self._save()
+
+    def remove(self, url: str):
+        with self._lock:
+            if self._entries.pop(url, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save download journal: {e}")
+
+
+def _abort_response(response):
+    """Shut down the socket under a streaming response so a read blocked on it in another thread fails right away.
+
+    Closing the response isn't enough: close() waits for the lock the blocked read is holding, so it would only return once that read
+    timed out. The socket is reached through the response's fileno(), the worker still closes the response itself as usual."""
+    try:
+        fd = response.raw.fileno()
+    except (AttributeError, OSError, ValueError):
+        response.close()  # No socket left under it (body read or already closed), nothing can be blocked on it
+        return
+    try:
+        # Wraps the response's own descriptor (a SOCKET handle on Windows) rather than a duplicate, family and type are read
+        # from it so IPv6 connections work too. detach() hands it back untouched, closing it stays the response's job.
+        sock = socket.socket(fileno=fd)
+    except OSError:
+        return  # Already closed
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already shut down
+    finally:
+        sock.detach()
+
+
+def _file_size(filepath: str) -> int:
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+class ExtractQueue:
+    """Bounded hand-off from the download workers to the extraction stage.
+
+    put() blocks while max_items archives are already waiting, or while the archives queued or being unpacked add up to more than
+    max_bytes. A single archive bigger than max_bytes is still let through once everything ahead of it has been unpacked."""
+    def __init__(self, max_items: int, max_bytes: int):
+        self.max_items = max(1, max_items)
+        self.max_bytes = max_bytes
+        self._items = deque()
+        self._pending_bytes = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, job, size: int):
+        with self._cond:
+            while self._pending_bytes and (len(self._items) >= self.max_items
+                                           or self._pending_bytes + size > self.max_bytes):
+                self._cond.wait()
+            self._items.append((job, size))
+            self._pending_bytes += size
+            self._cond.notify_all()
+
+    def get(self):
+        """Next (job, size) to unpack, or None once the queue is closed and drained."""
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def done(self, size: int):
+        """Release the disk budget held by an archive once it has been unpacked."""
+        with self._cond:
+            self._pending_bytes -= size
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def response_filename(response, url: str) -> str:
+    """The file name a download response is saved under: Content-Disposition, else the last part of the final url."""
+    cd = response.headers.get('content-disposition', '')
+    filename = None
+
+    if cd and 'filename=' in cd:
+        # Extract value after 'filename='
+        raw_name = cd.split('filename=')[1]
+
+        # Handle parameters that might follow (e.g., filename="name.zip"; size=123)
+        if ';' in raw_name:
+            raw_name = raw_name.split(';')[0]
+
+        # Clean quotes and whitespace
+        filename = raw_name.strip().strip('"\'')
+
+        # Decode URL encoding if present (e.g., UTF-8''filename.zip)
+        if filename:
+            filename = unquote(filename)
+
+    # 2. Validate Header Filename
+    # If header exists but is generic, then fall through to URL parsing
+    if filename and filename != 'mod_download.zip':
+        return filename
+
+    # 3. Fallback to the Actual Downloaded URL (response.url)
+    final_url = response.url if hasattr(response, 'url') else url
+    parsed_path = urlparse(final_url).path
+    url_filename = os.path.basename(parsed_path)
+
+    # 4. Parse File Type and Name from URL
+    if url_filename:
+        if '?' in url_filename:
+            url_filename = url_filename.split('?')[0]
+
+        if url_filename.endswith('.blk'):
+            return url_filename
+        # Return whatever extension was found (.zip, .rar, etc.)
+        return url_filename
+
+    # 5. Final Fallback
+    return 'mod_download.zip'
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a worker when the user cancels mid-transfer."""
+
+
+class ExtractionFailed(Exception):
+    """Raised by _unpack_archive when an archive can't be unpacked, the mod is reported as failed."""
+
+
+class DownloadEngine:
+    """Downloads and unpacks a batch of mods with a bounded pool of workers.
+
+    mods are dicts of {url, target, category} as built by ModOrganizer.download_all. progress and finished_download
+    are plain callables so the same engine can feed Qt signals or anything else."""
+    def __init__(self, root_folder: str, max_downloads: int = DEFAULT_MAX_DOWNLOADS,
+                 max_downloads_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST,
+                 session: Optional[requests.Session] = None, journal: Optional[PartialJournal] = None,
+                 extract_workers: int = DEFAULT_EXTRACT_WORKERS, max_pending_extracts: int = MAX_PENDING_EXTRACTS,
+                 max_pending_extract_bytes: int = MAX_PENDING_EXTRACT_BYTES, cache: Optional[ArchiveCache] = None,
+                 manifest: Optional[InstallManifest] = None, member_workers: int = DEFAULT_MEMBER_WORKERS,
+                 memory_extract_mb: int = DEFAULT_MEMORY_EXTRACT_MB, order: str = ORDER_LIST,
+                 bandwidth_limit_kbps: int = 0, tracer: Optional[TraceWriter] = None,
+                 production_folder: Optional[str] = None):
+        self.root_folder = root_folder
+        self.production_folder = production_folder  # Holds UserSights, sights are staged there rather than in the game folder
+        self.tracer = tracer  # Gets a ModTrace of every mod that finished or failed
+        self.order = order
+        self.bandwidth = BandwidthLimiter(max(0, int(bandwidth_limit_kbps)) * 1024)  # KB/s across every transfer, 0 = no cap
+        self.memory_extract_bytes = max(0, int(memory_extract_mb)) * 1024 * 1024  # 0 turns in-memory downloads off
+        self.member_workers = max(1, member_workers)
+        self.max_downloads = max(1, max_downloads)
+        self.extract_workers = max(1, extract_workers)
+        self.max_pending_extracts = max_pending_extracts
+        self.max_pending_extract_bytes = max_pending_extract_bytes
+        self.host_limiter = HostLimiter(max_downloads_per_host)
+        self.session = session or make_session(self.max_downloads)
+        self.journal = journal or PartialJournal()
+        self.cache = cache
+        self.manifest = manifest
+        self.progress: Optional[ProgressCallback] = None
+        self.finished_download: Optional[FinishedCallback] = None
+        self.validators: Dict[str, Dict] = {}  # url -> {etag, last_modified, content_length, category} of each installed mod
+        self.conflicts: Dict[str, List[str]] = {}  # url -> other installed mods whose files it overwrote
+        self._validators_lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._paths_lock = threading.Lock()
+        self._paths_in_use = set()
+        self._local = threading.local()  # .trace: the ModTrace of the mod this thread is working on
+        self._responses = set()  # Streaming responses being read right now, aborted by cancel()
+        self._responses_lock = threading.Lock()
+        self.idle = threading.Event()  # Set whenever run() isn't running
+        self.idle.set()
+        self._cancelled_at: Optional[float] = None
+        self.cancel_latency: Optional[float] = None  # Seconds from cancel() until run() had stopped every worker
+
+    '''cancel() never waits: it flags the workers, then shuts down the socket of every transfer in flight so a read stuck on a stalled
+    server fails at once instead of sitting out the read timeout. Workers about to connect see the flag before their request and
+    a request still waiting for its headers is bounded by REQUEST_TIMEOUT. Archives already downloaded but not yet unpacked are dropped,
+    .part files the server can resume are kept in the journal for the next run and any other partial file is deleted. run() returns
+    once all of that is done, idle / cancel_latency tell a caller when that was without having to block on it.'''
+    def cancel(self):
+        if self._cancel_event.is_set():
+            return
+        self._cancelled_at = time.monotonic()
+        self._cancel_event.set()
+        with self._responses_lock:
+            # Under the lock so no worker closes one (and frees its socket) while it's being aborted
+            for response in self._responses:
+                _abort_response(response)
+        self.session.close()  # Drops the idle pooled connections, nothing new is started after a cancel
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    '''Downloading and unpacking are two stages joined by a bounded queue. Download workers hand finished archives to the extraction
+    thread(s) and go straight back to the network, so a big zip being decompressed no longer leaves the connection idle. When the
+    extractors fall behind, put() blocks the downloaders until the backlog of archives on disk drops back under the limits. A mod is only
+    reported through finished_download once both stages are done with it.'''
+    def run(self, mods: List[Dict]):
+        self.idle.clear()
+        try:
+            self._run(mods)
+        finally:
+            if self._cancelled_at is not None:
+                self.cancel_latency = time.monotonic() - self._cancelled_at
+            self.idle.set()
+
+    def _run(self, mods: List[Dict]):
+        mods = schedule_mods(mods, self.order)
+        reporter = OrderedReporter(len(mods), self.progress, self.finished_download)
+        extract_queue = ExtractQueue(self.max_pending_extracts, self.max_pending_extract_bytes)
+        extractors = [threading.Thread(target=self._extract_worker, args=(extract_queue, reporter),
+                                       name=f'wtmo-extract-{n}', daemon=True)
+                      for n in range(self.extract_workers)]
+        for extractor in extractors:
+            extractor.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_downloads, thread_name_prefix='wtmo-dl') as pool:
+                for index, mod in enumerate(mods):
+                    trace = ModTrace(mod['url'], mod.get('category'))
+                    trace.mark(SPAN_QUEUED)
+                    pool.submit(self._download_worker, index, mod, trace, reporter, extract_queue)
+        finally:
+            extract_queue.close()
+            for extractor in extractors:
+                extractor.join()
+            if self.manifest is not None:
+                self.manifest.save()
+            if self.cache is not None:
+                self.cache.flush()
+
+    def _download_worker(self, index: int, mod: Dict, trace: ModTrace, reporter: OrderedReporter,
+                         extract_queue: 'ExtractQueue'):
+        trace.end(SPAN_QUEUED)
+        if self.is_cancelled:
+            reporter.done(index, None)
+            return
+        reporter.started(index)
+        self._local.trace = trace
+        try:
+            fetched = self.fetch_mod(mod)
+        except DownloadCancelled:
+            reporter.done(index, None)
+            return
+        except Exception as e:
+            if self.is_cancelled:
+                reporter.done(index, None)  # Most likely the aborted socket, either way the user asked to stop
+                return
+            result = (mod['url'], False, str(e))
+            self._finish_trace(trace, result)
+            reporter.done(index, result)
+            return
+        finally:
+            self._local.trace = None
+        trace.mark(SPAN_EXTRACT_WAIT)
+        extract_queue.put((index, mod, fetched, trace),
+                          fetched['size'] if 'buffer' in fetched else _file_size(fetched['path']))
+
+    def _extract_worker(self, extract_queue: 'ExtractQueue', reporter: OrderedReporter):
+        while True:
+            item = extract_queue.get()
+            if item is None:
+                return
+            (index, mod, fetched, trace), size = item
+            if self.is_cancelled:
+                self._discard_fetched(fetched)
+                extract_queue.done(size)
+                reporter.done(index, None)
+                continue
+            trace.end(SPAN_EXTRACT_WAIT)
+            self._local.trace = trace
+            try:
+                with trace.span(SPAN_EXTRACT):
+                    result = self.install_mod(mod, fetched)
+            except Exception as e:
+                result = (mod['url'], False, str(e))
+            finally:
+                self._local.trace = None
+                extract_queue.done(size)
+            self._finish_trace(trace, result)
+            reporter.done(index, result)
+
+    def _discard_fetched(self, fetched: Dict):
+        """Drop a downloaded archive that won't be installed (cancelled). The cache keeps its copy."""
+        if fetched.get('buffer') is not None:
+            fetched['buffer'].close()
+        if fetched.get('cached'):
+            self.cache.release(fetched['sha256'])
+        elif fetched.get('path'):
+            self._release_path(fetched['path'])
+            try:
+                os.remove(fetched['path'])
+            except OSError:
+                pass
+
+    def _trace(self) -> Optional[ModTrace]:
+        return getattr(self._local, 'trace', None)
+
+    def _span(self, name: str):
+        trace = self._trace()
+        return trace.span(name) if trace is not None else nullcontext()
+
+    def _finish_trace(self, trace: ModTrace, result: Tuple[str, bool, str]):
+        _, trace.ok, trace.message = result
+        if self.tracer is not None:
+            self.tracer.write(trace)
+
+    def download_mod(self, mod: Dict) -> Tuple[str, bool, str]:
+        """Fetch a single mod, unpack it into its target folder and return (url, success, message)."""
+        return self.install_mod(mod, self.fetch_mod(mod))
+
+    '''With the archive cache switched on, a url that was downloaded before is installed straight from the cached copy without
+    touching the network. Fresh downloads are moved into the cache once complete and extracted from there, the cached archive is kept
+    (instead of being deleted after extraction) so the next reinstall runs at disk speed.'''
+    def fetch_mod(self, mod: Dict) -> Dict:
+        """Download stage: get mod's file locally and return {path, filename, etag, last_modified, cached, from_cache}.
+
+        Small zips come back as {buffer, size, sha256, ...} instead (plus the cache's path when the cache is on)."""
+        url = mod['url']
+        trace = self._trace()
+        if self.cache and not mod.get('refresh'):
+            hit = self.cache.lookup(url)
+            if hit:
+                if trace is not None:
+                    trace.source = 'cache'
+                return dict(hit, cached=True, from_cache=True)
+
+        waiting = time.perf_counter()
+        with self.host_limiter.slot(url):
+            if trace is not None:
+                trace.add(SPAN_SLOT_WAIT, time.perf_counter() - waiting)
+            fetched = self._fetch(url, mod.get('target', self.root_folder))
+
+        if self.cache and 'buffer' in fetched:
+            try:
+                with self._span(SPAN_CACHE_STORE):
+                    record = self.cache.store_buffer(url, fetched['buffer'], fetched['filename'], fetched['sha256'],
+                                                     fetched['etag'], fetched['last_modified'])
+            except BaseException:
+                fetched['buffer'].close()
+                raise
+            return dict(record, cached=True, from_cache=False, buffer=fetched['buffer'], size=fetched['size'])
+        if self.cache:
+            try:
+                with self._span(SPAN_CACHE_STORE):
+                    record = self.cache.store(url, fetched['path'], fetched['etag'], fetched['last_modified'])
+            finally:
+                self._release_path(fetched['path'])
+            return dict(record, cached=True, from_cache=False)
+        return fetched
+
+    def install_mod(self, mod: Dict, fetched: Dict) -> Tuple[str, bool, str]:
+        """Extraction stage: unpack or move a fetched file into place and return (url, success, message)."""
+        target_folder = mod.get('target', self.root_folder)
+        category = mod.get('category')
+        filepath = fetched.get('path')
+        filename = fetched['filename']
+        cached = fetched.get('cached', False)
+        buffer = fetched.get('buffer')
+        size = fetched['size'] if buffer is not None else _file_size(filepath)
+        installed = None
+        failure = None
+        trace = self._trace()
+        if trace is not None:
+            trace.filename = filename
+        try:
+            # Try to unpack if it's an archive
+            if filename.endswith(('.zip', '.rar', '.7z')):
+                known = self.manifest.known_files(mod['url']) if self.manifest is not None else None
+                try:
+                    installed = self._unpack_archive(buffer if buffer is not None else filepath, target_folder, category,
+                                                     keep_archive=cached, archive_name=filename,
+                                                     known=known, url=mod['url'])
+                except ExtractionFailed as e:
+                    failure = f"Extraction failed: {e}"
+                    if buffer is None and not cached:
+                        failure += f" (archive kept at {filepath})"
+
+            elif filename.endswith('.blk') and category == 'mission':
+                missions_dir = Path(self.root_folder) / "UserMissions"
+                missions_dir.mkdir(parents=True, exist_ok=True)
+                destination = missions_dir / filename
+                if cached:
+                    self._copy_into_place(filepath, str(destination), mod['url'])
+                elif Path(filepath).resolve() != destination.resolve():
+                    shutil.move(filepath, destination)
+                installed = [(str(destination), size, file_crc32(str(destination)))]
+
+            elif cached:
+                # Loose files are left in the target folder, same as an uncached download
+                destination = os.path.join(target_folder, filename)
+                self._copy_into_place(filepath, destination, mod['url'])
+                installed = [(destination, size, file_crc32(destination))]
+
+            else:
+                installed = [(filepath, size, file_crc32(filepath))]
+            if trace is not None and installed and not filename.endswith(('.zip', '.rar', '.7z')):
+                trace.count('files_written', len(installed))
+        finally:
+            if buffer is not None:
+                buffer.close()
+            if cached and failure is not None:
+                self.cache.invalidate(mod['url'], fetched['sha256'])  # Don't hand the same broken archive out again
+            elif cached:
+                self.cache.release(fetched['sha256'])
+            elif filepath:
+                self._release_path(filepath)
+
+        if failure is not None:
+            return mod['url'], False, failure
+
+        with self._validators_lock:
+            self.validators[mod['url']] = {'etag': fetched.get('etag'), 'last_modified': fetched.get('last_modified'),
+                                           'content_length': size, 'category': category, 'filename': filename,
+                                           'sha256': fetched.get('sha256')}
+
+        if self.manifest is not None and installed is not None:
+            overlaps = self.manifest.record(mod['url'], category, target_folder, installed)
+            if overlaps:
+                with self._validators_lock:
+                    self.conflicts[mod['url']] = sorted(overlaps)
+
+        if fetched.get('from_cache'):
+            return mod['url'], True, f"Installed from cache: {filename}"
+        return mod['url'], True, f"Downloaded: {filename}"
+
+    def _copy_into_place(self, source: str, destination: str, url: str):
+        """Copy a cached file to destination through a staging folder, so it appears in one rename."""
+        staged = StagedInstall(os.path.dirname(destination), url, self._staging_root_for(destination))
+        try:
+            shutil.copy2(source, staged.stage_path(destination))
+            staged.publish()
+        except BaseException:
+            staged.discard()
+            raise
+
+    def _staging_root_for(self, path: str) -> str:
+        """The configured folder (game or production) holding path, which is where its install is staged."""
+        if self.production_folder and is_within(path, self.production_folder):
+            return self.production_folder
+        return self.root_folder
+
+    '''Transfers are written to "<name>.part" and only renamed to their real name once complete, so a half written zip never sits in
+    UserSkins looking like a finished one. The journal remembers which .part belongs to which url (plus the ETag / Last-Modified it came
+    with) so a dropped connection, a cancel or a crash picks up where it stopped with a Range request instead of starting from byte zero.
+    Servers that ignore Range just answer 200 and the download quietly starts over.'''
+    def _fetch(self, url: str, target_folder: str) -> Dict:
+        """Download url into target_folder, resuming dropped transfers.
+
+        Returns {path, filename, etag, last_modified, cached} for the finished file."""
+        attempts = 0
+        while True:
+            try:
+                return self._fetch_once(url, target_folder)
+            except RETRYABLE_ERRORS:
+                attempts += 1
+                entry = self.journal.get(url)
+                if self.is_cancelled or attempts >= MAX_RESUME_ATTEMPTS or not (entry and entry.get('resumable')):
+                    raise
+
+    def _fetch_once(self, url: str, target_folder: str) -> Dict:
+        entry = self._resumable_entry(url, target_folder)
+        offset = 0
+        headers = {}
+        if entry:
+            offset = os.path.getsize(entry['path'] + PART_SUFFIX)
+            headers['Range'] = f"bytes={offset}-"
+            validator = entry.get('etag') or entry.get('last_modified')
+            if validator:
+                headers['If-Range'] = validator
+
+        trace = self._trace()
+        take_connect_time()
+        requested = time.perf_counter()
+        if self.is_cancelled:
+            raise DownloadCancelled()
+        response = self.session.get(url, stream=True, timeout=REQUEST_TIMEOUT, headers=headers)
+        with self._responses_lock:
+            self._responses.add(response)
+        if self.is_cancelled:
+            _abort_response(response)  # cancel() ran while the headers were on their way and couldn't see this one yet
+        if trace is not None:
+            connect = take_connect_time()
+            trace.add(SPAN_CONNECT, connect)
+            trace.add(SPAN_TTFB, time.perf_counter() - requested - connect)
+            trace.count('attempts')
+        try:
+            if response.status_code == 416 and entry:
+                # Either the .part already holds the whole file or it no longer matches what the server has
+                if entry.get('total') == offset:
+                    self._hold_path(entry['path'])
+                    return self._finish_partial(url, entry['path'])
+                self._discard_partial(url)
+                with self._responses_lock:
+                    self._responses.discard(response)
+                response.close()
+                return self._fetch_once(url, target_folder)
+            response.raise_for_status()
+
+            if not entry and self._fits_in_memory(response, url):
+                return self._fetch_to_memory(response, url)
+
+            if entry and response.status_code == 206 and _content_range_start(response) == offset:
+                filepath = entry['path']
+                self._hold_path(filepath)
+                mode = 'ab'
+            else:
+                if entry:
+                    self._discard_partial(url)
+                offset = 0
+                filepath = self._claim_path(os.path.join(target_folder, self._get_filename(response, url)))
+                mode = 'wb'
+
+            length = response.headers.get('content-length')
+            total = offset + int(length) if length and length.isdigit() else None
+            self.journal.update(url, path=filepath, etag=response.headers.get('etag'),
+                                last_modified=response.headers.get('last-modified'), total=total, bytes=offset,
+                                resumable=response.status_code == 206
+                                or response.headers.get('accept-ranges', '').lower() == 'bytes')
+            try:
+                written = self._write_response(response, url, filepath + PART_SUFFIX, mode, offset)
+                if total is not None and written < total:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Connection dropped after {written} of {total} bytes")
+            except BaseException:
+                self._release_path(filepath)
+                entry = self.journal.get(url)
+                if not (entry and entry.get('resumable')):
+                    self._discard_partial(url)
+                raise
+        finally:
+            with self._responses_lock:
+                self._responses.discard(response)
+            response.close()
+
+        return self._finish_partial(url, filepath)
+
+    def _fits_in_memory(self, response, url: str) -> bool:
+        length = response.headers.get('content-length')
+        return (self.memory_extract_bytes > 0 and bool(length) and length.isdigit()
+                and int(length) <= self.memory_extract_bytes and self._get_filename(response, url).endswith('.zip'))
+
+    def _fetch_to_memory(self, response, url: str) -> Dict:
+        """Read a small archive into a spooled buffer. Returns {buffer, size, sha256, filename, etag, last_modified, cached}."""
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.memory_extract_bytes)
+        digest = hashlib.sha256()
+        written = 0
+        trace = self._trace()
+        if trace is not None:
+            trace.source = 'memory'
+        try:
+            try:
+                with self._span(SPAN_TRANSFER):
+                    for chunk in self._iter_body(response):
+                        buffer.write(chunk)
+                        digest.update(chunk)
+                        written += len(chunk)
+            finally:
+                if trace is not None:
+                    trace.count('bytes', written)
+            length = int(response.headers['content-length'])
+            if written < length:
+                raise requests.exceptions.ChunkedEncodingError(f"Connection dropped after {written} of {length} bytes")
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return {'buffer': buffer, 'size': written, 'sha256': digest.hexdigest(), 'filename': self._get_filename(response, url),
+                'etag': response.headers.get('etag'), 'last_modified': response.headers.get('last-modified'), 'cached': False}
+
+    def _resumable_entry(self, url: str, target_folder: str) -> Optional[Dict]:
+        """Return the journal entry for url if its .part can be resumed into target_folder."""
+        entry = self.journal.get(url)
+        if not entry:
+            return None
+        if (os.path.normcase(os.path.dirname(entry['path'])) != os.path.normcase(os.path.normpath(target_folder))
+                or not os.path.exists(entry['path'] + PART_SUFFIX)):
+            self._discard_partial(url)
+            return None
+        return entry
+
+    def _finish_partial(self, url: str, filepath: str) -> Dict:
+        entry = self.journal.get(url) or {}
+        os.replace(filepath + PART_SUFFIX, filepath)
+        self.journal.remove(url)
+        return {'path': filepath, 'filename': os.path.basename(filepath), 'etag': entry.get('etag'),
+                'last_modified': entry.get('last_modified'), 'cached': False}
+
+    def _discard_partial(self, url: str):
+        entry = self.journal.get(url)
+        if entry:
+            try:
+                os.remove(entry['path'] + PART_SUFFIX)
+            except OSError:
+                pass
+            self.journal.remove(url)
+
+    def _write_response(self, response, url: str, partpath: str, mode: str, written: int) -> int:
+        """Stream the body into partpath and return the total bytes now in it."""
+        flushed = started = written
+        try:
+            with self._span(SPAN_TRANSFER), open(partpath, mode) as f:
+                for chunk in self._iter_body(response):
+                    f.write(chunk)
+                    written += len(chunk)
+                    if written - flushed >= JOURNAL_FLUSH_BYTES:
+                        self.journal.update(url, bytes=written)
+                        flushed = written
+        finally:
+            self.journal.update(url, bytes=written)
+            trace = self._trace()
+            if trace is not None:
+                trace.count('bytes', written - started)
+        return written
+
+    def _iter_body(self, response):
+        """Yield the response body in reads sized to the measured throughput, paced by the bandwidth cap."""
+        chunker = AdaptiveChunker(self.bandwidth.rate)
+        raw = response.raw
+        size = chunker.size
+        while True:
+            if self.is_cancelled:
+                raise DownloadCancelled()
+            self.bandwidth.consume(size, lambda: self.is_cancelled)
+            try:
+                chunk = raw.read(size, decode_content=True)
+            except (urllib3_errors.ProtocolError, urllib3_errors.ReadTimeoutError, OSError) as e:
+                # Same exceptions iter_content would have raised, so resume/retry handling is unchanged
+                if isinstance(e, urllib3_errors.ReadTimeoutError):
+                    raise requests.exceptions.ConnectionError(e)
+                raise requests.exceptions.ChunkedEncodingError(e)
+            if not chunk:
+                if self.is_cancelled:
+                    raise DownloadCancelled()  # An aborted socket reads as a clean end of the body
+                return
+            yield chunk
+            size = chunker.update(len(chunk))
+
+    def _claim_path(self, filepath: str) -> str:
+        """Reserve a destination path so two workers never write the same file at once."""
+        with self._paths_lock:
+            base, ext = os.path.splitext(filepath)
+            candidate = filepath
+            n = 2
+            while candidate in self._paths_in_use or self.journal.owns(candidate):
+                candidate = f"{base} ({n}){ext}"
+                n += 1
+            self._paths_in_use.add(candidate)
+            return candidate
+
+    def _hold_path(self, filepath: str):
+        with self._paths_lock:
+            self._paths_in_use.add(filepath)
+
+    def _release_path(self, filepath: str):
+        with self._paths_lock:
+            self._paths_in_use.discard(filepath)
+
+    def _get_filename(self, response, url: str) -> str:
+        return response_filename(response, url)
+
+    '''The unpack_archive system works by filtering mods by category AND by checking for file structure in their .zip files. This means mods with
+    loose .dds texture files get automatically placed inside of a folder rather than spilling out into the main UserSkins folder and it means that
+    the .blk's are found inside of zipped sight mods and placed in the all tanks folder though that will change as needed to match the best general
+    location for sights to be delivered. I will detail how to change this later on, use control+F and search for "all_tanks_change" in WTMO.py.'''
+
+    def _unpack_archive(self, filepath: str, target_folder: str, category: Optional[str] = None,
+                        keep_archive: bool = False, archive_name: Optional[str] = None,
+                        known: Optional[Dict] = None, url: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """Unpack an archive by the rules above. Returns [(path, size, crc32)] of the files installed, raises ExtractionFailed.
+
+        filepath may also be an open file object (an in-memory download), archive_name then gives its name. Files already on disk
+        with the member's size and CRC are left alone (known is the mod's previous manifest record). Everything is unpacked into
+        a staging folder first and published into target_folder once the whole archive is out, a failed unpack leaves the
+        target untouched."""
+        written = []
+        in_memory = not isinstance(filepath, str)
+        archive_name = archive_name or (None if in_memory else os.path.basename(filepath))
+        staged = StagedInstall(target_folder, url or archive_name, self._staging_root_for(target_folder))
+        try:
+            if archive_name.endswith('.zip'):
+                with zipfile.ZipFile(filepath, 'r') as zf:
+                    # Get all file paths in the zip (excluding directory entries)
+                    members = [info for info in zf.infolist() if not info.filename.endswith('/')]
+                    namelist = [info.filename for info in members]
+
+                    if not namelist:
+                        return written  # Empty zip
+
+                    # Default extraction destination
+                    extract_to = target_folder
+
+                    # --- ONLY inspect structure for 'camo' category ---
+                    if category == 'camouflage':
+                        # Check if there's a folder structure inside
+                        # If ANY file contains a '/', it implies a folder structure exists
+                        has_folder_structure = any('/' in name for name in namelist)
+
+                        if not has_folder_structure:
+                        # No folder structure: Create a folder based on zip filename
+                            zip_name = os.path.splitext(archive_name)[0]
+                            extract_to = os.path.join(target_folder, zip_name)
+                    # -------------------------------------------------
+
+                    # Extract files based on category rules
+                    # For sights, extract only .blk files, for camo (and others) extract all files to the determined destination
+                    if category == 'sight':
+                        members = [info for info in members if info.filename.endswith('.blk')]
+                    written, skipped = extract_members(zf, members, extract_to, known, self.member_workers,
+                                                       stage=staged.stage_path)
+                    staged.publish()
+                    trace = self._trace()
+                    if trace is not None:
+                        trace.count('files_written', len(written) - skipped)
+                        trace.count('files_skipped', skipped)
+
+                # Delete the zip after successful extraction, unless it is the cache's copy (or never was on disk)
+                if not keep_archive and not in_memory:
+                    os.remove(filepath)
+                return written
+
+            elif archive_name.endswith('.rar'):
+                # Handle rar if needed
+                return written
+
+        except Exception as e:
+            # The archive is left where it is (for debugging), install_mod reports the mod as failed
+            raise ExtractionFailed(str(e) or type(e).__name__) from e
+        finally:
+            staged.discard()  # Nothing left to remove after a publish, everything staged after a failure
+
+        raise ExtractionFailed(f"{os.path.splitext(archive_name)[1]} archives aren't supported")
+
+
+'''Update checking: every successful install records the ETag, Last-Modified and size the server sent (DownloadEngine.validators,
+saved by the GUI as download_meta). check_for_updates replays those as If-None-Match / If-Modified-Since requests across the same
+kind of worker pool, a 304 means the mod is unchanged and costs a few hundred bytes of headers. Mods only stored with a size are
+compared on Content-Length, mods with nothing stored can't be checked and come back as unknown.'''
+UPDATE_UNCHANGED = 'unchanged'
+UPDATE_CHANGED = 'changed'
+UPDATE_UNKNOWN = 'unknown'
+UPDATE_ERROR = 'error'
+
+
+def check_for_updates(entries: Dict[str, Dict], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                      max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST,
+                      session: Optional[requests.Session] = None,
+                      progress: Optional[ProgressCallback] = None) -> Dict[str, str]:
+    """Ask the server whether each url in entries (url -> stored validators) changed since it was installed.
+
+    Returns url -> one of UPDATE_UNCHANGED, UPDATE_CHANGED, UPDATE_UNKNOWN or UPDATE_ERROR."""
+    own_session = session is None
+    session = session or make_session(max_requests)
+    limiter = HostLimiter(max_requests_per_host)
+    results: Dict[str, str] = {}
+    lock = threading.Lock()
+    total = len(entries)
+
+    def check(url: str, validators: Dict):
+        try:
+            with limiter.slot(url):
+                status = _check_one(session, url, validators or {})
+        except Exception:
+            status = UPDATE_ERROR  # Whatever went wrong, the url still gets an answer
+        with lock:
+            results[url] = status
+            if progress:
+                progress(f"Checked {len(results)}/{total}", len(results), total)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_requests), thread_name_prefix='wtmo-check') as pool:
+            for url, validators in entries.items():
+                pool.submit(check, url, validators)
+    finally:
+        if own_session:
+            session.close()
+    return results
+
+
+def _check_one(session: requests.Session, url: str, validators: Dict) -> str:
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    known_length = validators.get('content_length')
+    if not headers and not known_length:
+        return UPDATE_UNKNOWN
+
+    # stream=True so a changed mod's body is never pulled, only its headers
+    response = session.get(url, stream=True, timeout=REQUEST_TIMEOUT, headers=headers)
+    try:
+        if response.status_code == 304:
+            return UPDATE_UNCHANGED
+        response.raise_for_status()
+        # Some servers ignore conditional headers and always answer 200, compare the validators by hand. Only one both sides have
+        # counts, a 200 carrying none of them (a size-only mod served without Content-Length, say) says nothing either way
+        etag = response.headers.get('etag')
+        if validators.get('etag') and etag:
+            return UPDATE_UNCHANGED if etag == validators['etag'] else UPDATE_CHANGED
+        last_modified = response.headers.get('last-modified')
+        if validators.get('last_modified') and last_modified:
+            return UPDATE_UNCHANGED if last_modified == validators['last_modified'] else UPDATE_CHANGED
+        length = response.headers.get('content-length')
+        if known_length and length and length.isdigit():
+            return UPDATE_UNCHANGED if int(length) == known_length else UPDATE_CHANGED
+        return UPDATE_UNKNOWN
+    finally:
+        response.close()
@@ -0,0 +1,99 @@
+"""
+Archive extraction for the Mod Organizer
+Writes zip members into the game folders, skipping any member whose file on disk already has the same size and CRC32 as the zip's
+central directory says it should, so reinstalling or updating a big camo pack only rewrites the textures that actually changed.
+Members are extracted in parallel (zlib and the CRC both release the GIL) and copied with large buffers.
+"""
+
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple, Callable
+
+from wtmo_manifest import file_crc32
+
+DEFAULT_MEMBER_WORKERS = 4
+EXTRACT_BUFFER_SIZE = 1024 * 1024
+
+InstalledFile = Tuple[str, int, int]  # path, size, crc32
+KnownFiles = Dict[str, Tuple[int, int, float]]  # normalised path -> (size, crc32, recorded at), see InstallManifest.known_files
+
+'''Deciding a member is unchanged: a different size means changed without reading anything. With the same size, the CRC the install
+manifest recorded for that path is trusted as long as the file hasn't been modified since it was recorded, otherwise the file on disk
+is read and its CRC computed (reading is still a lot cheaper than rewriting, and it only happens for files the manifest can't vouch
+for).'''
+
+
+def member_path(extract_to: str, info: zipfile.ZipInfo) -> str:
+    """Where zipfile.extract would put a member: drive letters, absolute paths and '..' components are dropped."""
+    arcname = info.filename.replace('/', os.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid = ('', os.path.curdir, os.path.pardir)
+    arcname = os.sep.join(part for part in arcname.split(os.sep) if part not in invalid)
+    return os.path.join(extract_to, arcname)
+
+
+def is_unchanged(path: str, info: zipfile.ZipInfo, known: Optional[KnownFiles] = None) -> bool:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_size != info.file_size:
+        return False
+    record = known.get(_path_key(path)) if known else None
+    if record and record[0] == info.file_size and st.st_mtime <= record[2]:
+        return record[1] == info.CRC
+    try:
+        return file_crc32(path) == info.CRC
+    except OSError:
+        return False
+
+
+def break_link(path: str):
+    """Remove whatever is at path before it is rewritten. Profiles install files as hardlinks or symlinks into the shared mod store,
+    writing through one of those would change the stored copy (and every other profile's) as well."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def extract_members(zf: zipfile.ZipFile, members: List[zipfile.ZipInfo], extract_to: str,
+                    known: Optional[KnownFiles] = None, workers: int = DEFAULT_MEMBER_WORKERS,
+                    stage: Optional[Callable[[str], str]] = None) -> Tuple[List[InstalledFile], int]:
+    """Extract members under extract_to, skipping identical files. Returns ([(path, size, crc32)] of every file, files skipped).
+
+    stage maps a member's final path to where it should be written instead (a StagedInstall's stage_path), the returned paths are
+    always the final ones. A path listed more than once (repacked archives do that) is written once, from its last entry, which is
+    what extracting them in order would leave. Raises the first error hit, files extracted before it stay where they were written."""
+    def extract_one(info: zipfile.ZipInfo) -> Tuple[InstalledFile, bool]:
+        path = member_path(extract_to, info)
+        if is_unchanged(path, info, known):
+            return (path, info.file_size, info.CRC), True
+        write_path = stage(path) if stage is not None else path
+        os.makedirs(os.path.dirname(write_path), exist_ok=True)
+        break_link(write_path)
+        with zf.open(info) as source, open(write_path, 'wb') as target:
+            shutil.copyfileobj(source, target, EXTRACT_BUFFER_SIZE)
+        return (path, info.file_size, info.CRC), False
+
+    last = {_path_key(member_path(extract_to, info)): index for index, info in enumerate(members)}
+    members = [members[index] for index in sorted(last.values())]
+    workers = max(1, min(workers, len(members)))
+    if workers == 1:
+        results = [extract_one(info) for info in members]
+    else:
+        # Largest members first so one big texture doesn't start last and hold the whole archive up
+        ordered = sorted(range(len(members)), key=lambda index: members[index].file_size, reverse=True)
+        results = [None] * len(members)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wtmo-unzip') as pool:
+            for index, result in zip(ordered, pool.map(lambda index: extract_one(members[index]), ordered)):
+                results[index] = result
+    return [installed for installed, _ in results], sum(1 for _, skipped in results if skipped)
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
@@ -0,0 +1,169 @@
+"""
+Feed harvester for the Mod Organizer
+Turns a feed, search or author page into modlist entries in one go: every post linked from the page is fetched in parallel and its
+category and download link are read from the post page, the same way "+ Add Mod" reads an open post. Plain requests/regex, no Qt,
+so it can be pointed at saved copies of feed pages served locally.
+"""
+
+import re
+import html
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from typing import Optional, List, Dict, Callable
+
+import requests
+
+from wtmo_downloads import (
+    make_session, HostLimiter, REQUEST_TIMEOUT, DEFAULT_MAX_DOWNLOADS, DEFAULT_MAX_DOWNLOADS_PER_HOST
+)
+from wtmo_modlist import ModEntry, CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+
+ProgressCallback = Callable[[str, int, int], None]
+
+FEED_CATEGORIES = {'camouflages': CATEGORY_CAMO, 'missions': CATEGORY_MISSION, 'sights': CATEGORY_SIGHT}
+MAX_PAGE_BYTES = 4 * 1024 * 1024  # Post and feed pages are small, anything bigger is not what we are looking for
+
+POST_LINK_RE = re.compile(r'href=["\']?((?:https?://[^/"\'>\s]+)?/post/\d+/[^"\'>\s]*)', re.IGNORECASE)
+CATEGORY_LINK_RE = re.compile(
+    r'<a\b[^>]*?(?:href="/feed/(camouflages|missions|sights)/"[^>]*?class="[^"]*category|'
+    r'class="[^"]*category[^"]*"[^>]*?href="/feed/(camouflages|missions|sights)/")', re.IGNORECASE)
+FEED_LINK_RE = re.compile(r'href="/feed/(camouflages|missions|sights)/"', re.IGNORECASE)
+DOWNLOAD_LINK_RES = [
+    re.compile(r'href=["\']?(https?://live\.warthunder\.com/dl/[^"\'>\s]+)', re.IGNORECASE),
+    re.compile(r'href=["\']?(/downloads/start/\d+)', re.IGNORECASE),
+]
+META_RE = r'<meta\b[^>]*?property=["\']og:{}["\'][^>]*?content=["\']([^"\']*)'
+TITLE_RE = re.compile(r'<title>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+'''A post page carries the site menu too, which links every feed, so the category is taken from the post's own
+class="category" link. Only when a page has no such link and mentions exactly one of the three feeds is that feed used.'''
+
+
+def collect_post_urls(page_html: str, base_url: str) -> List[str]:
+    """Absolute urls of every post linked from a feed / search / author page, in page order, without repeats."""
+    seen = {}
+    for match in POST_LINK_RE.findall(page_html):
+        seen.setdefault(urljoin(base_url, html.unescape(match)), None)
+    return list(seen)
+
+
+def parse_post(page_html: str, base_url: str) -> Dict:
+    """Read {category, urls, title, image} out of a post page. category is None for unsupported posts."""
+    category = None
+    match = CATEGORY_LINK_RE.search(page_html)
+    if match:
+        category = FEED_CATEGORIES[(match.group(1) or match.group(2)).lower()]
+    else:
+        feeds = {feed.lower() for feed in FEED_LINK_RE.findall(page_html)}
+        if len(feeds) == 1:
+            category = FEED_CATEGORIES[feeds.pop()]
+
+    urls = {}
+    for pattern in DOWNLOAD_LINK_RES:
+        for link in pattern.findall(page_html):
+            urls.setdefault(urljoin(base_url, html.unescape(link)), None)
+
+    title = _meta(page_html, 'title')
+    if not title:
+        match = TITLE_RE.search(page_html)
+        title = html.unescape(match.group(1)).strip() if match else None
+    image = _meta(page_html, 'image')
+    return {'category': category, 'urls': list(urls), 'title': title or None,
+            'image': urljoin(base_url, image) if image else None}
+
+
+def fetch_page(session: requests.Session, url: str) -> str:
+    """GET a page, reading at most MAX_PAGE_BYTES of it."""
+    response = session.get(url, stream=True, timeout=REQUEST_TIMEOUT)
+    try:
+        response.raise_for_status()
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=65536):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_PAGE_BYTES:
+                break
+        return b''.join(chunks).decode(response.encoding or 'utf-8', errors='replace')
+    finally:
+        response.close()
+
+
+def resolve_posts(post_urls: List[str], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                  max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST,
+                  session: Optional[requests.Session] = None,
+                  progress: Optional[ProgressCallback] = None,
+                  cancel_event: Optional[threading.Event] = None) -> List[Dict]:
+    """Fetch every post in parallel and return one {post, category, url, title, image, error} per post, in post_urls order.
+
+    url is the post's first download link, None (with error set) when the post couldn't be read or has no supported download."""
+    own_session = session is None
+    session = session or make_session(max_requests)
+    limiter = HostLimiter(max_requests_per_host)
+    results: List[Optional[Dict]] = [None] * len(post_urls)
+    lock = threading.Lock()
+    finished = [0]
+    total = len(post_urls)
+
+    def resolve(index: int, post_url: str):
+        result = {'post': post_url, 'category': None, 'url': None, 'title': None, 'image': None, 'error': None}
+        if cancel_event is not None and cancel_event.is_set():
+            result['error'] = "cancelled"
+        else:
+            try:
+                with limiter.slot(post_url):
+                    parsed = parse_post(fetch_page(session, post_url), post_url)
+                result.update(category=parsed['category'], title=parsed['title'], image=parsed['image'])
+                if parsed['category'] is None:
+                    result['error'] = "not a camouflage, mission or sight post"
+                elif not parsed['urls']:
+                    result['error'] = "no download link"
+                else:
+                    result['url'] = parsed['urls'][0]
+            except requests.exceptions.RequestException as e:
+                result['error'] = str(e)
+        with lock:
+            results[index] = result
+            finished[0] += 1
+            if progress:
+                progress(f"Resolved {finished[0]}/{total} posts", finished[0], total)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_requests), thread_name_prefix='wtmo-harvest') as pool:
+            for index, post_url in enumerate(post_urls):
+                pool.submit(resolve, index, post_url)
+    finally:
+        if own_session:
+            session.close()
+    return results
+
+
+def harvest_feed(feed_url: str, max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                 max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST,
+                 session: Optional[requests.Session] = None,
+                 progress: Optional[ProgressCallback] = None) -> List[Dict]:
+    """Fetch a feed page and resolve every post on it, see resolve_posts()."""
+    own_session = session is None
+    session = session or make_session(max_requests)
+    try:
+        post_urls = collect_post_urls(fetch_page(session, feed_url), feed_url)
+        return resolve_posts(post_urls, max_requests, max_requests_per_host, session, progress)
+    finally:
+        if own_session:
+            session.close()
+
+
+def harvested_entries(results: List[Dict]) -> List[ModEntry]:
+    """ModList entries for every post that resolved to a download."""
+    entries = []
+    for result in results:
+        if result['url']:
+            extra = {'post': result['post']}
+            extra.update({key: result[key] for key in ('title', 'image') if result.get(key)})
+            entries.append(ModEntry(result['url'], result['category'], result.get('title'), extra=extra))
+    return entries
+
+
+def _meta(page_html: str, prop: str) -> Optional[str]:
+    match = re.search(META_RE.format(prop), page_html, re.IGNORECASE)
+    return html.unescape(match.group(1)).strip() if match else None
@@ -0,0 +1,188 @@
+"""
+Install manifest for the Mod Organizer
+Records exactly which files each mod put into UserSkins / UserMissions / all_tanks, so a mod can be uninstalled without walking
+the game folders, two mods writing the same file can be spotted, and "is this already installed" is a dictionary lookup.
+"""
+
+import os
+import json
+import time
+import zlib
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Set, Tuple
+
+MANIFEST_PATH = Path.home() / '.mod_organizer_manifest.json'
+
+'''Each entry is keyed by mod url: {category, root, installed_at, files: [[path, size, crc32], ...]}. Paths are absolute. The crc32 is
+the one from the zip's central directory when the file came out of an archive (free to read) or is computed for loose files.
+A reverse index of path -> owning urls is rebuilt in memory on load, it is what makes conflict checks cheap.'''
+
+
+def file_crc32(filepath: str) -> int:
+    crc = 0
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xFFFFFFFF
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class InstallManifest:
+    """Persistent url -> installed files map with a path -> owners reverse index."""
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._mods: Dict[str, Dict] = {}
+        self._owners: Dict[str, Set[str]] = {}
+        self._dirty = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._mods)
+
+    def is_installed(self, url: str, verify: bool = False) -> bool:
+        """O(1) check, verify=True also makes sure the recorded files are still on disk."""
+        with self._lock:
+            entry = self._mods.get(url)
+            if not entry:
+                return False
+            if verify:
+                return all(os.path.exists(path) for path, _, _ in entry['files'])
+            return True
+
+    def files(self, url: str) -> List[Tuple[str, int, int]]:
+        with self._lock:
+            entry = self._mods.get(url)
+            return [tuple(f) for f in entry['files']] if entry else []
+
+    def installed(self) -> Dict[str, Dict]:
+        """url -> {category, root} of every mod currently installed."""
+        with self._lock:
+            return {url: {'category': entry.get('category'), 'root': entry.get('root')} for url, entry in self._mods.items()}
+
+    def known_files(self, url: str) -> Dict[str, Tuple[int, int, float]]:
+        """normalised path -> (size, crc32, installed_at) for a mod's recorded files, what extraction checks before rewriting."""
+        with self._lock:
+            entry = self._mods.get(url)
+            if not entry:
+                return {}
+            installed_at = entry.get('installed_at', 0)
+            return {_path_key(path): (size, crc, installed_at) for path, size, crc in entry['files']}
+
+    def owners(self, path: str) -> Set[str]:
+        with self._lock:
+            return set(self._owners.get(_path_key(path), ()))
+
+    def conflicts(self, url: str, paths: List[str]) -> Set[str]:
+        """Other installed mods that already own any of paths."""
+        found = set()
+        with self._lock:
+            for path in paths:
+                found.update(self._owners.get(_path_key(path), ()))
+        found.discard(url)
+        return found
+
+    def record(self, url: str, category: Optional[str], root: str, files: List[Tuple[str, int, int]]) -> Set[str]:
+        """Remember the files a mod installed (replacing any previous record) and return the mods it now overlaps."""
+        with self._lock:
+            self._unindex(url)
+            conflicts = self.conflicts(url, [path for path, _, _ in files])
+            self._mods[url] = {'category': category, 'root': root, 'installed_at': time.time(),
+                               'files': [[os.path.abspath(path), size, crc] for path, size, crc in files]}
+            self._index(url)
+            self._dirty = True
+            return conflicts
+
+    def uninstall(self, url: str, save: bool = True) -> Tuple[int, int]:
+        """Delete a mod's files and forget it. Files another mod also wrote are left in place.
+
+        Returns (files removed, files kept because they are shared). save=False leaves writing the manifest to the caller, for
+        batches."""
+        with self._lock:
+            entry = self._mods.get(url)
+            if not entry:
+                return 0, 0
+            self._unindex(url)
+            removed = kept = 0
+            folders = set()
+            for path, _, _ in entry['files']:
+                if self._owners.get(_path_key(path)):
+                    kept += 1
+                    continue
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                folders.add(os.path.dirname(path))
+            self._prune_empty_folders(folders, entry.get('root'))
+            del self._mods[url]
+            self._dirty = True
+            if save:
+                self.save()
+            return removed, kept
+
+    def forget(self, url: str):
+        with self._lock:
+            if url in self._mods:
+                self._unindex(url)
+                del self._mods[url]
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'mods': self._mods}, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"Could not save install manifest: {e}")
+
+    def _index(self, url: str):
+        for path, _, _ in self._mods[url]['files']:
+            self._owners.setdefault(_path_key(path), set()).add(url)
+
+    def _unindex(self, url: str):
+        entry = self._mods.get(url)
+        if not entry:
+            return
+        for path, _, _ in entry['files']:
+            key = _path_key(path)
+            owners = self._owners.get(key)
+            if owners:
+                owners.discard(url)
+                if not owners:
+                    del self._owners[key]
+
+    def _prune_empty_folders(self, folders: Set[str], root: Optional[str]):
+        """Remove folders left empty by an uninstall, never going above the mod's target folder."""
+        if not root:
+            return
+        inside = os.path.join(_path_key(root), '')  # Trailing separator, so a sibling like UserSkins2 doesn't count as inside
+        for folder in sorted(folders, key=len, reverse=True):
+            while folder and _path_key(folder).startswith(inside):
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    break
+                folder = os.path.dirname(folder)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self._mods = json.load(f).get('mods', {})
+        except Exception as e:
+            print(f"Install manifest unreadable, starting empty: {e}")
+            self._mods = {}
+        for url in self._mods:
+            self._index(url)
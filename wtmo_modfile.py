@@ -0,0 +1,147 @@
+"""
+Modlist files for the Mod Organizer
+Streaming reader and writer for shared modlists. The native format is gzip-compressed NDJSON, one mod per line with its category,
+name, size and content hash, so a community list with thousands of entries is read and written a line at a time. The grouped
+[CAMO] / [MISSION] / [SIGHT] text format and the old JSON export are still read, and text can still be written.
+"""
+
+import json
+import gzip
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from wtmo_modlist import ModEntry, CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+
+MODLIST_FORMAT = 'wtmo-modlist'
+MODLIST_VERSION = 1
+IMPORT_BATCH_SIZE = 500
+GZIP_MAGIC = b'\x1f\x8b'
+
+SECTION_HEADERS = {"[CAMO]": CATEGORY_CAMO, "[MISSION]": CATEGORY_MISSION, "[SIGHT]": CATEGORY_SIGHT}
+CATEGORY_HEADERS = {category: header for header, category in SECTION_HEADERS.items()}
+
+'''NDJSON layout: the first line is a header {"format": "wtmo-modlist", "version": 1}, every following line is one mod:
+{"url": ..., "category": ..., "name": ..., "size": ..., "sha256": ..., "priority": ...}. Only url is required, missing fields are
+simply left out (priority is only ever hand written, a higher one is downloaded first).
+Readers skip lines they can't parse instead of giving up on the whole list, so one bad line in a hand edited file costs one mod.'''
+
+
+def read_modlist(filepath: str) -> Iterator[ModEntry]:
+    """Yield the mods in a modlist file, whatever its format, in file order. Duplicates are left for ModList to drop."""
+    with open(filepath, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    if compressed:
+        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+            yield from _read_ndjson(f)
+        return
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        first = _first_line(f)
+        f.seek(0)
+        if not first.startswith('{'):
+            yield from _read_text(f)
+            return
+        try:
+            header = json.loads(first)
+        except ValueError:
+            header = None  # A pretty printed JSON document, the old export
+        if isinstance(header, dict) and 'mods' not in header:
+            yield from _read_ndjson(f)
+        else:
+            yield from _read_legacy_json(f)
+
+
+def iter_batches(entries: Iterable[ModEntry], size: int = IMPORT_BATCH_SIZE) -> Iterator[List[ModEntry]]:
+    """Group a stream of entries into lists of at most size."""
+    it = iter(entries)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_modlist(filepath: str, mods: Iterable[Dict]) -> int:
+    """Stream {url, category, name, size, sha256, post} dicts to filepath and return how many were written.
+
+    Paths ending in .txt get the grouped text format (mods should arrive grouped by category), anything else gets NDJSON, gzip
+    compressed when the path ends in .gz."""
+    count = 0
+    if filepath.endswith('.txt'):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            current_category = None
+            for mod in mods:
+                category = mod.get('category')
+                if category != current_category and category in CATEGORY_HEADERS:
+                    f.write(CATEGORY_HEADERS[category] + "\n")
+                    current_category = category
+                f.write(f"{mod['url']}\n")
+                count += 1
+        return count
+
+    opener = gzip.open if filepath.endswith('.gz') else open
+    with opener(filepath, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'format': MODLIST_FORMAT, 'version': MODLIST_VERSION}) + "\n")
+        for mod in mods:
+            record = {key: mod.get(key) for key in ('url', 'category', 'name', 'size', 'sha256', 'post')
+                      if mod.get(key) is not None}
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            count += 1
+    return count
+
+
+def export_records(rows: Iterable[Dict]) -> Iterator[Dict]:
+    """Turn SettingsStore.iter_mods_with_meta() rows into write_modlist() dicts."""
+    for row in rows:
+        yield {'url': row['url'], 'category': row.get('category'), 'name': row.get('filename'),
+               'size': row.get('content_length'), 'sha256': row.get('sha256'), 'post': row.get('post_url')}
+
+
+def _first_line(f) -> str:
+    for line in f:
+        line = line.strip()
+        if line:
+            return line
+    return ''
+
+
+def _read_ndjson(f) -> Iterator[ModEntry]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or not record.get('url'):
+            continue  # The format header, or a line that isn't a mod
+        yield _entry_from_record(record)
+
+
+def _read_text(f) -> Iterator[ModEntry]:
+    current_category = None
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line in SECTION_HEADERS:
+            current_category = SECTION_HEADERS[line]
+        elif line.startswith('http'):
+            yield ModEntry(line, current_category)
+
+
+def _read_legacy_json(f) -> Iterator[ModEntry]:
+    # The old export is one JSON document, the json module can only read it whole
+    data = json.load(f)
+    for mod in data.get('mods', []):
+        if isinstance(mod, dict):
+            yield _entry_from_record(mod)
+        else:
+            yield ModEntry(mod)
+
+
+def _entry_from_record(record: Dict) -> ModEntry:
+    extra = {key: record[key] for key in ('size', 'sha256', 'priority', 'post') if record.get(key) is not None}
+    return ModEntry(record['url'], record.get('category'), record.get('name'), extra=extra or None)
+
@@ -0,0 +1,169 @@
+"""
+Mod list model for the Mod Organizer
+The download list as a plain data structure: compact entries, a url index for O(1) duplicate checks, per-category buckets, and
+batch add/remove that tell listeners about each batch once. Import, "+ Add Mod" and Download All all go through it, the widget
+showing the list just listens for changes.
+"""
+
+from urllib.parse import urlparse
+from typing import Optional, List, Dict, Iterable, Callable, Iterator, Union, Tuple
+
+# Category constants
+CATEGORY_CAMO = "camouflage"
+CATEGORY_MISSION = "mission"
+CATEGORY_SIGHT = "sight"
+VALID_CATEGORIES = {CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT}
+
+# Change kinds passed to listeners as listener(kind, entries)
+MODS_ADDED = 'added'  # entries were appended to the end, in order
+MODS_REMOVED = 'removed'  # entries were removed, remaining rows keep their relative order
+MODS_RESET = 'reset'  # the list was cleared or rebuilt, entries is everything now in it
+MODS_CHANGED = 'changed'  # entries changed in place (e.g. checked state)
+
+
+class ModEntry:
+    """One mod in the download list."""
+    __slots__ = ('url', 'name', 'category', 'checked', 'extra')
+
+    def __init__(self, url: str, category: Optional[str] = None, name: Optional[str] = None, checked: bool = True,
+                 extra: Optional[Dict] = None):
+        self.url = url
+        self.name = name or urlparse(url).path.split('/')[-1] or url
+        self.category = category
+        self.checked = checked
+        self.extra = extra  # Optional details (size, hash, title...) a modlist or page carried for this mod
+
+    def to_dict(self) -> Dict:
+        return {'url': self.url, 'name': self.name, 'category': self.category, 'checked': self.checked}
+
+    def __repr__(self):
+        return f"ModEntry({self.url!r}, {self.category!r})"
+
+
+ModSpec = Union[ModEntry, Dict, Tuple[str, Optional[str]], str]
+
+
+class ModList:
+    """Ordered, url-indexed list of ModEntry with category buckets."""
+    def __init__(self):
+        self._entries: List[ModEntry] = []
+        self._index: Dict[str, int] = {}  # url -> position in _entries
+        self._buckets: Dict[Optional[str], Dict[str, ModEntry]] = {}  # category -> {url: entry}, insertion ordered
+        self._listeners: List[Callable[[str, List[ModEntry]], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[ModEntry]:
+        return iter(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._index
+
+    def __getitem__(self, row: int) -> ModEntry:
+        return self._entries[row]
+
+    def get(self, url: str) -> Optional[ModEntry]:
+        row = self._index.get(url)
+        return self._entries[row] if row is not None else None
+
+    def row_of(self, url: str) -> Optional[int]:
+        return self._index.get(url)
+
+    def categories(self) -> List[Optional[str]]:
+        return [category for category, bucket in self._buckets.items() if bucket]
+
+    def in_category(self, category: Optional[str]) -> List[ModEntry]:
+        return list(self._buckets.get(category, {}).values())
+
+    def checked(self) -> List[ModEntry]:
+        return [entry for entry in self._entries if entry.checked]
+
+    def subscribe(self, listener: Callable[[str, List[ModEntry]], None]):
+        self._listeners.append(listener)
+
+    def add(self, url: str, category: Optional[str] = None, name: Optional[str] = None) -> bool:
+        """Add one mod, returns False if the url is already listed."""
+        return bool(self.add_many([ModEntry(url, category, name)]))
+
+    def add_many(self, mods: Iterable[ModSpec]) -> List[ModEntry]:
+        """Append every mod whose url isn't listed yet (duplicates inside mods included) and notify once.
+
+        mods may be ModEntry objects, {url, category, name} dicts, (url, category) pairs or bare urls. Returns the new entries."""
+        added = []
+        for spec in mods:
+            entry = _to_entry(spec)
+            if entry.url in self._index:
+                continue
+            self._index[entry.url] = len(self._entries)
+            self._entries.append(entry)
+            self._buckets.setdefault(entry.category, {})[entry.url] = entry
+            added.append(entry)
+        if added:
+            self._notify(MODS_ADDED, added)
+        return added
+
+    def remove_many(self, urls: Iterable[str]) -> List[ModEntry]:
+        """Remove every listed url in one pass and notify once. Returns the removed entries."""
+        doomed = {url for url in urls if url in self._index}
+        if not doomed:
+            return []
+        removed = [entry for entry in self._entries if entry.url in doomed]
+        self._entries = [entry for entry in self._entries if entry.url not in doomed]
+        self._index = {entry.url: row for row, entry in enumerate(self._entries)}
+        for entry in removed:
+            self._buckets.get(entry.category, {}).pop(entry.url, None)
+        self._notify(MODS_REMOVED, removed)
+        return removed
+
+    def set_checked(self, url: str, checked: bool):
+        entry = self.get(url)
+        if entry and entry.checked != checked:
+            entry.checked = checked
+            self._notify(MODS_CHANGED, [entry])
+
+    def set_priority(self, url: str, priority: int):
+        """Download priority, higher goes first (see wtmo_downloads.schedule_mods). Kept with the entry's extra details."""
+        entry = self.get(url)
+        if entry and (entry.extra or {}).get('priority', 0) != priority:
+            entry.extra = dict(entry.extra or {}, priority=priority)
+            self._notify(MODS_CHANGED, [entry])
+
+    def set_categories(self, updates: Dict[str, Tuple[Optional[str], Dict]]) -> List[ModEntry]:
+        """Apply {url: (category, extra details)} found after the mods were added (e.g. by a post lookup) and notify once.
+
+        Details never overwrite what an entry already carries. Returns the entries that changed."""
+        changed = []
+        for url, (category, details) in updates.items():
+            entry = self.get(url)
+            if entry is None:
+                continue
+            if category != entry.category:
+                self._buckets.get(entry.category, {}).pop(url, None)
+                self._buckets.setdefault(category, {})[url] = entry
+                entry.category = category
+            new_details = {key: value for key, value in (details or {}).items() if key not in (entry.extra or {})}
+            if new_details:
+                entry.extra = dict(entry.extra or {}, **new_details)
+            changed.append(entry)
+        if changed:
+            self._notify(MODS_CHANGED, changed)
+        return changed
+
+    def clear(self):
+        self._entries, self._index, self._buckets = [], {}, {}
+        self._notify(MODS_RESET, [])
+
+    def _notify(self, kind: str, entries: List[ModEntry]):
+        for listener in self._listeners:
+            listener(kind, entries)
+
+
+def _to_entry(spec: ModSpec) -> ModEntry:
+    if isinstance(spec, ModEntry):
+        return spec
+    if isinstance(spec, dict):
+        return ModEntry(spec['url'], spec.get('category'), spec.get('name'), spec.get('checked', True), spec.get('extra'))
+    if isinstance(spec, tuple):
+        return ModEntry(spec[0], spec[1] if len(spec) > 1 else None)
+    return ModEntry(spec)
@@ -0,0 +1,110 @@
+"""
+Post metadata cache for the Mod Organizer
+Remembers what every post page said: post ID -> download link, category, title, preview and size, kept in the settings database
+(SettingsStore post_meta). Imports, re-adds and headless syncs fill in a mod's category from it straight away instead of needing the
+post opened in the browser, so a modlist without [CAMO] / [MISSION] / [SIGHT] headers no longer drops everything into the game folder.
+Posts that aren't cached yet are looked up in the background, in parallel, the same way "Add All" resolves a feed page.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Iterable, Tuple
+
+import requests
+
+from wtmo_downloads import make_session, HostLimiter, DEFAULT_MAX_DOWNLOADS, DEFAULT_MAX_DOWNLOADS_PER_HOST
+from wtmo_harvest import resolve_posts, ProgressCallback
+from wtmo_modlist import ModEntry
+from wtmo_preflight import probe
+
+POST_ID_RE = re.compile(r'/post/(\d+)(?:/|$)')
+
+'''A mod's post is known when it came from "Add All" (harvested entries carry extra['post']), from "+ Add Mod" on a post page, or from
+a modlist that was exported with post links. Download links alone can't be traced back to their post, so a mod that was never seen
+through a post is only resolved if its url is in the cache, the master list or the download metadata already.'''
+
+
+def post_id(post_url: Optional[str]) -> Optional[str]:
+    """The numeric ID in a live.warthunder.com/post/<id>/... url, None for anything else."""
+    match = POST_ID_RE.search(post_url or '')
+    return match.group(1) if match else None
+
+
+def apply_cached(entries: List[ModEntry], store) -> List[ModEntry]:
+    """Fill in category, title and size of uncategorized entries from the cache, in place.
+
+    Returns the entries still without a category whose post is known, those need a lookup."""
+    missing = [entry for entry in entries if entry.category is None]
+    if not missing:
+        return []
+    by_url = store.post_meta_for_urls(entry.url for entry in missing)
+    by_post = store.post_meta(post_id((entry.extra or {}).get('post')) for entry in missing if entry.url not in by_url)
+    unresolved = []
+    for entry in missing:
+        record = by_url.get(entry.url) or by_post.get(post_id((entry.extra or {}).get('post')))
+        if record and record['category']:
+            entry.category = record['category']
+            details = {key: record[key] for key in ('title', 'image', 'size') if record.get(key) is not None}
+            details = {key: value for key, value in details.items() if key not in (entry.extra or {})}
+            if record.get('post_url'):
+                details['post'] = record['post_url']
+            if details:
+                entry.extra = dict(entry.extra or {}, **details)
+        elif post_id((entry.extra or {}).get('post')):
+            unresolved.append(entry)
+    return unresolved
+
+
+def records_from_results(results: Iterable[Dict]) -> List[Dict]:
+    """post_meta records for resolve_posts() / lookup_posts() results that found a download."""
+    return [{'post_id': post_id(result['post']), 'post_url': result['post'], 'url': result['url'],
+             'category': result['category'], 'title': result.get('title'), 'image': result.get('image'),
+             'size': result.get('size')}
+            for result in results if result.get('url') and post_id(result['post'])]
+
+
+def lookup_posts(post_urls: List[str], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+                 max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST, session: Optional[requests.Session] = None,
+                 progress: Optional[ProgressCallback] = None, cancel_event: Optional[threading.Event] = None,
+                 with_size: bool = True) -> List[Dict]:
+    """Resolve posts that aren't cached. Returns resolve_posts() results, each with a 'size' (None when unknown).
+
+    with_size also sends a HEAD to every download link found, so the scheduler and the preflight know the size up front."""
+    own_session = session is None
+    session = session or make_session(max_requests)
+    try:
+        results = resolve_posts(post_urls, max_requests, max_requests_per_host, session, progress, cancel_event)
+        for result in results:
+            result['size'] = None
+        found = [result for result in results if result['url']]
+        if with_size and found and not (cancel_event is not None and cancel_event.is_set()):
+            limiter = HostLimiter(max_requests_per_host)
+
+            def size_of(result: Dict):
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                try:
+                    with limiter.slot(result['url']):
+                        result['size'] = probe(session, result['url'])['size']
+                except requests.exceptions.RequestException:
+                    pass  # The size is a nice to have, the post still resolved
+
+            with ThreadPoolExecutor(max_workers=max(1, max_requests), thread_name_prefix='wtmo-postsize') as pool:
+                list(pool.map(size_of, found))
+        return results
+    finally:
+        if own_session:
+            session.close()
+
+
+def resolved_categories(entries: List[ModEntry], results: List[Dict]) -> Dict[str, Tuple[Optional[str], Dict]]:
+    """Match lookup results back to the entries they were made for: url -> (category, extra details)."""
+    by_post = {post_id(result['post']): result for result in results if result.get('url')}
+    resolved = {}
+    for entry in entries:
+        result = by_post.get(post_id((entry.extra or {}).get('post')))
+        if result and result['category']:
+            details = {key: result[key] for key in ('title', 'image', 'size') if result.get(key) is not None}
+            resolved[entry.url] = (result['category'], details)
+    return resolved
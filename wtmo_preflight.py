@@ -0,0 +1,208 @@
+"""
+Download preflight for the Mod Organizer
+Before a batch is downloaded every queued mod gets a HEAD request (redirects followed) on the same kind of worker pool the downloads
+use. That tells us each file's real name (so whether it is a .zip or a .blk) and its size, which is enough to show the total and an
+ETA up front, check that the target drives have room, and drop dead links, all within seconds instead of hours into the transfer.
+"""
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict
+
+import requests
+
+from wtmo_downloads import (
+    make_session, HostLimiter, response_filename, REQUEST_TIMEOUT, DEFAULT_MAX_DOWNLOADS, DEFAULT_MAX_DOWNLOADS_PER_HOST
+)
+from wtmo_trace import read_trace, latest_trace_file, summarize
+
+PREFLIGHT_OK = 'ok'
+PREFLIGHT_CACHED = 'cached'  # in the archive cache, nothing to download
+PREFLIGHT_FAILED = 'failed'  # dead link or server error, downloading it would fail too
+
+ARCHIVE_EXTENSIONS = ('.zip', '.rar', '.7z')
+UNPACK_FACTOR = 2.0  # Unpacked mods are assumed to take up to twice their archive's size (textures don't compress much)
+SPACE_MARGIN_BYTES = 256 * 1024 * 1024  # Left free on every drive so the game and Windows aren't starved
+HEAD_FALLBACK_STATUSES = (403, 405, 501)  # Servers that refuse HEAD, asked again with a GET whose body is never read
+
+'''A mod's disk need: an archive is on disk in full while it is unpacked next to its files, so it counts its size on the drive
+holding the download (the archive cache's drive when the cache is on, the target's otherwise) plus UNPACK_FACTOR times its size on the
+target's drive. Loose files (.blk) just need their size. Drives are told apart by st_dev, so UserSkins and UserMissions on the same
+disk are checked against one free-space figure.'''
+
+
+def probe(session: requests.Session, url: str) -> Dict:
+    """HEAD url, following redirects. Returns {final_url, filename, size}, size is None when the server doesn't say."""
+    response = session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    try:
+        if response.status_code in HEAD_FALLBACK_STATUSES:
+            response.close()
+            response = session.get(url, stream=True, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        length = response.headers.get('content-length')
+        return {'final_url': response.url, 'filename': response_filename(response, url),
+                'size': int(length) if length and length.isdigit() else None}
+    finally:
+        response.close()
+
+
+def preflight(mods: List[Dict], max_requests: int = DEFAULT_MAX_DOWNLOADS,
+              max_requests_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST, session: Optional[requests.Session] = None,
+              cache=None, progress=None, cancel_event: Optional[threading.Event] = None) -> List[Dict]:
+    """Probe every mod in parallel. Returns one {url, status, filename, size, error} per mod, in mods order.
+
+    Mods the archive cache holds (and that aren't flagged 'refresh') are answered from the cache without a request. A link that
+    times out stays PREFLIGHT_OK with size None and the timeout in error."""
+    own_session = session is None
+    session = session or make_session(max_requests)
+    limiter = HostLimiter(max_requests_per_host)
+    results: List[Optional[Dict]] = [None] * len(mods)
+    lock = threading.Lock()
+    finished = [0]
+    total = len(mods)
+
+    def check(index: int, mod: Dict):
+        url = mod['url']
+        result = {'url': url, 'status': PREFLIGHT_OK, 'filename': None, 'size': None, 'error': None}
+        try:
+            hit = cache.peek(url) if cache is not None and not mod.get('refresh') else None
+            if hit:
+                result.update(status=PREFLIGHT_CACHED, filename=hit['filename'], size=hit['size'])
+            elif cancel_event is not None and cancel_event.is_set():
+                result.update(status=PREFLIGHT_FAILED, error="cancelled")
+            else:
+                with limiter.slot(url):
+                    probed = probe(session, url)
+                result.update(filename=probed['filename'], size=probed['size'])
+        except requests.exceptions.Timeout as e:
+            # A slow server isn't a dead link, the mod stays in the batch with an unknown size and the error as a warning
+            result.update(error=f"no answer in time, size unknown ({e})")
+        except Exception as e:
+            # Anything else (a malformed header, an unreadable cache entry) fails this mod, never the whole check
+            result.update(status=PREFLIGHT_FAILED, error=str(e) or type(e).__name__)
+        with lock:
+            results[index] = result
+            finished[0] += 1
+            if progress:
+                progress(f"Checked {finished[0]}/{total} links", finished[0], total)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_requests), thread_name_prefix='wtmo-preflight') as pool:
+            for index, mod in enumerate(mods):
+                pool.submit(check, index, mod)
+    finally:
+        if own_session:
+            session.close()
+    return results
+
+
+def _existing_folder(folder: str) -> str:
+    folder = os.path.abspath(folder)
+    while not os.path.isdir(folder) and os.path.dirname(folder) != folder:
+        folder = os.path.dirname(folder)
+    return folder
+
+
+def space_check(mods: List[Dict], results: List[Dict], download_dir: Optional[str] = None) -> List[Dict]:
+    """Free space against estimated need, one {folders, needed, free, ok} per drive the batch writes to.
+
+    download_dir is where archives sit while they are unpacked when that isn't the target folder (the archive cache). Mods without a
+    target (game or production folder not set) are left out, an empty path would otherwise be measured as the working directory."""
+    drives: Dict[int, Dict] = {}
+
+    def need(folder: str, amount: int):
+        folder = _existing_folder(folder)
+        device = os.stat(folder).st_dev
+        drive = drives.get(device)
+        if drive is None:
+            drive = drives[device] = {'folders': [], 'needed': 0, 'free': shutil.disk_usage(folder).free}
+        if folder not in drive['folders']:
+            drive['folders'].append(folder)
+        drive['needed'] += amount
+
+    for mod, result in zip(mods, results):
+        size = result.get('size')
+        target = mod.get('target')
+        if result['status'] == PREFLIGHT_FAILED or not size or not target:
+            continue
+        if (result.get('filename') or '').endswith(ARCHIVE_EXTENSIONS):
+            if result['status'] != PREFLIGHT_CACHED:
+                need(download_dir or target, size)
+            need(target, int(size * UNPACK_FACTOR))
+        else:
+            need(target, size)
+
+    checks = []
+    for drive in drives.values():
+        drive['ok'] = drive['free'] - drive['needed'] >= SPACE_MARGIN_BYTES
+        checks.append(drive)
+    return checks
+
+
+def estimated_rate(max_downloads_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST, bandwidth_limit_kbps: int = 0,
+                   trace_path: Optional[str] = None) -> Optional[float]:
+    """Bytes per second the next batch can expect, from the last download trace (per connection rate times the connections per
+    host) and the bandwidth cap. None if there is nothing to go on."""
+    rate = None
+    trace_path = trace_path or latest_trace_file()
+    if trace_path:
+        try:
+            summary = summarize(read_trace(trace_path))
+        except OSError:
+            summary = None
+        if summary:
+            measured = [(host['rate_kbps'], host['mods']) for host in summary['hosts'].values() if host['rate_kbps']]
+            if measured:
+                per_connection = sum(kbps * mods for kbps, mods in measured) / sum(mods for _, mods in measured) * 1024
+                rate = per_connection * max(1, max_downloads_per_host)
+    if bandwidth_limit_kbps:
+        cap = bandwidth_limit_kbps * 1024
+        rate = min(rate, cap) if rate else cap
+    return rate or None
+
+
+def summarize_preflight(results: List[Dict], space: List[Dict], rate: Optional[float] = None) -> Dict:
+    download_bytes = sum(r['size'] or 0 for r in results if r['status'] == PREFLIGHT_OK)
+    return {'mods': len(results),
+            'to_download': sum(1 for r in results if r['status'] == PREFLIGHT_OK),
+            'cached': sum(1 for r in results if r['status'] == PREFLIGHT_CACHED),
+            'failed': [r for r in results if r['status'] == PREFLIGHT_FAILED],
+            'unknown_size': sum(1 for r in results if r['status'] == PREFLIGHT_OK and r['size'] is None),
+            'unchecked': [r for r in results if r['status'] == PREFLIGHT_OK and r['error']],
+            'download_bytes': download_bytes,
+            'eta_seconds': round(download_bytes / rate) if rate and download_bytes else None,
+            'space': space, 'space_ok': all(drive['ok'] for drive in space)}
+
+
+def format_size(value: int) -> str:
+    if value >= 1024 ** 3:
+        return f"{value / 1024 ** 3:.1f} GiB"
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600} h {seconds % 3600 // 60} min"
+    if seconds >= 60:
+        return f"{seconds // 60} min {seconds % 60} s"
+    return f"{seconds} s"
+
+
+def format_summary(summary: Dict) -> str:
+    lines = [f"{summary['to_download']} to download ({format_size(summary['download_bytes'])}"
+             + (f", {summary['unknown_size']} of unknown size" if summary['unknown_size'] else "") + ")"
+             + (f", {summary['cached']} from the archive cache" if summary['cached'] else "")]
+    if summary['eta_seconds'] is not None:
+        lines.append(f"Estimated time: about {format_duration(summary['eta_seconds'])}")
+    for drive in summary['space']:
+        state = "OK" if drive['ok'] else "NOT ENOUGH SPACE"
+        lines.append(f"{', '.join(drive['folders'])}: needs ~{format_size(drive['needed'])}, "
+                     f"{format_size(drive['free'])} free - {state}")
+    if summary['unchecked']:
+        lines.append(f"{len(summary['unchecked'])} link(s) didn't answer in time and will be downloaded anyway")
+    if summary['failed']:
+        lines.append(f"{len(summary['failed'])} link(s) can't be downloaded and will be skipped")
+    return "\n".join(lines)
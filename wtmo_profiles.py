@@ -0,0 +1,192 @@
+"""
+Mod profiles for the Mod Organizer
+A profile is a named set of mods plus the folders each category installs into. The files of every mod that has been installed once
+are kept in a shared mod store, so switching profiles never downloads or unpacks anything: mods leaving the game folders are
+unlinked, mods joining are linked back in from the store. Hardlinks are used where possible (no extra disk, the store and the game
+folder are the same file), then symlinks, then plain copies when the store sits on another drive and links aren't allowed.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Callable
+
+from wtmo_manifest import InstallManifest
+from wtmo_extract import break_link
+
+MOD_STORE_DIR = Path.home() / '.mod_organizer_store'
+STORE_INDEX_NAME = 'mod.json'
+FILES_DIR_NAME = 'files'
+
+LINK_HARD = 'hardlink'
+LINK_SYMLINK = 'symlink'
+LINK_COPY = 'copy'
+LINK_MODES = (LINK_HARD, LINK_SYMLINK, LINK_COPY)  # Tried in this order
+
+ProgressCallback = Callable[[str, int, int], None]  # message, current, total
+
+'''Store layout: one folder per mod url (named by a hash of it) holding mod.json {url, category, files: [[relative path, size, crc32]]}
+and a files/ tree that mirrors where the files sit under the mod's target folder. A mod is taken into the store the first time it is
+unlinked from the game folders, by linking its installed files into files/, so even that costs no disk on the same drive. The install
+manifest stays the record of what is in the game folders right now, switching is uninstall + record through it, so conflicts, the
+"Installed on Disk" view and uninstalling all keep working on linked mods.'''
+
+
+def link_file(source: str, destination: str, modes=LINK_MODES) -> str:
+    """Make destination the same file as source, returns the link mode that worked. Anything already at destination is replaced."""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    break_link(destination)
+    last_error = None
+    for mode in modes:
+        try:
+            if mode == LINK_HARD:
+                os.link(source, destination)
+            elif mode == LINK_SYMLINK:
+                os.symlink(os.path.abspath(source), destination)
+            else:
+                shutil.copy2(source, destination)
+            return mode
+        except OSError as e:
+            last_error = e
+    raise last_error
+
+
+class ModStore:
+    """Shared copy of the files of every mod a profile may need."""
+    def __init__(self, store_dir=MOD_STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+    def mod_dir(self, url: str) -> Path:
+        return self.store_dir / hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+
+    def record(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self.mod_dir(url) / STORE_INDEX_NAME, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def has(self, url: str) -> bool:
+        return self.record(url) is not None
+
+    def ingest(self, url: str, category: Optional[str], root: str, files: List[Tuple[str, int, int]]) -> bool:
+        """Take an installed mod's files into the store. Returns False if any of them is missing from disk (nothing is stored)."""
+        if any(not os.path.isfile(path) for path, _, _ in files):
+            return False
+        mod_dir = self.mod_dir(url)
+        files_dir = mod_dir / FILES_DIR_NAME
+        previous = {rel: (size, crc) for rel, size, crc in (self.record(url) or {}).get('files', [])}
+        stored = []
+        for path, size, crc in files:
+            try:
+                rel = os.path.relpath(path, root) if root else os.pardir
+            except ValueError:
+                rel = os.pardir  # Another drive than root
+            if rel.startswith(os.pardir):
+                rel = os.path.basename(path)  # Loose files put outside the target folder (e.g. missions) keep just their name
+            stored_path = files_dir / rel
+            if previous.get(rel) != (size, crc) or not stored_path.exists():
+                link_file(path, str(stored_path), (LINK_HARD, LINK_COPY))  # A symlink into the game folder would be no copy at all
+            stored.append([rel, size, crc])
+        tmp_path = mod_dir / (STORE_INDEX_NAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'category': category, 'files': stored}, f)
+        os.replace(tmp_path, mod_dir / STORE_INDEX_NAME)
+        return True
+
+    def materialize(self, url: str, root: str, modes=LINK_MODES) -> Tuple[List[Tuple[str, int, int]], Dict[str, int]]:
+        """Link a stored mod into root. Returns ([(path, size, crc32)] for the manifest, {link mode: files})."""
+        record = self.record(url)
+        if record is None:
+            raise KeyError(url)
+        files_dir = self.mod_dir(url) / FILES_DIR_NAME
+        installed = []
+        used: Dict[str, int] = {}
+        for rel, size, crc in record['files']:
+            destination = os.path.join(root, rel)
+            source = str(files_dir / rel)
+            try:
+                if os.path.samefile(source, destination):
+                    installed.append((destination, size, crc))
+                    continue
+            except OSError:
+                pass
+            mode = link_file(source, destination, modes)
+            used[mode] = used.get(mode, 0) + 1
+            installed.append((destination, size, crc))
+        return installed, used
+
+    def remove(self, url: str):
+        shutil.rmtree(self.mod_dir(url), ignore_errors=True)
+
+    def prune(self, keep_urls: set) -> int:
+        """Delete stored mods no profile or install needs any more, returns how many went."""
+        removed = 0
+        for mod_dir in list(self.store_dir.iterdir()):
+            index = mod_dir / STORE_INDEX_NAME
+            try:
+                with open(index, 'r', encoding='utf-8') as f:
+                    url = json.load(f).get('url')
+            except (OSError, ValueError):
+                continue
+            if url not in keep_urls:
+                shutil.rmtree(mod_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def switch_profile(profile: Dict, manifest: InstallManifest, mod_store: ModStore,
+                   target_for: Callable[[Optional[str]], str], progress: Optional[ProgressCallback] = None) -> Dict:
+    """Make the game folders hold exactly the profile's mods.
+
+    target_for maps a category to its install folder (the profile's targets, falling back to the current setup). Returns
+    {linked, unlinked, unchanged, missing: [{url, category}], failed: [{url, error}], links: {mode: files}}. Missing mods aren't
+    in the store and have to be downloaded. Failed ones are installed mods outside the profile that couldn't be taken into the store,
+    they are left installed rather than lose the only copy of their files."""
+    wanted = {mod['url']: mod.get('category') for mod in profile['mods']}
+    installed = manifest.installed()
+    leaving = [url for url in installed if url not in wanted]
+    total = len(leaving) + len(wanted)
+    result = {'linked': 0, 'unlinked': 0, 'unchanged': 0, 'missing': [], 'failed': [], 'links': {}}
+    done = 0
+
+    for url in leaving:
+        entry = installed[url]
+        done += 1
+        try:
+            stored = mod_store.ingest(url, entry['category'], entry['root'] or '', manifest.files(url))
+            error = None if stored else "some of its files are no longer in the game folders"
+        except OSError as e:
+            error = str(e)
+        if error:
+            result['failed'].append({'url': url, 'error': error})
+        else:
+            manifest.uninstall(url, save=False)
+            result['unlinked'] += 1
+        if progress and done % 50 == 0:
+            progress("Removing mods outside the profile", done, total)
+
+    for url, category in wanted.items():
+        done += 1
+        if progress and done % 50 == 0:
+            progress("Linking profile mods", done, total)
+        if manifest.is_installed(url, verify=True):
+            result['unchanged'] += 1
+            continue
+        if not mod_store.has(url):
+            result['missing'].append({'url': url, 'category': category})
+            continue
+        root = target_for(category)
+        files, used = mod_store.materialize(url, root)
+        for mode, count in used.items():
+            result['links'][mode] = result['links'].get(mode, 0) + count
+        manifest.record(url, category, root, files)
+        result['linked'] += 1
+
+    manifest.save()
+    if progress:
+        progress("Profile switched", total, total)
+    return result
@@ -0,0 +1,182 @@
+"""
+Mod folder scanner for the Mod Organizer
+Keeps an index of everything under UserSkins, UserMissions and all_tanks. Directory signatures are saved between runs so a
+rescan only lists folders whose contents changed, the rest of the tree is taken from the saved index.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import List, Dict, Iterable
+
+SCAN_INDEX_PATH = Path.home() / '.mod_organizer_scan_index.json'
+
+'''How the incremental scan works: adding, removing or renaming anything inside a folder bumps that folder's own mtime, so a folder
+whose mtime matches the saved one still holds the same names and its saved file sizes/mtimes are reused without listing it. Only
+changed folders get a fresh os.scandir. Filesystems with coarse timestamps (FAT keeps 2 seconds) can hide a change made in the same
+tick as the last scan, so folders modified within RACY_WINDOW_NS of a scan are saved without an mtime and always re-listed next time.
+Edits to an existing file don't touch the folder mtime, the GUI's file watcher covers those by forcing a re-list of the folder.'''
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class FolderIndex:
+    """Saved, incrementally refreshed listing of the mod folders.
+
+    _dirs maps each folder to {mtime_ns, files: {name: [size, mtime_ns]}, subdirs: [names]}."""
+    def __init__(self, path=SCAN_INDEX_PATH):
+        self.path = Path(path)
+        self.roots: List[str] = []
+        self._dirs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def set_roots(self, roots: Iterable[str]):
+        """Folders to index, empty entries (unset folders) are ignored."""
+        with self._lock:
+            self.roots = [os.path.normpath(root) for root in roots if root]
+
+    def scan(self) -> Dict[str, int]:
+        """Bring the whole index up to date and return {dirs_listed, dirs_reused, files}."""
+        stats = {'dirs_listed': 0, 'dirs_reused': 0}
+        with self._lock:
+            old_dirs, roots = self._dirs, list(self.roots)
+        new_dirs: Dict[str, Dict] = {}
+        for root in roots:
+            self._walk(root, old_dirs, new_dirs, stats)
+        with self._lock:
+            self._dirs = new_dirs
+            stats['files'] = sum(len(d['files']) for d in new_dirs.values())
+        return stats
+
+    def refresh(self, paths: Iterable[str]) -> Dict[str, int]:
+        """Re-list the given folders (and check their subfolders) after the file watcher reported a change."""
+        stats = {'dirs_listed': 0, 'dirs_reused': 0}
+        for path in {os.path.normpath(p) for p in paths}:
+            with self._lock:
+                if not any(_is_under(path, root) for root in self.roots):
+                    continue
+                old_dirs = dict(self._dirs)
+            old_dirs.pop(path, None)  # Force a fresh listing of the folder that changed
+            new_dirs: Dict[str, Dict] = {}
+            self._walk(path, old_dirs, new_dirs, stats)
+            with self._lock:
+                for stale in [d for d in self._dirs if _is_under(d, path) and d not in new_dirs]:
+                    del self._dirs[stale]
+                self._dirs.update(new_dirs)
+                parent = self._dirs.get(os.path.dirname(path))
+                if path not in new_dirs and parent and os.path.basename(path) in parent['subdirs']:
+                    parent['subdirs'].remove(os.path.basename(path))
+        with self._lock:
+            stats['files'] = sum(len(d['files']) for d in self._dirs.values())
+        return stats
+
+    def _walk(self, start: str, old_dirs: Dict[str, Dict], new_dirs: Dict[str, Dict], stats: Dict[str, int]):
+        stack = [start]
+        while stack:
+            folder = stack.pop()
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            cached = old_dirs.get(folder)
+            if cached and cached['mtime_ns'] == mtime_ns:
+                entry = cached
+                stats['dirs_reused'] += 1
+            else:
+                entry = self._list(folder, mtime_ns)
+                stats['dirs_listed'] += 1
+            new_dirs[folder] = entry
+            stack.extend(os.path.join(folder, name) for name in entry['subdirs'])
+
+    def _list(self, folder: str, mtime_ns: int) -> Dict:
+        files, subdirs = {}, []
+        try:
+            with os.scandir(folder) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            subdirs.append(item.name)
+                        elif item.is_file():
+                            st = item.stat()
+                            files[item.name] = [st.st_size, st.st_mtime_ns]
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+            mtime_ns = None
+        return {'mtime_ns': mtime_ns, 'files': files, 'subdirs': subdirs}
+
+    def contains(self, filepath: str) -> bool:
+        filepath = os.path.normpath(filepath)
+        with self._lock:
+            entry = self._dirs.get(os.path.dirname(filepath))
+            return bool(entry) and os.path.basename(filepath) in entry['files']
+
+    def watch_dirs(self, depth: int = 1) -> List[str]:
+        """Each root plus its subfolders down to depth, the set of folders worth handing to a file watcher."""
+        with self._lock:
+            result = []
+            for root in self.roots:
+                level = [root] if root in self._dirs else []
+                for _ in range(depth + 1):
+                    result.extend(level)
+                    level = [os.path.join(d, s) for d in level for s in self._dirs.get(d, {}).get('subdirs', ())
+                             if os.path.join(d, s) in self._dirs]
+            return result
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per root: {entries: [{name, is_dir, files, bytes}], files, bytes}. A top-level entry is roughly one installed mod."""
+        with self._lock:
+            result = {}
+            for root in self.roots:
+                top: Dict[str, Dict] = {}
+                root_entry = self._dirs.get(root)
+                if root_entry is None:
+                    result[root] = {'entries': [], 'files': 0, 'bytes': 0}
+                    continue
+                for name, (size, _) in root_entry['files'].items():
+                    top[name] = {'name': name, 'is_dir': False, 'files': 1, 'bytes': size}
+                for name in root_entry['subdirs']:
+                    top[name] = {'name': name, 'is_dir': True, 'files': 0, 'bytes': 0}
+                prefix = root + os.sep
+                for folder, entry in self._dirs.items():
+                    if not folder.startswith(prefix):
+                        continue
+                    name = folder[len(prefix):].split(os.sep, 1)[0]
+                    if name in top:
+                        top[name]['files'] += len(entry['files'])
+                        top[name]['bytes'] += sum(size for size, _ in entry['files'].values())
+                entries = sorted(top.values(), key=lambda e: e['name'].lower())
+                result[root] = {'entries': entries, 'files': sum(e['files'] for e in entries),
+                                'bytes': sum(e['bytes'] for e in entries)}
+            return result
+
+    def save(self):
+        with self._lock:
+            data = {'roots': self.roots, 'dirs': self._dirs}
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save folder index: {e}")
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.roots = data.get('roots', [])
+            self._dirs = data.get('dirs', {})
+        except Exception as e:
+            print(f"Folder index unreadable, a full scan will rebuild it: {e}")
+            self.roots, self._dirs = [], {}
+
+
+def _is_under(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
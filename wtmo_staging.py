@@ -0,0 +1,206 @@
+"""
+Staged installs for the Mod Organizer
+A mod is unpacked into a staging folder inside the game folder it belongs to (so on the same drive) and only then moved into UserSkins /
+UserMissions / all_tanks with renames, so the game never loads a half-extracted skin. A new skin folder appears with a single rename;
+an updated one is rebuilt complete in the staging folder and swapped in whole: the old folder is renamed aside, the new one renamed
+in, the old one deleted. A crash or power cut leaves a staging folder behind, recover_staging() finishes or discards it on the next
+start.
+"""
+
+import os
+import json
+import uuid
+import errno
+import shutil
+import hashlib
+import threading
+from typing import Optional, List, Tuple
+
+STAGING_DIR_NAME = '.wtmo_staging'
+MARKER_NAME = 'publish.json'
+FILES_DIR_NAME = 'files'
+ASIDE_DIR_NAME = 'old'
+SHARED_FOLDERS = {'userskins', 'usermissions', 'usersights', 'all_tanks'}  # Never swapped whole, only what is inside them
+
+ACTION_MOVE = 'move'  # nothing (or a single file) at the destination, one rename
+ACTION_SWAP = 'swap'  # existing folder replaced by its complete staged copy
+
+'''The staging folder is <root>/.wtmo_staging, where root is the configured game folder (or the production folder for sights) that
+holds the target, never a parent of it, so staging and target share a drive and every rename is a real rename. Before the first
+rename a publish.json marker lists the planned moves and swaps: a staging folder with a marker was part way through publishing and
+is rolled forward, each step checks what is already done so running it twice is harmless. One without a marker never touched the
+live folder and is simply deleted.'''
+
+
+def staging_root(root_folder: str) -> str:
+    return os.path.join(os.path.abspath(root_folder), STAGING_DIR_NAME)
+
+
+def is_within(path: str, folder: str) -> bool:
+    path, folder = os.path.normcase(os.path.abspath(path)), os.path.normcase(os.path.abspath(folder))
+    try:
+        return os.path.commonpath([path, folder]) == folder
+    except ValueError:
+        return False  # Different drives
+
+
+def _move(source: str, destination: str):
+    try:
+        os.replace(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(source, destination)  # The staging folder ended up on another drive (a junction or mount), copy instead
+
+
+def _link_or_copy(source: str, destination: str):
+    if os.path.islink(source):
+        os.symlink(os.readlink(source), destination)
+        return
+    try:
+        os.link(source, destination)  # Same drive, no data is copied
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+class StagedInstall:
+    """Collects a mod's new files in a staging folder and publishes them into target_folder in one go."""
+    def __init__(self, target_folder: str, url: str, root_folder: str):
+        self.target = os.path.abspath(target_folder)
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        self.root = os.path.join(staging_root(root_folder), f"{key}-{uuid.uuid4().hex[:8]}")
+        self.files_dir = os.path.join(self.root, FILES_DIR_NAME)
+        self._staged: List[str] = []  # Paths relative to target
+        self._lock = threading.Lock()
+
+    def stage_path(self, final_path: str) -> str:
+        """Where to write a file that belongs at final_path (inside target). Safe to call from several threads."""
+        rel = os.path.relpath(os.path.abspath(final_path), self.target)
+        if rel.startswith(os.pardir) or os.path.isabs(rel):
+            raise ValueError(f"{final_path} is outside {self.target}")
+        with self._lock:
+            self._staged.append(rel)
+        path = os.path.join(self.files_dir, rel)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)  # Another install's discard() removed the empty staging root mid-way
+        return path
+
+    @property
+    def staged(self) -> List[str]:
+        return list(self._staged)
+
+    def publish(self) -> Tuple[int, int]:
+        """Move every staged file into place. Returns (renames done, files published)."""
+        staged = self.staged
+        if not staged:
+            self.discard()
+            return 0, 0
+        plan = _plan(self.target, self.files_dir, staged)
+        for action, rel in plan:
+            if action == ACTION_SWAP:
+                _complete_copy(os.path.join(self.target, rel), os.path.join(self.files_dir, rel))
+        with open(os.path.join(self.root, MARKER_NAME), 'w', encoding='utf-8') as f:
+            json.dump({'target': self.target, 'plan': plan}, f)
+        renames = _publish(self.target, self.root, plan)
+        self.discard()
+        return renames, len(staged)
+
+    def discard(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.root))  # Only goes once no other install is staging in it
+        except OSError:
+            pass
+
+
+def _plan(target: str, files_dir: str, staged: List[str], prefix: str = '') -> List[List[str]]:
+    """[action, path relative to target] for every top level entry staged, descending into the shared game folders."""
+    groups = {}
+    for rel in staged:
+        top, _, rest = rel.partition(os.sep)
+        groups.setdefault(top, []).append(rest)
+    plan = []
+    for top in sorted(groups):
+        rel = os.path.join(prefix, top) if prefix else top
+        source, destination = os.path.join(files_dir, rel), os.path.join(target, rel)
+        if not os.path.lexists(destination) or not os.path.isdir(source) or not os.path.isdir(destination):
+            plan.append([ACTION_MOVE, rel])
+        elif top.lower() in SHARED_FOLDERS:
+            plan.extend(_plan(target, files_dir, [rest for rest in groups[top] if rest], rel))
+        else:
+            plan.append([ACTION_SWAP, rel])
+    return plan
+
+
+def _complete_copy(live: str, staged: str):
+    """Fill the staged folder with everything in the live one it doesn't replace, so it can stand in for it whole. Files the
+    user added to the folder come along too."""
+    for folder, dirs, files in os.walk(live):
+        rel = os.path.relpath(folder, live)
+        into = os.path.normpath(os.path.join(staged, rel))
+        os.makedirs(into, exist_ok=True)
+        for name in files:
+            destination = os.path.join(into, name)
+            if not os.path.lexists(destination):
+                _link_or_copy(os.path.join(folder, name), destination)
+
+
+def _publish(target: str, staging_dir: str, plan: List[List[str]]) -> int:
+    """Carry out a plan. Every step looks at what is already in place first, so an interrupted publish can be run again."""
+    files_dir = os.path.join(staging_dir, FILES_DIR_NAME)
+    aside_dir = os.path.join(staging_dir, ASIDE_DIR_NAME)
+    renames = 0
+    for action, rel in plan:
+        source, destination = os.path.join(files_dir, rel), os.path.join(target, rel)
+        if not os.path.lexists(source):
+            continue  # Already moved in
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if action == ACTION_SWAP:
+            aside = os.path.join(aside_dir, rel)
+            if os.path.lexists(destination) and not os.path.lexists(aside):
+                os.makedirs(os.path.dirname(aside), exist_ok=True)
+                _move(destination, aside)
+                renames += 1
+        _move(source, destination)
+        renames += 1
+    shutil.rmtree(aside_dir, ignore_errors=True)
+    return renames
+
+
+def recover_staging(root_folders: List[Optional[str]]) -> Tuple[int, int]:
+    """Deal with staging folders an interrupted install left behind in the given game / production folders.
+    Returns (installs finished, installs discarded)."""
+    finished = discarded = 0
+    seen = set()
+    for folder in root_folders:
+        if not folder:
+            continue
+        root = staging_root(folder)
+        if root in seen or not os.path.isdir(root):
+            continue
+        seen.add(root)
+        for name in os.listdir(root):
+            staged_dir = os.path.join(root, name)
+            marker = os.path.join(staged_dir, MARKER_NAME)
+            try:
+                with open(marker, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                record = None
+            if record and record.get('target') and record.get('plan'):
+                try:
+                    _publish(record['target'], staged_dir, record['plan'])
+                    finished += 1
+                except OSError as e:
+                    print(f"Could not finish interrupted install in {staged_dir}: {e}")
+                    continue
+            else:
+                discarded += 1
+            shutil.rmtree(staged_dir, ignore_errors=True)
+        try:
+            os.rmdir(root)
+        except OSError:
+            pass
+    return finished, discarded
@@ -0,0 +1,300 @@
+"""
+Settings store for the Mod Organizer
+SQLite database (WAL mode) holding the folder settings, the master list of installed mods with their categories, the per-mod
+download metadata, the saved mod profiles and the post metadata cache. Every change is its own small transaction, so nothing is rewritten in full and a crash mid-save can't lose the
+rest of the setup.
+"""
+
+import json
+import time
+import sqlite3
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
+
+STORE_PATH = Path.home() / '.mod_organizer.db'
+LEGACY_SETTINGS_PATH = Path.home() / '.mod_organizer_settings.json'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS master_list (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    category TEXT,
+    added_at REAL
+);
+CREATE INDEX IF NOT EXISTS master_list_category ON master_list (category);
+CREATE TABLE IF NOT EXISTS download_meta (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_length INTEGER,
+    category TEXT,
+    updated_at REAL,
+    filename TEXT,
+    sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    name TEXT PRIMARY KEY,
+    targets TEXT,
+    created_at REAL
+);
+CREATE TABLE IF NOT EXISTS profile_mods (
+    profile TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    category TEXT,
+    PRIMARY KEY (profile, url)
+);
+CREATE TABLE IF NOT EXISTS post_meta (
+    post_id TEXT PRIMARY KEY,
+    post_url TEXT,
+    url TEXT,
+    category TEXT,
+    title TEXT,
+    image TEXT,
+    size INTEGER,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS post_meta_url ON post_meta (url);
+"""
+# Columns added after the first release of the database, ALTERed into older files on open
+ADDED_COLUMNS = {'download_meta': [('filename', 'TEXT'), ('sha256', 'TEXT')]}
+META_FIELDS = ('etag', 'last_modified', 'content_length', 'category', 'filename', 'sha256')
+POST_FIELDS = ('post_id', 'post_url', 'url', 'category', 'title', 'image', 'size')
+LOOKUP_CHUNK = 500  # urls / ids per IN (...) query, well under SQLite's bound parameter limit
+
+'''Settings values are stored JSON-encoded so numbers, booleans and strings all round trip. master_list keeps insertion order through
+its id column, url is UNIQUE so "is this url in the master list" is an index lookup and adding a mod is a single INSERT OR IGNORE.'''
+
+
+class SettingsStore:
+    """SQLite-backed replacement for the old ~/.mod_organizer_settings.json."""
+    def __init__(self, path=STORE_PATH, legacy_json_path=LEGACY_SETTINGS_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for name, kind in columns:
+                    if name not in existing:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+        if legacy_json_path and self.get('legacy_json_migrated') is None:
+            self.migrate_from_json(legacy_json_path)
+
+    def close(self):
+        self.conn.close()
+
+    # --- plain settings ---
+
+    def get(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        try:
+            return json.loads(row['value'])
+        except (TypeError, ValueError):
+            return default
+
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def set_many(self, values: Dict):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                  [(key, json.dumps(value)) for key, value in values.items()])
+
+    # --- master list ---
+
+    def add_mod(self, url: str, category: Optional[str] = None) -> bool:
+        """Add a url to the master list, returns False if it was already there (its category is filled in if it was missing)."""
+        with self.conn:
+            cur = self.conn.execute("INSERT OR IGNORE INTO master_list (url, category, added_at) VALUES (?, ?, ?)",
+                                    (url, category, time.time()))
+            if cur.rowcount == 0 and category:
+                self.conn.execute("UPDATE master_list SET category = ? WHERE url = ? AND category IS NULL", (category, url))
+            return cur.rowcount > 0
+
+    def add_mods(self, mods: Iterable[Tuple[str, Optional[str]]]) -> int:
+        """Bulk add of (url, category) pairs in one transaction, returns how many were new."""
+        now = time.time()
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO master_list (url, category, added_at) VALUES (?, ?, ?)",
+                                  ((url, category, now) for url, category in mods))
+            return self.conn.total_changes - before
+
+    def remove_mod(self, url: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM master_list WHERE url = ?", (url,))
+            self.conn.execute("DELETE FROM download_meta WHERE url = ?", (url,))
+
+    def has_mod(self, url: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM master_list WHERE url = ?", (url,)).fetchone() is not None
+
+    def mod_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM master_list").fetchone()[0]
+
+    def mods(self, category: Optional[str] = None) -> List[Dict]:
+        """Master list entries as {url, category}, in the order they were added."""
+        if category is None:
+            rows = self.conn.execute("SELECT url, category FROM master_list ORDER BY id")
+        else:
+            rows = self.conn.execute("SELECT url, category FROM master_list WHERE category = ? ORDER BY id", (category,))
+        return [{'url': row['url'], 'category': row['category']} for row in rows]
+
+    def iter_mods_with_meta(self, group_by_category: bool = False) -> Iterator[Dict]:
+        """Stream master list entries as {url, category, filename, content_length, sha256, post_url} straight off the cursor.
+
+        group_by_category orders uncategorized mods first, then camouflage, mission and sight, each in the order they were added."""
+        order = "m.id"
+        if group_by_category:
+            order = ("CASE COALESCE(d.category, m.category) WHEN 'camouflage' THEN 1 WHEN 'mission' THEN 2 WHEN 'sight' THEN 3 "
+                     "ELSE 0 END, m.id")
+        rows = self.conn.execute(
+            "SELECT m.url, COALESCE(d.category, m.category) AS category, d.filename, d.content_length, d.sha256, "
+            "(SELECT p.post_url FROM post_meta p WHERE p.url = m.url LIMIT 1) AS post_url "
+            f"FROM master_list m LEFT JOIN download_meta d ON d.url = m.url ORDER BY {order}")
+        for row in rows:
+            yield dict(row)
+
+    # --- download metadata ---
+
+    def update_download_meta(self, metas: Dict[str, Dict]):
+        """Store {url: {etag, last_modified, content_length, category, filename, sha256}} as recorded by the download engine."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO download_meta "
+                "(url, etag, last_modified, content_length, category, filename, sha256, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(url, meta.get('etag'), meta.get('last_modified'), meta.get('content_length'), meta.get('category'),
+                  meta.get('filename'), meta.get('sha256'), now)
+                 for url, meta in metas.items()])
+
+    def download_meta(self, url: str) -> Dict:
+        row = self.conn.execute(f"SELECT {', '.join(META_FIELDS)} FROM download_meta WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else {}
+
+    def master_list_meta(self) -> Dict[str, Dict]:
+        """url -> stored download metadata (empty if none) for everything in the master list."""
+        rows = self.conn.execute(
+            "SELECT m.url, d.etag, d.last_modified, d.content_length, COALESCE(d.category, m.category) AS category "
+            "FROM master_list m LEFT JOIN download_meta d ON d.url = m.url ORDER BY m.id")
+        result = {}
+        for row in rows:
+            meta = {key: row[key] for key in ('etag', 'last_modified', 'content_length', 'category') if row[key] is not None}
+            result[row['url']] = meta
+        return result
+
+    # --- post metadata cache ---
+
+    def update_post_meta(self, records: Iterable[Dict]):
+        """Store {post_id, post_url, url, category, title, image, size} read from post pages. Fields a record leaves as None keep
+        what was stored before, so a lookup without a size doesn't forget one found earlier."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO post_meta (post_id, post_url, url, category, title, image, size, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (post_id) DO UPDATE SET "
+                + ", ".join(f"{field} = COALESCE(excluded.{field}, {field})" for field in POST_FIELDS[1:])
+                + ", updated_at = excluded.updated_at",
+                [tuple(record.get(field) for field in POST_FIELDS) + (now,) for record in records if record.get('post_id')])
+
+    def post_meta(self, post_ids: Iterable[str]) -> Dict[str, Dict]:
+        """post_id -> cached post metadata, for the ids that are cached."""
+        return {row['post_id']: row for row in self._post_rows('post_id', post_ids)}
+
+    def post_meta_for_urls(self, urls: Iterable[str]) -> Dict[str, Dict]:
+        """download url -> cached post metadata. Download urls that are in the master list or download metadata but not in the
+        post cache come back with just their category (and size if known), so re-adding a mod never needs a lookup."""
+        urls = list(dict.fromkeys(urls))
+        found = {row['url']: row for row in self._post_rows('url', urls)}
+        rest = [url for url in urls if url not in found]
+        for start in range(0, len(rest), LOOKUP_CHUNK):
+            chunk = rest[start:start + LOOKUP_CHUNK]
+            marks = ', '.join('?' * len(chunk))
+            rows = self.conn.execute(
+                "SELECT m.url, COALESCE(d.category, m.category) AS category, d.content_length "
+                f"FROM master_list m LEFT JOIN download_meta d ON d.url = m.url WHERE m.url IN ({marks}) "
+                "UNION ALL SELECT url, category, content_length FROM download_meta "
+                f"WHERE url IN ({marks}) AND url NOT IN (SELECT url FROM master_list)", chunk + chunk)
+            for row in rows:
+                if row['category'] and row['url'] not in found:
+                    found[row['url']] = {'post_id': None, 'post_url': None, 'url': row['url'], 'category': row['category'],
+                                         'title': None, 'image': None, 'size': row['content_length']}
+        return found
+
+    def _post_rows(self, column: str, values: Iterable[str]) -> Iterator[Dict]:
+        values = [value for value in dict.fromkeys(values) if value]
+        for start in range(0, len(values), LOOKUP_CHUNK):
+            chunk = values[start:start + LOOKUP_CHUNK]
+            rows = self.conn.execute(f"SELECT {', '.join(POST_FIELDS)} FROM post_meta WHERE {column} IN "
+                                     f"({', '.join('?' * len(chunk))})", chunk)
+            for row in rows:
+                yield dict(row)
+
+    # --- profiles ---
+
+    def profiles(self) -> List[str]:
+        return [row['name'] for row in self.conn.execute("SELECT name FROM profiles ORDER BY name COLLATE NOCASE")]
+
+    def profile(self, name: str) -> Optional[Dict]:
+        """{name, targets: {category: folder}, mods: [{url, category}]} or None if there is no such profile."""
+        row = self.conn.execute("SELECT name, targets FROM profiles WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        mods = [{'url': r['url'], 'category': r['category']} for r in self.conn.execute(
+            "SELECT url, category FROM profile_mods WHERE profile = ? ORDER BY position", (name,))]
+        return {'name': row['name'], 'targets': json.loads(row['targets'] or '{}'), 'mods': mods}
+
+    def save_profile(self, name: str, mods: Iterable[Tuple[str, Optional[str]]], targets: Dict[str, str]):
+        """Create or replace a profile from (url, category) pairs and its category -> folder targets."""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO profiles (name, targets, created_at) VALUES (?, ?, ?)",
+                              (name, json.dumps(targets), time.time()))
+            self.conn.execute("DELETE FROM profile_mods WHERE profile = ?", (name,))
+            self.conn.executemany("INSERT OR IGNORE INTO profile_mods (profile, position, url, category) VALUES (?, ?, ?, ?)",
+                                  ((name, position, url, category) for position, (url, category) in enumerate(mods)))
+
+    def delete_profile(self, name: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM profile_mods WHERE profile = ?", (name,))
+            self.conn.execute("DELETE FROM profiles WHERE name = ?", (name,))
+
+    def profile_urls(self) -> set:
+        """Every url any profile holds, what the shared mod store has to keep."""
+        return {row['url'] for row in self.conn.execute("SELECT DISTINCT url FROM profile_mods")}
+
+    # --- migration ---
+
+    def migrate_from_json(self, json_path):
+        """One-off import of the old whole-file JSON settings. The JSON file is left where it is."""
+        json_path = Path(json_path)
+        if json_path.exists():
+            try:
+                with open(json_path, 'r') as f:
+                    legacy = json.load(f)
+            except Exception as e:
+                print(f"Could not read old settings file, skipping migration: {e}")
+                legacy = {}
+            mods = []
+            for mod in legacy.pop('master_list', []):
+                url = mod['url'] if isinstance(mod, dict) else mod
+                category = mod.get('category') if isinstance(mod, dict) else None
+                mods.append((url, category))
+            metas = legacy.pop('download_meta', {})
+            self.add_mods(mods)
+            self.update_download_meta(metas)
+            # Categories from the download metadata fill in master list entries saved as bare urls
+            with self.conn:
+                self.conn.executemany("UPDATE master_list SET category = ? WHERE url = ? AND category IS NULL",
+                                      [(meta.get('category'), url) for url, meta in metas.items() if meta.get('category')])
+            self.set_many(legacy)
+        self.set('legacy_json_migrated', True)
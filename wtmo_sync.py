@@ -0,0 +1,289 @@
+"""
+Headless sync for the Mod Organizer
+Applies a modlist to a game install from the command line, no Qt and no embedded browser:
+
+    python WTMO.py --sync modlist.ndjson.gz --root "C:/Games/War Thunder" --production "C:/Users/me/Documents/My Games/WarThunder"
+
+Uses the same download engine, archive cache, install manifest and settings database as the GUI. Progress goes to stdout as one
+JSON object per line, the exit status says how it went (see EXIT_*).
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from typing import Optional, List, Dict, TextIO
+
+from wtmo_downloads import (
+    DownloadEngine, DEFAULT_MAX_DOWNLOADS, DEFAULT_MAX_DOWNLOADS_PER_HOST, DEFAULT_MEMORY_EXTRACT_MB,
+    ORDER_LIST, DOWNLOAD_ORDERS
+)
+from wtmo_cache import ArchiveCache, DEFAULT_CACHE_BUDGET_MB
+from wtmo_manifest import InstallManifest
+from wtmo_store import SettingsStore
+from wtmo_modfile import read_modlist
+from wtmo_modlist import CATEGORY_CAMO, CATEGORY_MISSION, CATEGORY_SIGHT
+from wtmo_trace import TraceWriter
+from wtmo_preflight import preflight, space_check, estimated_rate, summarize_preflight, PREFLIGHT_FAILED
+from wtmo_staging import recover_staging
+from wtmo_postcache import apply_cached, lookup_posts, records_from_results, resolved_categories
+
+EXIT_OK = 0  # every mod installed (or already was)
+EXIT_FAILED = 1  # at least one mod failed to download or install
+EXIT_USAGE = 2  # bad arguments or unreadable modlist (argparse uses 2 as well)
+EXIT_NO_SPACE = 3  # the preflight found a target drive without room for the batch, nothing was downloaded
+EXIT_CANCELLED = 130  # interrupted with Ctrl+C
+
+'''Events written to stdout, one JSON object per line:
+  {"event": "recovered", "finished": N, "discarded": N}  (only when an interrupted install was cleaned up)
+  {"event": "start", "total": N, "skipped": N}
+  {"event": "preflight", "to_download": N, "cached": N, "failed": N, "unchecked": N, "download_bytes": N, "unknown_size": N,
+   "eta_seconds": N or null, "space": [{"folders": [...], "needed": N, "free": N, "ok": true/false}]}
+  {"event": "progress", "message": ..., "current": N, "total": N}
+  {"event": "mod", "url": ..., "category": ..., "ok": true/false, "message": ...}
+  {"event": "done", "installed": N, "failed": N, "skipped": N, "status": EXIT_*, "trace": path or null}
+Anything meant for a person (errors before the sync starts) goes to stderr.'''
+
+
+class ModlistUnreadable(Exception):
+    """Raised by sync() when the modlist can't be read or parsed, nothing has been touched yet."""
+
+
+def target_folders(root_folder: str, production_folder: Optional[str]) -> Dict[Optional[str], str]:
+    """category -> install folder, laid out the same way the GUI's folder setup does it."""
+    folders = {
+        CATEGORY_CAMO: os.path.join(root_folder, "UserSkins"),
+        CATEGORY_MISSION: os.path.join(root_folder, "UserMissions"),
+        None: root_folder,  # Fallback
+    }
+    if production_folder:
+        folders[CATEGORY_SIGHT] = os.path.join(production_folder, "UserSights", "all_tanks")
+    return folders
+
+
+class SyncReporter:
+    """Writes sync events as NDJSON, safe to call from the engine's worker threads."""
+    def __init__(self, out: TextIO = sys.stdout):
+        self.out = out
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        with self._lock:
+            self.out.write(json.dumps(dict(event=event, **fields)) + "\n")
+            self.out.flush()
+
+
+def sync(modlist_path: str, root_folder: str, production_folder: Optional[str] = None,
+         max_downloads: int = DEFAULT_MAX_DOWNLOADS, max_downloads_per_host: int = DEFAULT_MAX_DOWNLOADS_PER_HOST,
+         use_cache: bool = True, cache_budget_mb: int = DEFAULT_CACHE_BUDGET_MB, reinstall: bool = False,
+         memory_extract_mb: int = DEFAULT_MEMORY_EXTRACT_MB, order: str = ORDER_LIST, bandwidth_limit_kbps: int = 0,
+         store: Optional[SettingsStore] = None, manifest: Optional[InstallManifest] = None,
+         reporter: Optional[SyncReporter] = None, tracer: Optional[TraceWriter] = None,
+         check_first: bool = True) -> int:
+    """Install every mod in the modlist that isn't installed yet and return an EXIT_* status.
+
+    Raises ModlistUnreadable before anything is touched if the modlist can't be read."""
+    try:
+        entries = list(read_modlist(modlist_path))
+    except (OSError, EOFError, ValueError) as e:  # EOFError: a truncated .gz
+        raise ModlistUnreadable(str(e) or type(e).__name__) from e
+    reporter = reporter or SyncReporter()
+    store = store or SettingsStore()
+    manifest = manifest or InstallManifest()
+    folders = target_folders(root_folder, production_folder)
+    for category, folder in folders.items():
+        if category is not None:
+            os.makedirs(folder, exist_ok=True)
+    finished_installs, discarded_installs = recover_staging([root_folder, production_folder])
+    if finished_installs or discarded_installs:
+        reporter.emit('recovered', finished=finished_installs, discarded=discarded_installs)
+
+    def progress(message: str, current: int, total: int):
+        reporter.emit('progress', message=message, current=current, total=total)
+
+    # Mods listed without a category take it from the post cache, posts it doesn't know yet are read now (in parallel)
+    unresolved = apply_cached(entries, store)
+    if unresolved:
+        results = lookup_posts(list(dict.fromkeys(entry.extra['post'] for entry in unresolved)), max_downloads,
+                               max_downloads_per_host, progress=progress)
+        store.update_post_meta(records_from_results(results))
+        resolved = resolved_categories(unresolved, results)
+        for entry in unresolved:
+            entry.category, details = resolved.get(entry.url, (None, {}))
+            entry.extra = dict(entry.extra or {}, **details)
+
+    mods: List[Dict] = []
+    categories: Dict[str, Optional[str]] = {}
+    skipped = 0
+    missing_folder = []
+    for entry in entries:
+        if entry.url in categories:
+            continue  # Listed twice
+        categories[entry.url] = entry.category
+        if not reinstall and manifest.is_installed(entry.url, verify=True):
+            skipped += 1
+            continue
+        if entry.category == CATEGORY_SIGHT and CATEGORY_SIGHT not in folders:
+            missing_folder.append(entry)
+            continue
+        extra = entry.extra or {}
+        mods.append({'url': entry.url, 'target': folders.get(entry.category, root_folder), 'category': entry.category,
+                     'refresh': reinstall, 'priority': extra.get('priority', 0),
+                     'size': extra.get('size') or store.download_meta(entry.url).get('content_length')})
+
+    reporter.emit('start', total=len(mods) + len(missing_folder), skipped=skipped)
+    failed = 0
+    installed: List[str] = []
+    for entry in missing_folder:
+        failed += 1
+        reporter.emit('mod', url=entry.url, category=entry.category, ok=False,
+                      message="Sight mod but no --production folder given")
+
+    # Runs on the engine's worker threads, the database is only written from this thread once the engine is done
+    def finished(url: str, success: bool, message: str):
+        nonlocal failed
+        if success:
+            installed.append(url)
+        else:
+            failed += 1
+        reporter.emit('mod', url=url, category=categories.get(url), ok=success, message=message)
+
+    cache = ArchiveCache(cache_budget_mb) if use_cache else None
+    if check_first and mods:
+        # Dead links fail now and a batch that can't fit stops before a single byte is downloaded
+        results = preflight(mods, max_downloads, max_downloads_per_host, cache=cache, progress=progress)
+        space = space_check(mods, results, str(cache.cache_dir) if cache is not None else None)
+        summary = summarize_preflight(results, space, estimated_rate(max_downloads_per_host, bandwidth_limit_kbps))
+        reporter.emit('preflight', to_download=summary['to_download'], cached=summary['cached'],
+                      failed=len(summary['failed']), unchecked=len(summary['unchecked']),
+                      download_bytes=summary['download_bytes'],
+                      unknown_size=summary['unknown_size'], eta_seconds=summary['eta_seconds'], space=space)
+        if not summary['space_ok']:
+            reporter.emit('done', installed=0, failed=failed, skipped=skipped, status=EXIT_NO_SPACE, trace=None)
+            return EXIT_NO_SPACE
+        remaining = []
+        for mod, result in zip(mods, results):
+            if result['status'] == PREFLIGHT_FAILED:
+                failed += 1
+                reporter.emit('mod', url=mod['url'], category=mod['category'], ok=False, message=result['error'])
+                continue
+            if result['size']:
+                mod['size'] = result['size']
+            remaining.append(mod)
+        mods = remaining
+
+    engine = DownloadEngine(root_folder, max_downloads, max_downloads_per_host, cache=cache, manifest=manifest,
+                            memory_extract_mb=memory_extract_mb, order=order, bandwidth_limit_kbps=bandwidth_limit_kbps,
+                            tracer=tracer, production_folder=production_folder)
+    engine.progress = progress
+    engine.finished_download = finished
+    status = EXIT_OK
+    try:
+        if _run_interruptible(engine, mods):
+            status = EXIT_CANCELLED
+    finally:
+        store.add_mods((url, categories.get(url)) for url in installed)
+        store.update_download_meta(engine.validators)
+        engine.session.close()
+        if cache is not None:
+            cache.close()
+
+    if status == EXIT_OK and failed:
+        status = EXIT_FAILED
+    reporter.emit('done', installed=len(installed), failed=failed, skipped=skipped, status=status,
+                  trace=tracer.path if tracer else None)
+    return status
+
+
+def _run_interruptible(engine: DownloadEngine, mods: List[Dict]) -> bool:
+    """Run the engine on a worker thread so Ctrl+C reaches this thread while it only waits, and cancel the engine right away
+    instead of after run() has wound down on its own. Returns True if it was interrupted."""
+    errors: List[BaseException] = []
+
+    def work():
+        try:
+            engine.run(mods)
+        except BaseException as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=work, name='wtmo-sync', daemon=True)
+    worker.start()
+    interrupted = False
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        interrupted = True
+        engine.cancel()
+        worker.join()
+    if errors:
+        raise errors[0]
+    return interrupted
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='WTMO', description="Apply a modlist to a War Thunder install without the GUI.")
+    parser.add_argument('--sync', metavar='MODLIST', required=True,
+                        help="modlist to apply (.ndjson.gz, grouped .txt or old .json export)")
+    parser.add_argument('--root', metavar='FOLDER', help="War Thunder game folder (default: the one saved by the GUI)")
+    parser.add_argument('--production', metavar='FOLDER',
+                        help="folder holding UserSights, needed for sight mods (default: the one saved by the GUI)")
+    parser.add_argument('--max-downloads', type=int, help="parallel downloads")
+    parser.add_argument('--max-per-host', type=int, help="parallel downloads per server")
+    parser.add_argument('--no-cache', action='store_true', help="don't use or fill the local archive cache")
+    parser.add_argument('--order', choices=DOWNLOAD_ORDERS,
+                        help="download queue order, 'smallest' gets sights and missions done first (default: list)")
+    parser.add_argument('--limit-kbps', type=int, metavar='KBPS', help="cap the combined download speed, 0 for no cap")
+    parser.add_argument('--trace', metavar='FILE', nargs='?', const='',
+                        help="write per-mod timings as JSONL to FILE (or a new file in ~/.mod_organizer_traces)")
+    parser.add_argument('--no-preflight', action='store_true',
+                        help="skip checking links, sizes and free space before downloading")
+    parser.add_argument('--reinstall', action='store_true', help="download and install mods that are already installed")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    store = SettingsStore()
+    root_folder = args.root or store.get('root_folder') or ''
+    production_folder = args.production or store.get('production_folder') or None
+    if not root_folder or not os.path.isdir(root_folder):
+        print(f"Game folder not found: {root_folder or '(none given)'}", file=sys.stderr)
+        return EXIT_USAGE
+    if not os.path.isfile(args.sync):
+        print(f"Modlist not found: {args.sync}", file=sys.stderr)
+        return EXIT_USAGE
+    tracer = None
+    if args.trace is not None:
+        try:
+            tracer = TraceWriter(args.trace or None)
+        except OSError as e:
+            print(f"Could not start trace: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    try:
+        return sync(args.sync, root_folder, production_folder,
+                    max_downloads=args.max_downloads or int(store.get('max_downloads', DEFAULT_MAX_DOWNLOADS)),
+                    max_downloads_per_host=args.max_per_host or int(store.get('max_downloads_per_host',
+                                                                              DEFAULT_MAX_DOWNLOADS_PER_HOST)),
+                    use_cache=not args.no_cache and bool(store.get('cache_enabled', True)),
+                    cache_budget_mb=int(store.get('cache_budget_mb', DEFAULT_CACHE_BUDGET_MB)),
+                    reinstall=args.reinstall, store=store, tracer=tracer,
+                    check_first=not args.no_preflight and bool(store.get('preflight_enabled', True)),
+                    memory_extract_mb=int(store.get('memory_extract_mb', DEFAULT_MEMORY_EXTRACT_MB)),
+                    order=args.order or store.get('download_order', ORDER_LIST),
+                    bandwidth_limit_kbps=(args.limit_kbps if args.limit_kbps is not None
+                                          else int(store.get('bandwidth_limit_kbps', 0))))
+    except ModlistUnreadable as e:
+        print(f"Could not read modlist {args.sync}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except Exception as e:
+        # A disk, permission or settings database error part way through: the run failed, the arguments were fine
+        print(f"Sync failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Thumbnail pipeline for the Mod Organizer
+Decodes images straight to the size they are shown at (QImageReader scaled reads, JPEG previews are decoded at reduced resolution
+instead of full size and then shrunk) on a small worker pool, and keeps the results in a size-bounded disk cache so the logo panel and
+the preview icons in the download list never decode anything on the UI thread.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Set
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader
+
+from wtmo_downloads import make_session, REQUEST_TIMEOUT
+
+THUMBNAIL_DIR = Path.home() / '.mod_organizer_cache' / 'thumbnails'
+DEFAULT_THUMBNAIL_BUDGET_MB = 64
+DEFAULT_THUMBNAIL_WORKERS = 4
+MEMORY_CACHE_ENTRIES = 512
+MAX_IMAGE_BYTES = 16 * 1024 * 1024
+
+'''A thumbnail is identified by its source (a local path or an http(s) url) and the box it is fitted into. Local sources also carry
+their mtime in the key so replacing a logo file gives a new thumbnail. The disk cache is a flat folder of PNGs named by key hash,
+least-recently-used first by file mtime (a hit touches the file). Requests are run newest first, so after a fast scroll the rows now
+on screen are decoded before the ones that already scrolled past.'''
+
+
+def thumbnail_key(source: str, size: QSize) -> str:
+    if not source.startswith(('http://', 'https://')):
+        try:
+            source = f"{os.path.abspath(source)}@{os.stat(source).st_mtime_ns}"
+        except OSError:
+            pass
+    return hashlib.sha1(f"{source}|{size.width()}x{size.height()}".encode('utf-8')).hexdigest()
+
+
+def decode_scaled(data: Optional[bytes], path: Optional[str], size: QSize) -> QImage:
+    """Decode an image from bytes or a file, fitted into size with the aspect ratio kept. Returns a null QImage on failure."""
+    if data is not None:
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        reader = QImageReader(buffer)
+    else:
+        reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        reader.setScaledSize(original.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+class ThumbnailDiskCache:
+    """Folder of decoded thumbnails, evicted least-recently-used first once it outgrows its budget."""
+    def __init__(self, budget_mb: int = DEFAULT_THUMBNAIL_BUDGET_MB, cache_dir=THUMBNAIL_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = max(0, int(budget_mb)) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._files: 'OrderedDict[str, int]' = OrderedDict()  # key -> size, oldest use first
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for item in it:
+                if item.name.endswith('.png'):
+                    st = item.stat()
+                    entries.append((st.st_mtime_ns, item.name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._files[key] = size
+
+    def get(self, key: str) -> Optional[QImage]:
+        with self._lock:
+            if key not in self._files:
+                return None
+            self._files.move_to_end(key)
+        path = self._path(key)
+        image = QImage(str(path))
+        if image.isNull():
+            with self._lock:
+                self._files.pop(key, None)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    def put(self, key: str, image: QImage):
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if not image.save(str(tmp_path), 'PNG'):
+            return
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._files[key] = path.stat().st_size
+            self._files.move_to_end(key)
+            total = sum(self._files.values())
+            while total > self.budget_bytes and len(self._files) > 1:
+                old_key, old_size = self._files.popitem(last=False)
+                total -= old_size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.png"
+
+
+class _ThumbnailJob(QRunnable):
+    def __init__(self, loader: 'ThumbnailLoader', key: str, source: str, size: QSize):
+        super().__init__()
+        self.loader, self.key, self.source, self.size = loader, key, source, size
+
+    def run(self):
+        image = self.loader.disk_cache.get(self.key)
+        if image is None:
+            try:
+                image = self.loader._decode(self.source, self.size)
+            except Exception as e:
+                print(f"Could not load thumbnail {self.source}: {e}")
+                image = QImage()
+            if not image.isNull():
+                self.loader.disk_cache.put(self.key, image)
+        self.loader._finished(self.key, self.source, image)
+
+
+class ThumbnailLoader(QObject):
+    """Hands out thumbnails from memory, or decodes them in the background and emits ready(source, image) when done.
+
+    Lives on the UI thread, the signal is delivered there no matter which worker finished."""
+    ready = pyqtSignal(str, QImage)  # source, thumbnail (null image if it couldn't be loaded)
+    _delivered = pyqtSignal(str, str, QImage)  # key, source, image, emitted from the workers
+
+    def __init__(self, disk_cache: Optional[ThumbnailDiskCache] = None, workers: int = DEFAULT_THUMBNAIL_WORKERS,
+                 parent=None):
+        super().__init__(parent)
+        self.disk_cache = disk_cache or ThumbnailDiskCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, workers))
+        self._memory: 'OrderedDict[str, QImage]' = OrderedDict()  # key -> image, most recent last
+        self._failed: Set[str] = set()
+        self._in_flight: Dict[str, str] = {}  # key -> source
+        self._lock = threading.Lock()
+        self._session = None
+        self._priority = 0
+        self._delivered.connect(self._on_delivered)
+
+    def get(self, source: str, size: QSize) -> Optional[QImage]:
+        """The thumbnail if it is in memory, otherwise None and a background load is started (ready fires when it is done)."""
+        key = thumbnail_key(source, size)
+        image = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+            return image
+        if key not in self._failed:
+            self.request(source, size, key)
+        return None
+
+    def request(self, source: str, size: QSize, key: Optional[str] = None):
+        key = key or thumbnail_key(source, size)
+        with self._lock:
+            if key in self._in_flight:
+                return
+            self._in_flight[key] = source
+        # Newest request first
+        self._priority = min(self._priority + 1, 2 ** 30)
+        self.pool.start(_ThumbnailJob(self, key, source, size), self._priority)
+
+    def _decode(self, source: str, size: QSize) -> QImage:
+        if source.startswith(('http://', 'https://')):
+            with self._lock:
+                if self._session is None:
+                    self._session = make_session(self.pool.maxThreadCount())
+                session = self._session
+            response = session.get(source, stream=True, timeout=REQUEST_TIMEOUT)
+            try:
+                response.raise_for_status()
+                data = bytearray()
+                for chunk in response.iter_content(chunk_size=65536):
+                    data.extend(chunk)
+                    if len(data) > MAX_IMAGE_BYTES:
+                        raise ValueError("image too large")
+            finally:
+                response.close()
+            return decode_scaled(bytes(data), None, size)
+        return decode_scaled(None, source, size)
+
+    def _finished(self, key: str, source: str, image: QImage):
+        # Called on a worker thread, the signal queues the hand-over to the UI thread
+        self._delivered.emit(key, source, image)
+
+    def _on_delivered(self, key: str, source: str, image: QImage):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if image.isNull():
+            self._failed.add(key)
+        else:
+            self._memory[key] = image
+            while len(self._memory) > MEMORY_CACHE_ENTRIES:
+                self._memory.popitem(last=False)
+        self.ready.emit(source, image)
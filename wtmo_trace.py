@@ -0,0 +1,249 @@
+"""
+Download timing traces for the Mod Organizer
+Every mod a DownloadEngine handles gets a ModTrace: how long it waited for a worker and a host slot, connect (DNS + TCP + TLS),
+time to first byte, transfer time and bytes, the wait for the extractor, extract time and the files written or skipped. Finished
+traces are appended to a JSONL file per run and summarized per host and per archive, so a slow sync can be pinned on a slow server,
+a slow link or a slow archive.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import median
+from typing import Optional, List, Dict, Iterable, Iterator
+from urllib.parse import urlparse
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+TRACE_DIR = Path.home() / '.mod_organizer_traces'
+MAX_TRACE_FILES = 20  # Oldest run files are deleted beyond this
+SLOWEST_SHOWN = 10
+
+# Span names, in the order they happen to a mod
+SPAN_QUEUED = 'queued'  # submitted until a download worker picked it up
+SPAN_SLOT_WAIT = 'slot_wait'  # waiting for a per-host slot
+SPAN_CONNECT = 'connect'  # DNS, TCP and TLS for new connections, 0 on a reused one
+SPAN_TTFB = 'ttfb'  # request sent until the response headers arrived
+SPAN_TRANSFER = 'transfer'  # reading the body
+SPAN_CACHE_STORE = 'cache_store'  # writing the archive into the archive cache
+SPAN_EXTRACT_WAIT = 'extract_wait'  # downloaded, waiting for an extractor
+SPAN_EXTRACT = 'extract'  # unpacking or moving files into place
+SPANS = (SPAN_QUEUED, SPAN_SLOT_WAIT, SPAN_CONNECT, SPAN_TTFB, SPAN_TRANSFER, SPAN_CACHE_STORE, SPAN_EXTRACT_WAIT, SPAN_EXTRACT)
+
+'''requests doesn't expose connection setup time, so sessions built by make_session use connection classes that time connect()
+into a thread-local. A worker reads it straight after its request, which is how connect and TTFB get told apart: the time until the
+headers arrived minus the time spent connecting. Pool reuse shows up as a connect of 0.'''
+_connect_time = threading.local()
+
+
+class _TimedConnect:
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.seconds = getattr(_connect_time, 'seconds', 0.0) + time.perf_counter() - started
+
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def instrument_session(session):
+    """Make the session's adapters open timed connections. Pools already created keep their old connection class."""
+    for adapter in set(session.adapters.values()):
+        poolmanager = getattr(adapter, 'poolmanager', None)
+        if poolmanager is not None:
+            poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+    return session
+
+
+def take_connect_time() -> float:
+    """Seconds this thread spent connecting since the last call."""
+    seconds = getattr(_connect_time, 'seconds', 0.0)
+    _connect_time.seconds = 0.0
+    return seconds
+
+
+class ModTrace:
+    """Timings and counts for one mod. Only touched by one thread at a time (its download worker, then its extractor)."""
+    def __init__(self, url: str, category: Optional[str] = None):
+        self.url = url
+        self.category = category
+        self.started_at = time.time()
+        self.spans: Dict[str, float] = {}  # name -> seconds
+        self.counts: Dict[str, int] = {'bytes': 0, 'attempts': 0, 'files_written': 0, 'files_skipped': 0}
+        self.source = 'network'  # 'network', 'memory' (small zip unpacked from RAM) or 'cache'
+        self.filename: Optional[str] = None
+        self.ok: Optional[bool] = None
+        self.message = ''
+        self._marks: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + max(0.0, seconds)
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def mark(self, name: str):
+        """Start an open-ended span, closed by end(name) possibly much later (e.g. queued, extract_wait)."""
+        self._marks[name] = time.perf_counter()
+
+    def end(self, name: str):
+        started = self._marks.pop(name, None)
+        if started is not None:
+            self.add(name, time.perf_counter() - started)
+
+    def to_dict(self) -> Dict:
+        transfer = self.spans.get(SPAN_TRANSFER, 0.0)
+        return {'url': self.url, 'host': urlparse(self.url).netloc.lower(), 'category': self.category,
+                'filename': self.filename, 'source': self.source, 'ok': self.ok, 'message': self.message,
+                'started_at': round(self.started_at, 3),
+                'spans_ms': {name: round(self.spans[name] * 1000, 1) for name in SPANS if name in self.spans},
+                'rate_kbps': round(self.counts['bytes'] / transfer / 1024, 1) if transfer > 0 else None,
+                **self.counts}
+
+
+class TraceWriter:
+    """Appends finished traces to one JSONL file per run, safe to call from any worker."""
+    def __init__(self, path: Optional[str] = None, trace_dir=TRACE_DIR, max_files: int = MAX_TRACE_FILES):
+        if path is None:
+            trace_dir = Path(trace_dir)
+            trace_dir.mkdir(parents=True, exist_ok=True)
+            _prune(trace_dir, max_files - 1)
+            path = trace_dir / time.strftime('%Y%m%d-%H%M%S.jsonl')
+        self.path = str(path)
+        self.records: List[Dict] = []  # Everything written this run, for the summary
+        self._lock = threading.Lock()
+
+    def write(self, trace: ModTrace):
+        record = trace.to_dict()
+        with self._lock:
+            self.records.append(record)
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Could not write download trace: {e}")
+
+
+def _prune(trace_dir: Path, keep: int):
+    runs = sorted(trace_dir.glob('*.jsonl'))
+    for old in runs[:max(0, len(runs) - keep)]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def latest_trace_file(trace_dir=TRACE_DIR) -> Optional[str]:
+    runs = sorted(Path(trace_dir).glob('*.jsonl')) if Path(trace_dir).is_dir() else []
+    return str(runs[-1]) if runs else None
+
+
+def read_trace(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get('url'):
+                yield record
+
+
+def summarize(records: Iterable[Dict]) -> Dict:
+    """Totals per span, per host stats and the slowest archives of a run."""
+    records = list(records)
+    totals = {name: 0.0 for name in SPANS}
+    hosts: Dict[str, Dict] = {}
+    for record in records:
+        spans = record.get('spans_ms', {})
+        for name in SPANS:
+            totals[name] += spans.get(name, 0.0)
+        host = hosts.setdefault(record.get('host') or '', {'mods': 0, 'failed': 0, 'bytes': 0, 'transfer_ms': 0.0,
+                                                            'connects': [], 'ttfbs': []})
+        host['mods'] += 1
+        host['failed'] += 0 if record.get('ok') else 1
+        if record.get('source') != 'cache':
+            host['bytes'] += record.get('bytes', 0)
+            host['transfer_ms'] += spans.get(SPAN_TRANSFER, 0.0)
+            if SPAN_TTFB in spans:
+                host['ttfbs'].append(spans[SPAN_TTFB])
+                host['connects'].append(spans.get(SPAN_CONNECT, 0.0))
+
+    per_host = {}
+    for name, host in hosts.items():
+        per_host[name] = {'mods': host['mods'], 'failed': host['failed'], 'bytes': host['bytes'],
+                          'rate_kbps': round(host['bytes'] / host['transfer_ms'] * 1000 / 1024, 1)
+                          if host['transfer_ms'] > 0 else None,
+                          'median_connect_ms': round(median(host['connects']), 1) if host['connects'] else None,
+                          'median_ttfb_ms': round(median(host['ttfbs']), 1) if host['ttfbs'] else None}
+
+    def slowest(span: str) -> List[Dict]:
+        ranked = sorted((r for r in records if r.get('spans_ms', {}).get(span)), key=lambda r: r['spans_ms'][span], reverse=True)
+        return [{'url': r['url'], 'filename': r.get('filename'), 'ms': r['spans_ms'][span], 'bytes': r.get('bytes', 0),
+                 'files': r.get('files_written', 0) + r.get('files_skipped', 0)} for r in ranked[:SLOWEST_SHOWN]]
+
+    return {'mods': len(records), 'failed': sum(1 for r in records if not r.get('ok')),
+            'bytes': sum(r.get('bytes', 0) for r in records if r.get('source') != 'cache'),
+            'files_written': sum(r.get('files_written', 0) for r in records),
+            'files_skipped': sum(r.get('files_skipped', 0) for r in records),
+            'totals_ms': {name: round(value, 1) for name, value in totals.items()},
+            'hosts': per_host, 'slowest_transfers': slowest(SPAN_TRANSFER), 'slowest_extracts': slowest(SPAN_EXTRACT)}
+
+
+def format_report(summary: Dict) -> str:
+    """Plain text version of summarize() for the diagnostics panel and the exported report."""
+    def ms(value) -> str:
+        return 'n/a' if value is None else (f"{value / 1000:.1f} s" if value >= 10000 else f"{value:.0f} ms")
+
+    def size(value: int) -> str:
+        return f"{value / (1024 * 1024):.1f} MiB" if value >= 1024 * 1024 else f"{value / 1024:.0f} KiB"
+
+    lines = [f"Mods: {summary['mods']} ({summary['failed']} failed), downloaded {size(summary['bytes'])}, "
+             f"files written {summary['files_written']}, unchanged {summary['files_skipped']}",
+             "", "Time spent (summed over all mods):"]
+    for name, value in summary['totals_ms'].items():
+        lines.append(f"  {name:<14}{ms(value):>12}")
+
+    lines += ["", f"{'Host':<32}{'mods':>6}{'failed':>8}{'size':>12}{'rate':>13}{'connect':>10}{'TTFB':>10}"]
+    for host, stats in sorted(summary['hosts'].items(), key=lambda item: -item[1]['mods']):
+        rate = 'n/a' if stats['rate_kbps'] is None else f"{stats['rate_kbps']:.0f} KB/s"
+        lines.append(f"{host[:31]:<32}{stats['mods']:>6}{stats['failed']:>8}{size(stats['bytes']):>12}{rate:>13}"
+                     f"{ms(stats['median_connect_ms']):>10}{ms(stats['median_ttfb_ms']):>10}")
+
+    for title, key in (("Slowest transfers:", 'slowest_transfers'), ("Slowest extracts:", 'slowest_extracts')):
+        if summary[key]:
+            lines += ["", title]
+            for item in summary[key]:
+                name = item['filename'] or item['url']
+                lines.append(f"  {ms(item['ms']):>9}  {size(item['bytes']):>10}  {item['files']:>5} files  {name}")
+    return "\n".join(lines)
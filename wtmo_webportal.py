@@ -0,0 +1,32 @@
+"""
+Web portal for the Mod Organizer
+Everything that needs Qt WebEngine lives here. Importing this module starts loading Chromium's libraries, so WTMO.py only imports it
+once the main window has painted (or the portal is needed right away), keeping Chromium out of the cold start.
+"""
+
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWebEngineCore import QWebEnginePage, QWebEngineScript
+
+# JavaScript world the extractor scripts run in, separate from the site's own scripts
+APPLICATION_WORLD = QWebEngineScript.ScriptWorldId.ApplicationWorld.value
+
+
+'''current href reference, expandable as needed'''
+class ModWebPage(QWebEnginePage):
+    """Custom web page to handle download link detection."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Patterns for different mod sites
+        self.download_patterns = [
+            r'href=["\']?(https?://live\.warthunder\.com/dl/[^"\'>\s]+)',
+            r'href=["\']?(/downloads/start/\d+)',
+            r'href=["\']?(https?://[^"\'>\s]*download[^"\'>\s]*)',
+        ]
+
+
+def create_web_view(parent=None):
+    """Build the portal's view and page, returns (view, page). Nothing is loaded yet."""
+    view = QWebEngineView(parent)
+    page = ModWebPage(view)
+    view.setPage(page)
+    return view, page